@@ -0,0 +1,40 @@
+"""add ksb content hash and learning log index
+
+Revision ID: 3f2a9c1d7b64
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f2a9c1d7b64'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _columns(table_name: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+
+def _indexes(table_name: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table_name)}
+
+
+def upgrade() -> None:
+    # Databases created by scripts/create_schema.py after this change already have these
+    if "content_hash" not in _columns("ksbs"):
+        op.add_column("ksbs", sa.Column("content_hash", sa.String(length=64), nullable=True))
+    # Serves the per-user date range scans of the off-the-job hours aggregates
+    if "ix_learning_logs_user_id_date" not in _indexes("learning_logs"):
+        op.create_index("ix_learning_logs_user_id_date", "learning_logs", ["user_id", "date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_learning_logs_user_id_date", table_name="learning_logs")
+    op.drop_column("ksbs", "content_hash")
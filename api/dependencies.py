@@ -0,0 +1,27 @@
+from fastapi import Request
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+
+# The clients live on app.state, created by the application's lifespan
+# handler in main.py. Importing this module never touches a database.
+
+# Dependency to get PostgreSQL database session
+def get_db(request: Request):
+    db = request.app.state.session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get MongoDB database
+def get_mongo_db(request: Request) -> Database:
+    return request.app.state.mongo_db
+
+# Dependency to get async PostgreSQL database session
+async def get_async_db(request: Request):
+    async with request.app.state.async_session_factory() as db:
+        yield db
+
+# Dependency to get async MongoDB database
+def get_async_mongo_db(request: Request) -> AsyncDatabase:
+    return request.app.state.async_mongo_db
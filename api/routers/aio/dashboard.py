@@ -0,0 +1,88 @@
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from pymongo.asynchronous.database import AsyncDatabase
+from typing import Dict, Any, Optional
+from api.dependencies import get_async_db, get_async_mongo_db
+from api.services.coverage import coverage_stamp_async, load_cohort_coverage_async, load_ksb_coverage_async
+from api.services.dashboard import (
+    build_cohort_matrix,
+    build_dashboard_overview,
+    load_cohort_evidence_counts_async,
+    parse_user_ids,
+)
+from api.services.etags import DASHBOARD_CACHE_CONTROL, make_etag, not_modified, set_cache_headers
+from api.services.ksb_catalogue import ksb_catalogue
+from api.services.otj_hours import DEFAULT_CONTRACTED_HOURS_PER_WEEK, load_cohort_otj_totals_async, utc_today
+
+router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
+
+@router.get("/overview")
+async def get_dashboard_overview(
+    user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    mongo_db: AsyncDatabase = Depends(get_async_mongo_db)
+) -> Dict[str, Any]:
+    """Get dashboard overview with KSB progress and stats"""
+    
+    # Read the coverage stamp and count the user's evidence concurrently
+    catalogue = await ksb_catalogue.get_async(db)
+    stamp, user_evidence_count = await asyncio.gather(
+        coverage_stamp_async(db, user_id),
+        mongo_db.evidence.count_documents({"user_id": user_id})
+    )
+    
+    # Answer from the version stamp alone when the client is up to date
+    etag = make_etag("dashboard", user_id, catalogue.version, *stamp, user_evidence_count)
+    cached = not_modified(if_none_match, etag, DASHBOARD_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, DASHBOARD_CACHE_CONTROL)
+    
+    ksb_rows = await load_ksb_coverage_async(db, user_id)
+    
+    return build_dashboard_overview(user_id, ksb_rows, user_evidence_count)
+
+@router.get("/cohort")
+async def get_dashboard_cohort(
+    user_ids: str = Query(..., description="Comma-separated user ids, e.g. 1,2,3"),
+    contracted_hours_per_week: float = Query(DEFAULT_CONTRACTED_HOURS_PER_WEEK, gt=0),
+    db: AsyncSession = Depends(get_async_db),
+    mongo_db: AsyncDatabase = Depends(get_async_mongo_db)
+) -> Dict[str, Any]:
+    """
+    Get KSB coverage, evidence totals and off-the-job hours for many users.
+
+    Each row's 'ksb_evidence' lists the user's evidence count per KSB, in
+    the order of the 'ksbs' columns. The cost is one coverage query, one
+    off-the-job aggregate and one MongoDB aggregation, whatever the cohort size.
+    """
+    
+    try:
+        cohort = parse_user_ids(user_ids)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    today = utc_today()
+    
+    async def load_postgres():
+        # One session runs one statement at a time, so these stay sequential
+        catalogue = await ksb_catalogue.get_async(db)
+        coverage = await load_cohort_coverage_async(db, cohort)
+        otj_totals = await load_cohort_otj_totals_async(db, cohort, today)
+        return catalogue, coverage, otj_totals
+    
+    # Run the MongoDB aggregation alongside the PostgreSQL queries
+    (catalogue, coverage, otj_totals), evidence_counts = await asyncio.gather(
+        load_postgres(),
+        load_cohort_evidence_counts_async(mongo_db, cohort)
+    )
+    
+    return build_cohort_matrix(
+        cohort, catalogue, coverage, evidence_counts, otj_totals, today, contracted_hours_per_week
+    )
@@ -0,0 +1,92 @@
+from fastapi import APIRouter, Depends, Header, Response, status
+from fastapi.responses import StreamingResponse
+from pymongo.asynchronous.database import AsyncDatabase
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, Optional
+from api.dependencies import get_async_db, get_async_mongo_db
+from api.services.byte_ranges import aslice_chunks, content_range, parse_range, unsatisfied_range
+from api.services.etags import EXPORT_CACHE_CONTROL, not_modified
+from api.services.portfolio_export import (
+    PORTFOLIO_MEDIA_TYPE,
+    archive_sizes,
+    iter_portfolio_async,
+    load_portfolio_context_async,
+    portfolio_etag,
+)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+@router.get("/portfolio")
+async def export_portfolio(
+    user_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    mongo_db: AsyncDatabase = Depends(get_async_mongo_db)
+):
+    """
+    Download a user's portfolio for end-point assessment as a zip of
+    markdown files: an index, one file per KSB listing its evidence, and
+    one file per evidence item.
+
+    The archive is streamed as it is built, so memory use does not grow
+    with the portfolio. It is the same bytes for as long as the ETag is
+    unchanged, so an interrupted download can be resumed with a Range
+    header (send the ETag as If-Range).
+    """
+
+    context = await load_portfolio_context_async(db, mongo_db, user_id)
+    etag = portfolio_etag(context)
+    cached = not_modified(if_none_match, etag, EXPORT_CACHE_CONTROL)
+    if cached:
+        return cached
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": EXPORT_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="portfolio-{user_id}.zip"',
+    }
+
+    # A range only applies to the archive the client started from; otherwise send it all
+    if not range_header or (if_range and if_range.strip() != etag):
+        chunks = archive_sizes.measured_async(iter_portfolio_async(db, mongo_db, context), etag)
+        return StreamingResponse(_stream_portfolio(chunks, db), media_type=PORTFOLIO_MEDIA_TYPE, headers=headers)
+
+    # The full size is only known once the archive has been built, so measure it if no earlier download did
+    size = archive_sizes.get(etag)
+    if size is None:
+        size = 0
+        async for chunk in iter_portfolio_async(db, mongo_db, context):
+            size += len(chunk)
+        archive_sizes.set(etag, size)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": unsatisfied_range(size)}
+        )
+    if byte_range is None:
+        chunks = archive_sizes.measured_async(iter_portfolio_async(db, mongo_db, context), etag)
+        return StreamingResponse(_stream_portfolio(chunks, db), media_type=PORTFOLIO_MEDIA_TYPE, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = content_range(start, end, size)
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _stream_portfolio(aslice_chunks(iter_portfolio_async(db, mongo_db, context), start, end), db),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=PORTFOLIO_MEDIA_TYPE,
+        headers=headers
+    )
+
+async def _stream_portfolio(chunks: AsyncIterator[bytes], db: AsyncSession) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in chunks:
+            yield chunk
+    finally:
+        # The stream can outlive the request dependency, so release the connection here
+        await db.close()
@@ -0,0 +1,98 @@
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from api.dependencies import get_async_db
+from database.models.postgres_models import KSB
+from api.schemas.ksb_schemas import KSBCreate, KSBResponse
+from api.services.coverage import coverage_stamp_async, load_ksb_coverage_async
+from api.services.etags import KSB_CACHE_CONTROL, make_etag, not_modified, set_cache_headers
+from api.services.ksb_catalogue import bump_ksb_catalogue_version_async, ksb_catalogue
+
+router = APIRouter(prefix="/ksbs", tags=["KSBs"])
+
+@router.get("/", response_model=List[KSBResponse])
+async def get_all_ksbs(
+    response: Response,
+    user_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get all KSBs with evidence count, optionally for a single user"""
+    # Answer from the version stamp alone when the client is up to date
+    catalogue = await ksb_catalogue.get_async(db)
+    etag = make_etag("ksbs", user_id, catalogue.version, *(await coverage_stamp_async(db, user_id)))
+    cached = not_modified(if_none_match, etag, KSB_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, KSB_CACHE_CONTROL)
+    
+    ksb_rows = await load_ksb_coverage_async(db, user_id)
+    
+    return [
+        KSBResponse(
+            id=ksb.id,
+            code=ksb.code,
+            description=ksb.description,
+            evidence_count=ksb.evidence_count
+        )
+        for ksb in ksb_rows
+    ]
+
+@router.post("/", response_model=KSBResponse)
+async def create_ksb(ksb: KSBCreate, db: AsyncSession = Depends(get_async_db)):
+    """Create a new KSB"""
+    # Check if KSB code already exists
+    existing_ksb = await db.scalar(select(KSB.id).where(KSB.code == ksb.code))
+    if existing_ksb:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"KSB with code {ksb.code} already exists"
+        )
+    
+    db_ksb = KSB(code=ksb.code, description=ksb.description)
+    db.add(db_ksb)
+    await bump_ksb_catalogue_version_async(db)
+    await db.commit()
+    ksb_catalogue.invalidate()
+    
+    return KSBResponse(
+        id=db_ksb.id,
+        code=db_ksb.code,
+        description=db_ksb.description,
+        evidence_count=0
+    )
+
+@router.get("/{ksb_id}", response_model=KSBResponse)
+async def get_ksb(
+    ksb_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a specific KSB by ID"""
+    catalogue = await ksb_catalogue.get_async(db)
+    ksb = catalogue.by_id.get(ksb_id)
+    if not ksb:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="KSB not found"
+        )
+    
+    # Answer from the version stamp alone when the client is up to date
+    stamp = await coverage_stamp_async(db, ksb_id=ksb_id)
+    etag = make_etag("ksb", ksb_id, catalogue.version, *stamp)
+    cached = not_modified(if_none_match, etag, KSB_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, KSB_CACHE_CONTROL)
+    
+    # The stamp already holds the KSB's evidence total across all users
+    evidence_count = int(stamp[1] or 0)
+    return KSBResponse(
+        id=ksb.id,
+        code=ksb.code,
+        description=ksb.description,
+        evidence_count=evidence_count
+    )
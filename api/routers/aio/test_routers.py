@@ -0,0 +1,183 @@
+import asyncio
+import mongomock
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from api.dependencies import get_async_db, get_async_mongo_db
+from api.routers.aio import dashboard, evidence, ksbs
+from api.services.ksb_catalogue import ksb_catalogue
+from database.models.postgres_models import Base, KSB
+
+class AsyncCursor:
+    """Wraps a mongomock cursor in the parts of the AsyncCursor API the routers use"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def limit(self, count):
+        self.cursor = self.cursor.limit(count)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.cursor)
+
+    async def __aiter__(self):
+        for doc in self.cursor:
+            yield doc
+
+class AsyncCollection:
+    """Wraps a mongomock collection so every call but find() is awaited, as with AsyncCollection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(self.collection.find(*args, **kwargs))
+
+    async def aggregate(self, *args, **kwargs):
+        return AsyncCursor(self.collection.aggregate(*args, **kwargs))
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+        return call
+
+class AsyncMongoDB:
+    def __init__(self, database):
+        self.database = database
+
+    def __getattr__(self, name):
+        return AsyncCollection(self.database[name])
+
+@pytest.fixture
+def client(tmp_path):
+    db_path = tmp_path / "hub.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        session.add_all([
+            KSB(id=1, code="K1", description="Data modelling and database design"),
+            KSB(id=2, code="S2", description="Building data pipelines"),
+            KSB(id=3, code="B3", description="Working with stakeholders"),
+        ])
+        session.commit()
+    engine.dispose()
+    ksb_catalogue.invalidate()
+
+    # NullPool closes each aiosqlite connection with its session, so no worker thread outlives the test
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    mongo_db = AsyncMongoDB(mongomock.MongoClient().apprentice_hub)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (ksbs, evidence, dashboard):
+        app.include_router(module.router, prefix="/api")
+    app.dependency_overrides[get_async_db] = override_db
+    app.dependency_overrides[get_async_mongo_db] = lambda: mongo_db
+    with TestClient(app) as test_client:
+        yield test_client
+    ksb_catalogue.invalidate()
+
+def _create(client, title, ksb_ids, user_id=1):
+    response = client.post("/api/evidence/", json={
+        "title": title, "content": f"{title}\nNotes", "user_id": user_id, "ksb_ids": ksb_ids
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_evidence_is_created_listed_and_counted_per_ksb(client):
+    """
+    Tests that the async routers store evidence in Mongo and its KSB links
+    in the async session, page through it by cursor and count coverage.
+    """
+    created = [_create(client, f"Evidence {i}", [1, 2] if i % 2 else [3]) for i in range(5)]
+    assert created[1]["ksb_ids"] == [1, 2]
+
+    first = client.get("/api/evidence/", params={"user_id": 1, "limit": 3})
+    assert first.status_code == 200
+    second = client.get("/api/evidence/", params={"user_id": 1, "limit": 3, "after": first.headers["X-Next-Cursor"]})
+    titles = [item["title"] for item in first.json() + second.json()]
+    assert sorted(titles) == [f"Evidence {i}" for i in range(5)]
+
+    # Codes are matched regardless of case
+    tagged = client.get("/api/evidence/", params={"user_id": 1, "ksb": "s2"})
+    assert sorted(item["title"] for item in tagged.json()) == ["Evidence 1", "Evidence 3"]
+
+    listing = client.get("/api/ksbs/", params={"user_id": 1})
+    assert {ksb["code"]: ksb["evidence_count"] for ksb in listing.json()} == {"K1": 2, "S2": 2, "B3": 3}
+    cached = client.get("/api/ksbs/", params={"user_id": 1}, headers={"If-None-Match": listing.headers["ETag"]})
+    assert cached.status_code == 304
+
+    overview = client.get("/api/dashboard/overview", params={"user_id": 1})
+    assert overview.status_code == 200
+    assert overview.json()["stats"]["total_evidence"] == 5
+
+def test_evidence_rejects_unknown_ksbs_and_ids(client):
+    """
+    Tests the async routers' 400 and 404 responses.
+    """
+    response = client.post("/api/evidence/", json={"title": "t", "content": "c", "user_id": 1, "ksb_ids": [99]})
+    assert response.status_code == 400
+    assert client.get("/api/evidence/not-an-id").status_code == 400
+    assert client.get("/api/evidence/0123456789abcdef01234567").status_code == 404
+    assert client.get("/api/ksbs/99").status_code == 404
+
+def test_evidence_edits_are_versioned(client):
+    """
+    Tests that PATCH through the async router checks If-Match, relinks the
+    KSBs and keeps every earlier revision readable.
+    """
+    evidence_id = _create(client, "Pipeline", [1])["id"]
+    etag = client.get(f"/api/evidence/{evidence_id}").headers["ETag"]
+
+    edited = client.patch(f"/api/evidence/{evidence_id}", json={"content": "Rewritten", "ksb_ids": [2]},
+                          headers={"If-Match": etag})
+    assert edited.status_code == 200
+    assert edited.json()["revision"] == 2
+    assert edited.json()["ksb_ids"] == [2]
+
+    stale = client.patch(f"/api/evidence/{evidence_id}", json={"title": "Stale"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+
+    assert [item["revision"] for item in client.get(f"/api/evidence/{evidence_id}/revisions").json()] == [2, 1]
+    original = client.get(f"/api/evidence/{evidence_id}/revisions/1").json()
+    assert original["content"] == "Pipeline\nNotes"
+    assert original["ksb_ids"] == [1]
+
+    counts = {ksb["code"]: ksb["evidence_count"] for ksb in client.get("/api/ksbs/", params={"user_id": 1}).json()}
+    assert counts == {"K1": 0, "S2": 1, "B3": 0}
+
+def test_evidence_list_is_only_paginated_on_request(client):
+    """
+    Tests that a list without 'limit' or 'after' returns every item, and that
+    asking for pages uses the default page size.
+    """
+    items = [{"title": f"Bulk {i}", "content": "Notes", "user_id": 2, "ksb_ids": [1]} for i in range(105)]
+    assert client.post("/api/evidence/bulk", json={"items": items}).status_code == 200
+
+    everything = client.get("/api/evidence/", params={"user_id": 2})
+    assert len(everything.json()) == 105
+    assert "X-Next-Cursor" not in everything.headers
+
+    first = client.get("/api/evidence/", params={"user_id": 2, "limit": 100})
+    rest = client.get("/api/evidence/", params={"user_id": 2, "after": first.headers["X-Next-Cursor"]})
+    assert len(first.json()) == 100
+    assert [item["title"] for item in first.json() + rest.json()] == [item["title"] for item in everything.json()]
@@ -1,59 +1,78 @@
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from pymongo.database import Database
-from typing import List, Dict, Any
-from main import get_db, get_mongo_db
-from database.models.postgres_models import KSB, EvidenceKSBLink
-from api.schemas.ksb_schemas import KSBResponse
+from typing import Dict, Any, Optional
+from api.dependencies import get_db, get_mongo_db
+from api.services.coverage import coverage_stamp, load_cohort_coverage, load_ksb_coverage
+from api.services.dashboard import (
+    build_cohort_matrix,
+    build_dashboard_overview,
+    load_cohort_evidence_counts,
+    parse_user_ids,
+)
+from api.services.etags import DASHBOARD_CACHE_CONTROL, make_etag, not_modified, set_cache_headers
+from api.services.ksb_catalogue import ksb_catalogue
+from api.services.otj_hours import DEFAULT_CONTRACTED_HOURS_PER_WEEK, load_cohort_otj_totals, utc_today
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
 @router.get("/overview")
 def get_dashboard_overview(
     user_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     mongo_db: Database = Depends(get_mongo_db)
 ) -> Dict[str, Any]:
     """Get dashboard overview with KSB progress and stats"""
     
-    # Get all KSBs with evidence counts
-    ksbs = db.query(KSB).all()
-    ksb_progress = []
+    # Get total evidence for user
+    user_evidence_count = mongo_db.evidence.count_documents({"user_id": user_id})
     
-    total_evidence_count = 0
-    covered_ksbs = 0
+    # Answer from the version stamp alone when the client is up to date
+    etag = make_etag(
+        "dashboard", user_id, ksb_catalogue.get(db).version,
+        *coverage_stamp(db, user_id), user_evidence_count
+    )
+    cached = not_modified(if_none_match, etag, DASHBOARD_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, DASHBOARD_CACHE_CONTROL)
     
-    for ksb in ksbs:
-        evidence_count = len(ksb.evidence_links)
-        total_evidence_count += evidence_count
-        
-        if evidence_count > 0:
-            covered_ksbs += 1
-            
-        ksb_progress.append({
-            "id": ksb.id,
-            "code": ksb.code,
-            "description": ksb.description,
-            "evidence_count": evidence_count,
-            "status": "covered" if evidence_count > 0 else "not_covered"
-        })
+    # Read the user's evidence count for every KSB from the coverage counters
+    ksb_rows = load_ksb_coverage(db, user_id)
     
-    # Get total evidence for user
-    user_evidence_count = mongo_db.evidence.count_documents({"user_id": user_id})
+    return build_dashboard_overview(user_id, ksb_rows, user_evidence_count)
+
+@router.get("/cohort")
+def get_dashboard_cohort(
+    user_ids: str = Query(..., description="Comma-separated user ids, e.g. 1,2,3"),
+    contracted_hours_per_week: float = Query(DEFAULT_CONTRACTED_HOURS_PER_WEEK, gt=0),
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+) -> Dict[str, Any]:
+    """
+    Get KSB coverage, evidence totals and off-the-job hours for many users.
+
+    Each row's 'ksb_evidence' lists the user's evidence count per KSB, in
+    the order of the 'ksbs' columns. The cost is one coverage query, one
+    off-the-job aggregate and one MongoDB aggregation, whatever the cohort size.
+    """
+    
+    try:
+        cohort = parse_user_ids(user_ids)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
-    # Calculate coverage percentage
-    total_ksbs = len(ksbs)
-    coverage_percentage = (covered_ksbs / total_ksbs * 100) if total_ksbs > 0 else 0
+    today = utc_today()
+    catalogue = ksb_catalogue.get(db)
+    coverage = load_cohort_coverage(db, cohort)
+    otj_totals = load_cohort_otj_totals(db, cohort, today)
+    evidence_counts = load_cohort_evidence_counts(mongo_db, cohort)
     
-    return {
-        "user_id": user_id,
-        "stats": {
-            "total_ksbs": total_ksbs,
-            "covered_ksbs": covered_ksbs,
-            "coverage_percentage": round(coverage_percentage, 1),
-            "total_evidence": user_evidence_count,
-            "total_evidence_links": total_evidence_count
-        },
-        "ksb_progress": ksb_progress
-    }
+    return build_cohort_matrix(
+        cohort, catalogue, coverage, evidence_counts, otj_totals, today, contracted_hours_per_week
+    )
@@ -1,78 +1,215 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
 from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime
-from main import get_db, get_mongo_db
-from database.models.postgres_models import EvidenceKSBLink, KSB
-from api.schemas.evidence_schemas import EvidenceCreate, EvidenceResponse, EvidenceUpdate
+from api.dependencies import get_db, get_mongo_db
+from database.models.postgres_models import EvidenceKSBLink
+from api.schemas.evidence_schemas import (
+    EvidenceBulkCreate,
+    EvidenceBulkResponse,
+    EvidenceCreate,
+    EvidenceCreateResponse,
+    EvidenceResponse,
+    EvidenceRevision,
+    EvidenceRevisionSummary,
+    EvidenceSearchResult,
+    EvidenceUpdate,
+    KSBSuggestion,
+    KSBSuggestionRequest,
+)
+from api.services.coverage import apply_added_links, apply_link_changes, replace_links
+from api.services.etags import EVIDENCE_CACHE_CONTROL, etag_matches, make_etag, not_modified, set_cache_headers
+from api.services.evidence_fields import VIEWS, fields_projection, select_fields, to_sparse_item
+from api.services.evidence_links import document_ksb_ids, link_diff
+from api.services.evidence_pagination import (
+    DEFAULT_PAGE_SIZE,
+    KEYSET_SORT,
+    MAX_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    apply_keyset,
+    encode_cursor,
+    iter_batches,
+)
+from api.services.evidence_search import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    SEARCH_PROJECTION,
+    SEARCH_SORT,
+    search_filter,
+    search_terms,
+    to_search_result,
+)
+from api.services.evidence_revisions import (
+    discard_revision_record,
+    list_revisions,
+    load_revision,
+    revision_record,
+    save_revision_record,
+)
+from api.services.evidence_writes import (
+    BulkEvidencePlan,
+    evidence_changes,
+    evidence_restore,
+    evidence_update,
+    new_evidence_document,
+    versioned_filter,
+)
+from api.services.ksb_catalogue import ksb_catalogue
+from api.services.ksb_suggestions import (
+    DEFAULT_MIN_SCORE,
+    DEFAULT_SUGGESTIONS,
+    MAX_SUGGESTIONS,
+    evidence_text,
+    ksb_vectors,
+    scan_portfolio,
+    suggestion_item,
+)
 
 router = APIRouter(prefix="/evidence", tags=["Evidence"])
 
-@router.post("/", response_model=EvidenceResponse)
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+@router.post("/", response_model=EvidenceCreateResponse)
 def create_evidence(
     evidence: EvidenceCreate,
+    suggest_ksbs: bool = False,
     db: Session = Depends(get_db),
     mongo_db: Database = Depends(get_mongo_db)
 ):
-    """Create new evidence entry"""
+    """
+    Create new evidence entry.
+
+    Every KSB id is checked before anything is written. The document, which
+    records its KSB ids, goes to MongoDB first; the links and coverage
+    counters then commit in one PostgreSQL transaction. If that fails the
+    document is removed, and a crash in between is repaired by
+    scripts/reconcile_evidence.py.
+
+    Pass 'suggest_ksbs=true' to also get the KSBs the evidence matches but
+    is not tagged with, as in POST /suggest-ksbs.
+    """
+    
+    # Verify every KSB exists against the cached catalogue before writing anything
+    catalogue = ksb_catalogue.get(db)
+    missing_ksb_ids = catalogue.missing_ids(evidence.ksb_ids)
+    if missing_ksb_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"KSB with id {missing_ksb_ids[0]} not found"
+        )
     
     # Create evidence document in MongoDB
-    evidence_doc = {
-        "user_id": evidence.user_id,
-        "project_id": evidence.project_id,
-        "title": evidence.title,
-        "content_type": evidence.content_type,
-        "content": evidence.content,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow()
-    }
+    evidence_doc = new_evidence_document(evidence, datetime.utcnow())
+    ksb_ids = evidence_doc["ksb_ids"]
     
     result = mongo_db.evidence.insert_one(evidence_doc)
     evidence_id = str(result.inserted_id)
     
-    # Create KSB links in PostgreSQL
-    for ksb_id in evidence.ksb_ids:
-        # Verify KSB exists
-        ksb = db.query(KSB).filter(KSB.id == ksb_id).first()
-        if not ksb:
-            # Rollback MongoDB insert if KSB doesn't exist
-            mongo_db.evidence.delete_one({"_id": result.inserted_id})
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"KSB with id {ksb_id} not found"
-            )
-        
-        link = EvidenceKSBLink(evidence_id=evidence_id, ksb_id=ksb_id)
-        db.add(link)
-    
-    db.commit()
-    
-    # Get the created evidence
-    created_evidence = mongo_db.evidence.find_one({"_id": result.inserted_id})
-    
-    return EvidenceResponse(
-        id=evidence_id,
-        user_id=created_evidence["user_id"],
-        project_id=created_evidence.get("project_id"),
-        title=created_evidence["title"],
-        content_type=created_evidence["content_type"],
-        content=created_evidence["content"],
-        ksb_ids=evidence.ksb_ids,
-        created_at=created_evidence["created_at"],
-        updated_at=created_evidence["updated_at"]
-    )
+    # Create KSB links and update coverage counters in one transaction
+    try:
+        for ksb_id in ksb_ids:
+            link = EvidenceKSBLink(evidence_id=evidence_id, ksb_id=ksb_id)
+            db.add(link)
+        apply_link_changes(db, evidence.user_id, added_ksb_ids=ksb_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Remove the document so no evidence is left without its links
+        mongo_db.evidence.delete_one({"_id": result.inserted_id})
+        raise
+    
+    # insert_one set the _id on the document, so no read-back is needed
+    created = EvidenceCreateResponse.from_document(evidence_doc, ksb_ids)
+    if suggest_ksbs:
+        suggestions = ksb_vectors.get(catalogue).suggest(evidence_text(evidence_doc), exclude=ksb_ids)
+        created.suggested_ksbs = [KSBSuggestion(**suggestion_item(suggestion)) for suggestion in suggestions]
+    return created
+
+@router.post("/bulk", response_model=EvidenceBulkResponse)
+def create_evidence_bulk(
+    bulk: EvidenceBulkCreate,
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """
+    Create many evidence entries in one request.
+
+    Every item's KSB ids are validated up front, valid documents are written
+    with one unordered insert_many, and all KSB links with one multi-row
+    insert. The response reports success or failure for each item by index.
+    """
+    
+    # Validate every item against the cached KSB catalogue before writing anything
+    plan = BulkEvidencePlan(bulk.items, ksb_catalogue.get(db))
+    if not plan.documents:
+        return plan.response()
+    
+    try:
+        mongo_db.evidence.insert_many(plan.documents, ordered=False)
+    except BulkWriteError as e:
+        plan.record_write_errors(e)
+    
+    # Create all KSB links and update coverage counters in one transaction
+    link_rows = plan.link_rows()
+    try:
+        if link_rows:
+            db.execute(insert(EvidenceKSBLink), link_rows)
+        apply_added_links(db, plan.coverage_pairs())
+        db.commit()
+    except Exception:
+        db.rollback()
+        # Remove the documents so no evidence is left without its links
+        mongo_db.evidence.delete_many({"_id": {"$in": plan.inserted_ids()}})
+        raise
+    
+    return plan.response()
 
 @router.get("/", response_model=List[EvidenceResponse])
 def get_evidence_list(
+    response: Response,
     user_id: Optional[int] = None,
     project_id: Optional[int] = None,
+    ksb: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    view: Optional[str] = Query(None, enum=list(VIEWS)),
+    accept: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     mongo_db: Database = Depends(get_mongo_db)
 ):
-    """Get list of evidence with optional filtering"""
+    """
+    Get list of evidence with optional filtering.
+
+    Results are ordered by (created_at, _id). Without 'limit' or 'after'
+    every matching record is returned. With either, results are paginated
+    with a keyset cursor ('limit' defaults to 100): pass the X-Next-Cursor
+    header of one page as 'after' to get the next. Send
+    'Accept: application/x-ndjson' to stream every matching record (or at
+    most 'limit') as newline-delimited JSON instead.
+
+    Pass 'view=summary' to get a stored excerpt and content_length in place
+    of the content, or 'fields' (e.g. fields=title,ksb_ids) to choose the
+    fields of each item. Only the selected fields are read from MongoDB.
+    Pass 'ksb' one or more times (e.g. ksb=K23) to only list evidence
+    tagged with any of those KSBs.
+    """
+    
+    try:
+        selected_fields = select_fields(fields, view)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     # Build MongoDB query
     query = {}
@@ -80,69 +217,345 @@ def get_evidence_list(
         query["user_id"] = user_id
     if project_id:
         query["project_id"] = project_id
+    if ksb:
+        # Resolve codes with the cached catalogue; the tags themselves are on the documents
+        query["ksb_ids"] = {"$in": ksb_catalogue.get(db).ids_for_codes(ksb)}
+    
+    try:
+        query = apply_keyset(query, after)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    projection = fields_projection(selected_fields) if selected_fields else None
+    cursor = mongo_db.evidence.find(query, projection).sort(KEYSET_SORT)
+    
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        if limit:
+            cursor = cursor.limit(limit)
+        return StreamingResponse(
+            _stream_evidence(cursor.batch_size(STREAM_BATCH_SIZE), db, selected_fields),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    
+    if limit is None and after is None:
+        # Unpaginated requests get every match, as before pagination was added
+        evidence_docs = list(cursor)
+    else:
+        # Fetch one extra document to learn whether there is a next page
+        page_size = limit or DEFAULT_PAGE_SIZE
+        evidence_docs = list(cursor.limit(page_size + 1))
+        if len(evidence_docs) > page_size:
+            evidence_docs = evidence_docs[:page_size]
+            response.headers["X-Next-Cursor"] = encode_cursor(evidence_docs[-1])
     
-    evidence_docs = list(mongo_db.evidence.find(query))
-    evidence_responses = []
-    
-    for doc in evidence_docs:
-        evidence_id = str(doc["_id"])
-        
-        # Get KSB links from PostgreSQL
-        ksb_links = db.query(EvidenceKSBLink).filter(
-            EvidenceKSBLink.evidence_id == evidence_id
-        ).all()
-        ksb_ids = [link.ksb_id for link in ksb_links]
-        
-        evidence_responses.append(EvidenceResponse(
-            id=evidence_id,
-            user_id=doc["user_id"],
-            project_id=doc.get("project_id"),
-            title=doc["title"],
-            content_type=doc["content_type"],
-            content=doc["content"],
-            ksb_ids=ksb_ids,
-            created_at=doc["created_at"],
-            updated_at=doc["updated_at"]
-        ))
-    
-    return evidence_responses
+    if selected_fields:
+        # Serialize plain dicts directly; the response model would demand the content
+        items = _sparse_items(evidence_docs, db, selected_fields)
+        return Response(content=to_json(items), media_type="application/json", headers=dict(response.headers))
+    
+    # KSB ids are stored on the documents; only untagged legacy evidence needs the link table
+    ksb_ids_by_evidence = document_ksb_ids(db, evidence_docs)
+    
+    return [
+        EvidenceResponse.from_document(doc, ksb_ids_by_evidence[str(doc["_id"])])
+        for doc in evidence_docs
+    ]
+
+def _sparse_items(evidence_docs, db: Session, selected_fields: Tuple[str, ...]) -> List[dict]:
+    """Build the selected fields of each document, resolving KSB links only if they were asked for"""
+    ksb_ids_by_evidence = {}
+    if "ksb_ids" in selected_fields:
+        ksb_ids_by_evidence = document_ksb_ids(db, evidence_docs)
+    return [
+        to_sparse_item(doc, selected_fields, ksb_ids_by_evidence.get(str(doc["_id"])))
+        for doc in evidence_docs
+    ]
+
+def _stream_evidence(cursor, db: Session, selected_fields: Optional[Tuple[str, ...]] = None) -> Iterator[str]:
+    """Yield evidence as NDJSON lines, resolving KSB links one batch at a time"""
+    try:
+        for batch in iter_batches(cursor, STREAM_BATCH_SIZE):
+            if selected_fields:
+                for item in _sparse_items(batch, db, selected_fields):
+                    yield to_json(item).decode("utf-8") + "\n"
+                continue
+            ksb_ids_by_evidence = document_ksb_ids(db, batch)
+            for doc in batch:
+                evidence = EvidenceResponse.from_document(doc, ksb_ids_by_evidence[str(doc["_id"])])
+                yield evidence.model_dump_json() + "\n"
+    finally:
+        # The stream can outlive the request dependency, so release the connection here
+        db.close()
+
+@router.get("/search", response_model=List[EvidenceSearchResult])
+def search_evidence(
+    q: str = Query(..., min_length=1),
+    ksb: Optional[List[str]] = Query(None),
+    user_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """
+    Search evidence titles and content, ranked by relevance.
+
+    'q' uses MongoDB text search syntax ("exact phrase", -excluded). Pass
+    'ksb' one or more times (e.g. ksb=K23) to only return evidence linked
+    to any of those KSBs.
+    """
+    
+    # Resolve the KSB codes with the cached catalogue and filter on the documents' tags
+    ksb_ids = None
+    if ksb:
+        ksb_ids = ksb_catalogue.get(db).ids_for_codes(ksb)
+        if not ksb_ids:
+            return []
+    
+    query = search_filter(q, user_id, project_id, ksb_ids)
+    evidence_docs = list(
+        mongo_db.evidence.find(query, SEARCH_PROJECTION)
+        .sort(SEARCH_SORT).skip(offset).limit(limit)
+    )
+    
+    ksb_ids_by_evidence = document_ksb_ids(db, evidence_docs)
+    terms = search_terms(q)
+    
+    return [
+        to_search_result(doc, ksb_ids_by_evidence[str(doc["_id"])], terms)
+        for doc in evidence_docs
+    ]
+
+@router.post("/suggest-ksbs", response_model=List[KSBSuggestion])
+def suggest_ksbs_for_text(
+    evidence: KSBSuggestionRequest,
+    top_k: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    min_score: float = Query(DEFAULT_MIN_SCORE, ge=0, le=1),
+    db: Session = Depends(get_db)
+):
+    """
+    Suggest KSBs for evidence text, best match first.
+
+    The title and content are scored against every KSB description with
+    TF-IDF cosine similarity. KSBs listed in 'ksb_ids' are not suggested.
+    Nothing is stored, so this can be called while the evidence is drafted.
+    """
+    
+    # The KSB vectors are built once per catalogue version and shared by every request
+    model = ksb_vectors.get(ksb_catalogue.get(db))
+    suggestions = model.suggest(evidence_text(evidence.model_dump()), top_k, min_score, exclude=evidence.ksb_ids)
+    return [suggestion_item(suggestion) for suggestion in suggestions]
+
+@router.get("/suggest-ksbs")
+def suggest_ksbs_for_portfolio(
+    user_id: int,
+    top_k: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS),
+    min_score: float = Query(DEFAULT_MIN_SCORE, ge=0, le=1),
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+) -> Dict[str, Any]:
+    """
+    Re-score all of a user's evidence against every KSB.
+
+    'gaps' lists each KSB that no evidence is tagged with, with the
+    evidence that matches it best. 'evidence' lists, for each item, the
+    KSBs it matches but is not tagged with. Evidence is read in batches and
+    each batch is scored with one matrix product.
+    """
+    
+    catalogue = ksb_catalogue.get(db)
+    return scan_portfolio(db, mongo_db, catalogue, user_id, top_k, min_score)
 
 @router.get("/{evidence_id}", response_model=EvidenceResponse)
 def get_evidence(
     evidence_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     mongo_db: Database = Depends(get_mongo_db)
 ):
     """Get specific evidence by ID"""
     
     try:
-        doc = mongo_db.evidence.find_one({"_id": ObjectId(evidence_id)})
+        object_id = ObjectId(evidence_id)
     except:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid evidence ID format"
         )
     
+    # Read only the version stamp first, so an up-to-date client costs one small lookup
+    stamp = mongo_db.evidence.find_one({"_id": object_id}, {"updated_at": 1})
+    if not stamp:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evidence not found"
+        )
+    
+    etag = make_etag("evidence", evidence_id, stamp["updated_at"].isoformat())
+    cached = not_modified(if_none_match, etag, EVIDENCE_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, EVIDENCE_CACHE_CONTROL)
+    
+    doc = mongo_db.evidence.find_one({"_id": object_id})
     if not doc:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Evidence not found"
         )
     
-    # Get KSB links
-    ksb_links = db.query(EvidenceKSBLink).filter(
-        EvidenceKSBLink.evidence_id == evidence_id
-    ).all()
-    ksb_ids = [link.ksb_id for link in ksb_links]
-    
-    return EvidenceResponse(
-        id=evidence_id,
-        user_id=doc["user_id"],
-        project_id=doc.get("project_id"),
-        title=doc["title"],
-        content_type=doc["content_type"],
-        content=doc["content"],
-        ksb_ids=ksb_ids,
-        created_at=doc["created_at"],
-        updated_at=doc["updated_at"]
-    )
+    # KSB ids are stored on the document, unless it predates that
+    ksb_ids = document_ksb_ids(db, [doc])[evidence_id]
+    
+    return EvidenceResponse.from_document(doc, ksb_ids)
+
+@router.patch("/{evidence_id}", response_model=EvidenceResponse)
+def update_evidence(
+    evidence_id: str,
+    update: EvidenceUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """
+    Edit evidence, changing only the fields that are sent.
+
+    The previous version is kept in the revision history as a delta, and
+    only the KSB links that were added or removed are written. Send the
+    ETag from a GET as If-Match to reject the edit if the evidence has
+    changed since it was read.
+    """
+    
+    object_id = _object_id(evidence_id)
+    requested = update.model_dump(exclude_unset=True, exclude_none=True)
+    
+    # Verify every KSB exists against the cached catalogue before writing anything
+    if "ksb_ids" in requested:
+        missing_ksb_ids = ksb_catalogue.get(db).missing_ids(requested["ksb_ids"])
+        if missing_ksb_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"KSB with id {missing_ksb_ids[0]} not found"
+            )
+    
+    doc = mongo_db.evidence.find_one({"_id": object_id})
+    if not doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evidence not found"
+        )
+    
+    etag = make_etag("evidence", evidence_id, doc["updated_at"].isoformat())
+    if if_match and not etag_matches(if_match, etag):
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Evidence has changed since it was read"
+        )
+    
+    # Evidence written before KSB ids were stored on it gets them from the link table
+    doc["ksb_ids"] = document_ksb_ids(db, [doc])[evidence_id]
+    changes = evidence_changes(doc, requested)
+    if not changes:
+        set_cache_headers(response, etag, EVIDENCE_CACHE_CONTROL)
+        return EvidenceResponse.from_document(doc, doc["ksb_ids"])
+    
+    # Store the history entry first: only one edit of a revision can claim it,
+    # and an edit that fails later leaves at most an entry nobody reads
+    now = datetime.utcnow()
+    record = revision_record(doc, changes, now)
+    if not save_revision_record(mongo_db, doc, record):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Evidence was changed by another request; fetch it and try again"
+        )
+    
+    # Apply the edit only if nobody else has saved a new revision since the read
+    changed = evidence_update(doc, changes, now)
+    try:
+        result = mongo_db.evidence.update_one(versioned_filter(doc), {"$set": changed})
+    except Exception:
+        discard_revision_record(mongo_db, record)
+        raise
+    if result.matched_count == 0:
+        discard_revision_record(mongo_db, record)
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Evidence was changed by another request; fetch it and try again"
+        )
+    
+    # Write only the link rows that changed, with their coverage counters
+    if "ksb_ids" in changes:
+        added_ksb_ids, removed_ksb_ids = link_diff(changes["ksb_ids"], doc["ksb_ids"])
+        try:
+            replace_links(db, evidence_id, doc["user_id"], added_ksb_ids, removed_ksb_ids)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the document back so it agrees with its links again
+            mongo_db.evidence.update_one(
+                {"_id": object_id, "revision": changed["revision"]}, evidence_restore(doc, changed)
+            )
+            discard_revision_record(mongo_db, record)
+            raise
+    
+    updated = {**doc, **changed}
+    set_cache_headers(response, make_etag("evidence", evidence_id, updated["updated_at"].isoformat()), EVIDENCE_CACHE_CONTROL)
+    return EvidenceResponse.from_document(updated, updated["ksb_ids"])
+
+@router.get("/{evidence_id}/revisions", response_model=List[EvidenceRevisionSummary])
+def get_evidence_revisions(
+    evidence_id: str,
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """List every revision of an evidence entry, newest first"""
+    
+    doc = mongo_db.evidence.find_one({"_id": _object_id(evidence_id)}, {"revision": 1, "updated_at": 1})
+    if not doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evidence not found"
+        )
+    
+    return list_revisions(mongo_db, doc)
+
+@router.get("/{evidence_id}/revisions/{revision}", response_model=EvidenceRevision)
+def get_evidence_revision(
+    evidence_id: str,
+    revision: int,
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """Get an earlier version of an evidence entry, rebuilt from the revision history"""
+    
+    doc = mongo_db.evidence.find_one({"_id": _object_id(evidence_id)})
+    if not doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Evidence not found"
+        )
+    doc["ksb_ids"] = document_ksb_ids(db, [doc])[evidence_id]
+    
+    try:
+        version = load_revision(mongo_db, doc, revision)
+    except LookupError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    
+    return EvidenceRevision(id=evidence_id, **version)
+
+def _object_id(evidence_id: str) -> ObjectId:
+    try:
+        return ObjectId(evidence_id)
+    except InvalidId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid evidence ID format"
+        )
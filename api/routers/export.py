@@ -0,0 +1,89 @@
+from fastapi import APIRouter, Depends, Header, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from pymongo.database import Database
+from typing import Iterator, Optional
+from api.dependencies import get_db, get_mongo_db
+from api.services.byte_ranges import content_range, parse_range, slice_chunks, unsatisfied_range
+from api.services.etags import EXPORT_CACHE_CONTROL, not_modified
+from api.services.portfolio_export import (
+    PORTFOLIO_MEDIA_TYPE,
+    archive_sizes,
+    iter_portfolio,
+    load_portfolio_context,
+    portfolio_etag,
+)
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+@router.get("/portfolio")
+def export_portfolio(
+    user_id: int,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    mongo_db: Database = Depends(get_mongo_db)
+):
+    """
+    Download a user's portfolio for end-point assessment as a zip of
+    markdown files: an index, one file per KSB listing its evidence, and
+    one file per evidence item.
+
+    The archive is streamed as it is built, so memory use does not grow
+    with the portfolio. It is the same bytes for as long as the ETag is
+    unchanged, so an interrupted download can be resumed with a Range
+    header (send the ETag as If-Range).
+    """
+
+    context = load_portfolio_context(db, mongo_db, user_id)
+    etag = portfolio_etag(context)
+    cached = not_modified(if_none_match, etag, EXPORT_CACHE_CONTROL)
+    if cached:
+        return cached
+
+    headers = {
+        "ETag": etag,
+        "Cache-Control": EXPORT_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="portfolio-{user_id}.zip"',
+    }
+
+    # A range only applies to the archive the client started from; otherwise send it all
+    if not range_header or (if_range and if_range.strip() != etag):
+        chunks = archive_sizes.measured(iter_portfolio(db, mongo_db, context), etag)
+        return StreamingResponse(_stream_portfolio(chunks, db), media_type=PORTFOLIO_MEDIA_TYPE, headers=headers)
+
+    # The full size is only known once the archive has been built, so measure it if no earlier download did
+    size = archive_sizes.get(etag)
+    if size is None:
+        size = sum(len(chunk) for chunk in iter_portfolio(db, mongo_db, context))
+        archive_sizes.set(etag, size)
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={**headers, "Content-Range": unsatisfied_range(size)}
+        )
+    if byte_range is None:
+        chunks = archive_sizes.measured(iter_portfolio(db, mongo_db, context), etag)
+        return StreamingResponse(_stream_portfolio(chunks, db), media_type=PORTFOLIO_MEDIA_TYPE, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = content_range(start, end, size)
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _stream_portfolio(slice_chunks(iter_portfolio(db, mongo_db, context), start, end), db),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=PORTFOLIO_MEDIA_TYPE,
+        headers=headers
+    )
+
+def _stream_portfolio(chunks: Iterator[bytes], db: Session) -> Iterator[bytes]:
+    try:
+        yield from chunks
+    finally:
+        # The stream can outlive the request dependency, so release the connection here
+        db.close()
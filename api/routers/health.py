@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Request, Response, status
+from typing import Any, Dict
+from api.services.health import check_readiness
+
+# Serves both database modes: the probes use whichever clients the lifespan handler created
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/live")
+def liveness() -> Dict[str, Any]:
+    """Liveness probe: the process is serving requests. Never touches a database, so an outage does not restart pods"""
+    return {"status": "alive"}
+
+@router.get("")
+@router.get("/ready")
+async def readiness(request: Request, response: Response) -> Dict[str, Any]:
+    """Readiness probe: ping PostgreSQL and MongoDB, with latency and pool usage. Returns 503 unless both answer in time"""
+    report = await check_readiness(request.app.state)
+    if report["status"] != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
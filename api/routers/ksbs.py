@@ -1,29 +1,43 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from main import get_db
+from typing import List, Optional
+from api.dependencies import get_db
 from database.models.postgres_models import KSB
 from api.schemas.ksb_schemas import KSBCreate, KSBResponse
+from api.services.coverage import coverage_stamp, load_ksb_coverage
+from api.services.etags import KSB_CACHE_CONTROL, make_etag, not_modified, set_cache_headers
+from api.services.ksb_catalogue import bump_ksb_catalogue_version, ksb_catalogue
 
 router = APIRouter(prefix="/ksbs", tags=["KSBs"])
 
 @router.get("/", response_model=List[KSBResponse])
-def get_all_ksbs(db: Session = Depends(get_db)):
-    """Get all KSBs with evidence count"""
-    ksbs = db.query(KSB).all()
-    ksb_responses = []
+def get_all_ksbs(
+    response: Response,
+    user_id: Optional[int] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """Get all KSBs with evidence count, optionally for a single user"""
+    # Answer from the version stamp alone when the client is up to date
+    catalogue = ksb_catalogue.get(db)
+    etag = make_etag("ksbs", user_id, catalogue.version, *coverage_stamp(db, user_id))
+    cached = not_modified(if_none_match, etag, KSB_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, KSB_CACHE_CONTROL)
     
-    for ksb in ksbs:
-        evidence_count = len(ksb.evidence_links)
-        ksb_responses.append(KSBResponse(
+    ksb_rows = load_ksb_coverage(db, user_id)
+    
+    return [
+        KSBResponse(
             id=ksb.id,
             code=ksb.code,
             description=ksb.description,
-            evidence_count=evidence_count
-        ))
-    
-    return ksb_responses
+            evidence_count=ksb.evidence_count
+        )
+        for ksb in ksb_rows
+    ]
 
 @router.post("/", response_model=KSBResponse)
 def create_ksb(ksb: KSBCreate, db: Session = Depends(get_db)):
@@ -38,8 +52,10 @@ def create_ksb(ksb: KSBCreate, db: Session = Depends(get_db)):
     
     db_ksb = KSB(code=ksb.code, description=ksb.description)
     db.add(db_ksb)
+    bump_ksb_catalogue_version(db)
     db.commit()
     db.refresh(db_ksb)
+    ksb_catalogue.invalidate()
     
     return KSBResponse(
         id=db_ksb.id,
@@ -49,16 +65,31 @@ def create_ksb(ksb: KSBCreate, db: Session = Depends(get_db)):
     )
 
 @router.get("/{ksb_id}", response_model=KSBResponse)
-def get_ksb(ksb_id: int, db: Session = Depends(get_db)):
+def get_ksb(
+    ksb_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
     """Get a specific KSB by ID"""
-    ksb = db.query(KSB).filter(KSB.id == ksb_id).first()
+    catalogue = ksb_catalogue.get(db)
+    ksb = catalogue.by_id.get(ksb_id)
     if not ksb:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="KSB not found"
         )
     
-    evidence_count = len(ksb.evidence_links)
+    # Answer from the version stamp alone when the client is up to date
+    stamp = coverage_stamp(db, ksb_id=ksb_id)
+    etag = make_etag("ksb", ksb_id, catalogue.version, *stamp)
+    cached = not_modified(if_none_match, etag, KSB_CACHE_CONTROL)
+    if cached:
+        return cached
+    set_cache_headers(response, etag, KSB_CACHE_CONTROL)
+    
+    # The stamp already holds the KSB's evidence total across all users
+    evidence_count = int(stamp[1] or 0)
     return KSBResponse(
         id=ksb.id,
         code=ksb.code,
@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Response
+from api.services.metrics import PROMETHEUS_CONTENT_TYPE, metrics
+
+router = APIRouter(tags=["Metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Expose request latency and database accounting in the Prometheus text format"""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
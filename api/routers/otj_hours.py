@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Optional
+from api.dependencies import get_db
+from api.schemas.otj_schemas import OTJComplianceResponse, OTJPeriodResponse, OTJWeekResponse
+from api.services.otj_hours import (
+    DEFAULT_CONTRACTED_HOURS_PER_WEEK, MONTH, WEEK,
+    load_otj_periods, monthly_hours, otj_compliance, utc_today, weekly_hours
+)
+
+router = APIRouter(prefix="/otj-hours", tags=["Off-the-job Hours"])
+
+@router.get("/weekly", response_model=List[OTJWeekResponse])
+def get_weekly_hours(
+    user_id: int,
+    weeks: int = Query(52, ge=1, le=520),
+    db: Session = Depends(get_db)
+):
+    """Get a user's off-the-job hours per week with the rolling 12-week average, most recent last"""
+    # Averages are computed over the full history before trimming to the requested weeks
+    return weekly_hours(load_otj_periods(db, user_id, WEEK))[-weeks:]
+
+@router.get("/monthly", response_model=List[OTJPeriodResponse])
+def get_monthly_hours(
+    user_id: int,
+    months: int = Query(12, ge=1, le=120),
+    db: Session = Depends(get_db)
+):
+    """Get a user's off-the-job hours per calendar month, most recent last"""
+    return monthly_hours(load_otj_periods(db, user_id, MONTH))[-months:]
+
+@router.get("/compliance", response_model=OTJComplianceResponse)
+def get_compliance(
+    user_id: int,
+    contracted_hours_per_week: float = Query(DEFAULT_CONTRACTED_HOURS_PER_WEEK, gt=0, le=168),
+    since: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Check a user's off-the-job hours against the 20% target over completed weeks"""
+    today = utc_today()
+    weeks = load_otj_periods(db, user_id, WEEK, today)
+    return otj_compliance(user_id, weeks, today, contracted_hours_per_week, since)
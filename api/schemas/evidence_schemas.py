@@ -1,6 +1,6 @@
 
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
 
 class EvidenceBase(BaseModel):
@@ -13,6 +13,9 @@ class EvidenceCreate(EvidenceBase):
     project_id: Optional[int] = None
     ksb_ids: List[int] = []
 
+class EvidenceBulkCreate(BaseModel):
+    items: List[EvidenceCreate] = Field(..., min_length=1, max_length=10000)
+
 class EvidenceUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -25,6 +28,72 @@ class EvidenceResponse(EvidenceBase):
     ksb_ids: List[int]
     created_at: datetime
     updated_at: datetime
+    revision: int = 1
     
     class Config:
         from_attributes = True
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any], ksb_ids: List[int]) -> "EvidenceResponse":
+        """Build a response from a MongoDB evidence document and its KSB ids"""
+        return cls(
+            id=str(doc["_id"]),
+            user_id=doc["user_id"],
+            project_id=doc.get("project_id"),
+            title=doc["title"],
+            content_type=doc["content_type"],
+            content=doc["content"],
+            ksb_ids=ksb_ids,
+            created_at=doc["created_at"],
+            updated_at=doc["updated_at"],
+            revision=doc.get("revision", 1)
+        )
+
+class KSBSuggestionRequest(BaseModel):
+    title: str = ""
+    content: str
+    # KSBs the evidence is already tagged with are not suggested again
+    ksb_ids: List[int] = []
+
+class KSBSuggestion(BaseModel):
+    ksb_id: int
+    code: str
+    description: Optional[str]
+    score: float
+
+class EvidenceCreateResponse(EvidenceResponse):
+    # Only filled in when suggestions are asked for
+    suggested_ksbs: Optional[List[KSBSuggestion]] = None
+
+class EvidenceRevisionSummary(BaseModel):
+    revision: int
+    updated_at: datetime
+
+class EvidenceRevision(BaseModel):
+    id: str
+    revision: int
+    title: str
+    content: str
+    ksb_ids: Optional[List[int]]
+    updated_at: datetime
+
+class EvidenceSearchResult(BaseModel):
+    id: str
+    user_id: int
+    project_id: Optional[int]
+    title: str
+    excerpt: str
+    score: float
+    ksb_ids: List[int]
+    created_at: datetime
+
+class EvidenceBulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "failed"]
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+class EvidenceBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[EvidenceBulkItemResult]
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import date
+
+class OTJPeriodResponse(BaseModel):
+    period_start: date
+    hours: float
+    log_count: int
+
+class OTJWeekResponse(OTJPeriodResponse):
+    rolling_average_hours: float
+
+class OTJComplianceResponse(BaseModel):
+    user_id: int
+    since: date
+    weeks_elapsed: int
+    contracted_hours_per_week: float
+    weekly_target_hours: float
+    target_hours: float
+    actual_hours: float
+    current_week_hours: float
+    rolling_average_hours: float
+    percentage_of_target: float
+    on_track: bool
@@ -0,0 +1,64 @@
+import re
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, Optional, Tuple
+
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Resolves a Range header against a body of the given size.
+
+    Only a single byte range is served. A header that is missing, malformed
+    or asks for several ranges returns None, so the full body is sent, as
+    RFC 9110 allows.
+
+    Returns:
+        Optional[Tuple[int, int]]: The first and last byte positions, inclusive.
+
+    Raises:
+        ValueError: If the range lies wholly beyond the end of the body (416).
+    """
+    match = _BYTE_RANGE.match((header or "").replace(" ", ""))
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # "bytes=-500" asks for the final 500 bytes
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError("Empty suffix range")
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(f"Range starts at {start}, beyond the {size} byte body")
+    return start, end
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end}/{size}"
+
+def unsatisfied_range(size: int) -> str:
+    return f"bytes */{size}"
+
+def slice_chunks(chunks: Iterable[bytes], start: int, end: int) -> Iterator[bytes]:
+    """Yield only bytes start..end (inclusive) of a chunked body, stopping once end is passed"""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end + 1 - position]
+        position = chunk_end
+        if position > end:
+            return
+
+async def aslice_chunks(chunks: AsyncIterable[bytes], start: int, end: int) -> AsyncIterator[bytes]:
+    """Async counterpart of slice_chunks"""
+    position = 0
+    async for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end + 1 - position]
+        position = chunk_end
+        if position > end:
+            return
@@ -0,0 +1,279 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from pymongo.database import Database
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.models.postgres_models import EvidenceKSBLink, KSBCoverage
+from api.services.dialects import upsert_insert
+from api.services.ksb_catalogue import KSBCatalogue, ksb_catalogue
+
+def _counter_upsert_statement(dialect_name: str, deltas: Counter):
+    """Build the counter upsert for (user_id, ksb_id) deltas, or None if they cancel out"""
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "ksb_id": ksb_id, "evidence_count": delta, "updated_at": now}
+        for (user_id, ksb_id), delta in sorted(deltas.items()) if delta != 0
+    ]
+    if not rows:
+        return None
+
+    stmt = upsert_insert(dialect_name)(KSBCoverage).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[KSBCoverage.user_id, KSBCoverage.ksb_id],
+        set_={
+            "evidence_count": KSBCoverage.evidence_count + stmt.excluded.evidence_count,
+            "updated_at": stmt.excluded.updated_at,
+        }
+    )
+
+def _link_deltas(user_id: int, added_ksb_ids: Iterable[int], removed_ksb_ids: Iterable[int]) -> Counter:
+    deltas = Counter((user_id, ksb_id) for ksb_id in added_ksb_ids)
+    deltas.subtract((user_id, ksb_id) for ksb_id in removed_ksb_ids)
+    return deltas
+
+def apply_link_changes(
+    db: Session,
+    user_id: int,
+    added_ksb_ids: Iterable[int] = (),
+    removed_ksb_ids: Iterable[int] = ()
+) -> None:
+    """
+    Adjusts a user's KSB coverage counters for added and removed evidence links.
+
+    The counters are upserted in one statement on the given session, so they
+    commit or roll back together with the link rows they describe.
+
+    Args:
+        db (Session): The PostgreSQL session holding the link changes.
+        user_id (int): The owner of the evidence whose links changed.
+        added_ksb_ids (Iterable[int]): KSB ids that gained a link, one entry per link.
+        removed_ksb_ids (Iterable[int]): KSB ids that lost a link, one entry per link.
+    """
+    stmt = _counter_upsert_statement(
+        db.get_bind().dialect.name, _link_deltas(user_id, added_ksb_ids, removed_ksb_ids)
+    )
+    if stmt is not None:
+        db.execute(stmt)
+
+async def apply_link_changes_async(
+    db: AsyncSession,
+    user_id: int,
+    added_ksb_ids: Iterable[int] = (),
+    removed_ksb_ids: Iterable[int] = ()
+) -> None:
+    """Async counterpart of apply_link_changes"""
+    stmt = _counter_upsert_statement(
+        db.get_bind().dialect.name, _link_deltas(user_id, added_ksb_ids, removed_ksb_ids)
+    )
+    if stmt is not None:
+        await db.execute(stmt)
+
+def apply_added_links(db: Session, user_ksb_pairs: Iterable[Tuple[int, int]]) -> None:
+    """
+    Increments the coverage counters for many users' new links with one upsert.
+
+    Args:
+        db (Session): The PostgreSQL session holding the new links.
+        user_ksb_pairs (Iterable[Tuple[int, int]]): One (user_id, ksb_id) pair per new link.
+    """
+    stmt = _counter_upsert_statement(db.get_bind().dialect.name, Counter(user_ksb_pairs))
+    if stmt is not None:
+        db.execute(stmt)
+
+async def apply_added_links_async(db: AsyncSession, user_ksb_pairs: Iterable[Tuple[int, int]]) -> None:
+    """Async counterpart of apply_added_links"""
+    stmt = _counter_upsert_statement(db.get_bind().dialect.name, Counter(user_ksb_pairs))
+    if stmt is not None:
+        await db.execute(stmt)
+
+def _replace_links_statements(evidence_id: str, added_ksb_ids: List[int], removed_ksb_ids: List[int]):
+    statements = []
+    if added_ksb_ids:
+        statements.append((insert(EvidenceKSBLink), [
+            {"evidence_id": evidence_id, "ksb_id": ksb_id} for ksb_id in added_ksb_ids
+        ]))
+    if removed_ksb_ids:
+        statements.append((delete(EvidenceKSBLink).where(
+            EvidenceKSBLink.evidence_id == evidence_id,
+            EvidenceKSBLink.ksb_id.in_(removed_ksb_ids)
+        ), None))
+    return statements
+
+def replace_links(
+    db: Session,
+    evidence_id: str,
+    user_id: int,
+    added_ksb_ids: List[int],
+    removed_ksb_ids: List[int]
+) -> None:
+    """
+    Inserts and deletes only the changed link rows of one evidence entry and
+    adjusts its owner's coverage counters, all on the given session.
+    """
+    for stmt, params in _replace_links_statements(evidence_id, added_ksb_ids, removed_ksb_ids):
+        db.execute(stmt, params)
+    apply_link_changes(db, user_id, added_ksb_ids=added_ksb_ids, removed_ksb_ids=removed_ksb_ids)
+
+async def replace_links_async(
+    db: AsyncSession,
+    evidence_id: str,
+    user_id: int,
+    added_ksb_ids: List[int],
+    removed_ksb_ids: List[int]
+) -> None:
+    """Async counterpart of replace_links"""
+    for stmt, params in _replace_links_statements(evidence_id, added_ksb_ids, removed_ksb_ids):
+        await db.execute(stmt, params)
+    await apply_link_changes_async(db, user_id, added_ksb_ids=added_ksb_ids, removed_ksb_ids=removed_ksb_ids)
+
+class KSBCoverageRow(NamedTuple):
+    id: int
+    code: str
+    description: str
+    evidence_count: int
+
+def _coverage_counts_statement(user_id: Optional[int]):
+    """Select (ksb_id, evidence_count) for the KSBs that have counters"""
+    if user_id is None:
+        return select(
+            KSBCoverage.ksb_id,
+            func.sum(KSBCoverage.evidence_count)
+        ).group_by(KSBCoverage.ksb_id)
+    return select(
+        KSBCoverage.ksb_id,
+        KSBCoverage.evidence_count
+    ).where(KSBCoverage.user_id == user_id)
+
+def _coverage_rows(catalogue: KSBCatalogue, counts) -> List[KSBCoverageRow]:
+    counts_by_ksb = {ksb_id: int(count or 0) for ksb_id, count in counts}
+    return [
+        KSBCoverageRow(ksb.id, ksb.code, ksb.description, counts_by_ksb.get(ksb.id, 0))
+        for ksb in catalogue.ksbs
+    ]
+
+def load_ksb_coverage(db: Session, user_id: Optional[int] = None) -> List[KSBCoverageRow]:
+    """
+    Reads the evidence count for every KSB from the coverage counters.
+
+    KSB codes and descriptions come from the cached catalogue, so only the
+    counter rows are read from the database.
+
+    Args:
+        db (Session): The PostgreSQL session.
+        user_id (Optional[int]): Restrict counts to this user. When omitted,
+                                 counts are summed across all users.
+
+    Returns:
+        List[KSBCoverageRow]: One row per KSB, ordered by KSB id.
+    """
+    catalogue = ksb_catalogue.get(db)
+    return _coverage_rows(catalogue, db.execute(_coverage_counts_statement(user_id)).all())
+
+async def load_ksb_coverage_async(db: AsyncSession, user_id: Optional[int] = None) -> List[KSBCoverageRow]:
+    """Async counterpart of load_ksb_coverage"""
+    catalogue = await ksb_catalogue.get_async(db)
+    counts = (await db.execute(_coverage_counts_statement(user_id))).all()
+    return _coverage_rows(catalogue, counts)
+
+def _cohort_coverage_statement(user_ids: List[int]):
+    return select(
+        KSBCoverage.user_id,
+        KSBCoverage.ksb_id,
+        KSBCoverage.evidence_count
+    ).where(KSBCoverage.user_id.in_(user_ids), KSBCoverage.evidence_count > 0)
+
+def _group_cohort_coverage(user_ids: List[int], rows) -> Dict[int, Dict[int, int]]:
+    coverage: Dict[int, Dict[int, int]] = {user_id: {} for user_id in user_ids}
+    for user_id, ksb_id, evidence_count in rows:
+        coverage[user_id][ksb_id] = evidence_count
+    return coverage
+
+def load_cohort_coverage(db: Session, user_ids: List[int]) -> Dict[int, Dict[int, int]]:
+    """
+    Reads the non-zero coverage counters of many users with a single query.
+
+    Returns:
+        Dict[int, Dict[int, int]]: Evidence counts keyed by user id, then KSB
+                                   id. Every requested user is present.
+    """
+    if not user_ids:
+        return {}
+    return _group_cohort_coverage(user_ids, db.execute(_cohort_coverage_statement(user_ids)).all())
+
+async def load_cohort_coverage_async(db: AsyncSession, user_ids: List[int]) -> Dict[int, Dict[int, int]]:
+    """Async counterpart of load_cohort_coverage"""
+    if not user_ids:
+        return {}
+    return _group_cohort_coverage(user_ids, (await db.execute(_cohort_coverage_statement(user_ids))).all())
+
+def _coverage_stamp_statement(user_id: Optional[int], ksb_id: Optional[int]):
+    stmt = select(
+        func.count(),
+        func.sum(KSBCoverage.evidence_count),
+        func.max(KSBCoverage.updated_at)
+    )
+    if user_id is not None:
+        stmt = stmt.where(KSBCoverage.user_id == user_id)
+    if ksb_id is not None:
+        stmt = stmt.where(KSBCoverage.ksb_id == ksb_id)
+    return stmt
+
+def coverage_stamp(db: Session, user_id: Optional[int] = None, ksb_id: Optional[int] = None) -> tuple:
+    """
+    Reads a cheap version stamp of the coverage counters: the number of
+    counter rows, their total and the latest update time. Any counter change
+    alters the stamp, which makes it suitable for building ETags.
+    """
+    return tuple(db.execute(_coverage_stamp_statement(user_id, ksb_id)).one())
+
+async def coverage_stamp_async(db: AsyncSession, user_id: Optional[int] = None, ksb_id: Optional[int] = None) -> tuple:
+    """Async counterpart of coverage_stamp"""
+    return tuple((await db.execute(_coverage_stamp_statement(user_id, ksb_id))).one())
+
+def rebuild_coverage(db: Session, mongo_db: Database, batch_size: int = 1000) -> int:
+    """
+    Recomputes every coverage counter from the evidence_ksb_link table.
+
+    Evidence owners are read from MongoDB in batches, and the links for each
+    batch are read with one set-based query. The counter table is then
+    replaced in a single transaction.
+
+    Args:
+        db (Session): The PostgreSQL session.
+        mongo_db (Database): The MongoDB database holding the evidence collection.
+        batch_size (int): Number of evidence documents resolved per link query.
+
+    Returns:
+        int: The number of coverage rows written.
+    """
+    totals = Counter()
+
+    def count_batch(owners):
+        rows = db.query(
+            EvidenceKSBLink.evidence_id,
+            EvidenceKSBLink.ksb_id
+        ).filter(EvidenceKSBLink.evidence_id.in_(list(owners))).all()
+        for evidence_id, ksb_id in rows:
+            totals[(owners[evidence_id], ksb_id)] += 1
+
+    owners = {}
+    cursor = mongo_db.evidence.find({}, {"_id": 1, "user_id": 1}).batch_size(batch_size)
+    for doc in cursor:
+        owners[str(doc["_id"])] = doc["user_id"]
+        if len(owners) >= batch_size:
+            count_batch(owners)
+            owners = {}
+    if owners:
+        count_batch(owners)
+
+    now = datetime.utcnow()
+    db.query(KSBCoverage).delete(synchronize_session=False)
+    if totals:
+        db.execute(KSBCoverage.__table__.insert(), [
+            {"user_id": user_id, "ksb_id": ksb_id, "evidence_count": count, "updated_at": now}
+            for (user_id, ksb_id), count in totals.items()
+        ])
+    db.commit()
+    return len(totals)
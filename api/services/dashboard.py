@@ -0,0 +1,123 @@
+from datetime import date
+from typing import Any, Dict, List
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from api.services.coverage import KSBCoverageRow
+from api.services.ksb_catalogue import KSBCatalogue
+from api.services.otj_hours import DEFAULT_CONTRACTED_HOURS_PER_WEEK, OTJTotals, otj_summary
+
+# Upper bound on the users in one cohort request, to keep the $in lists and the payload bounded
+MAX_COHORT_SIZE = 500
+
+def build_dashboard_overview(
+    user_id: int,
+    ksb_rows: List[KSBCoverageRow],
+    user_evidence_count: int
+) -> Dict[str, Any]:
+    """Assemble the dashboard overview payload from coverage rows and the user's evidence count"""
+    ksb_progress = []
+    
+    total_evidence_count = 0
+    covered_ksbs = 0
+    
+    for ksb in ksb_rows:
+        evidence_count = ksb.evidence_count
+        total_evidence_count += evidence_count
+        
+        if evidence_count > 0:
+            covered_ksbs += 1
+            
+        ksb_progress.append({
+            "id": ksb.id,
+            "code": ksb.code,
+            "description": ksb.description,
+            "evidence_count": evidence_count,
+            "status": "covered" if evidence_count > 0 else "not_covered"
+        })
+    
+    # Calculate coverage percentage
+    total_ksbs = len(ksb_rows)
+    coverage_percentage = (covered_ksbs / total_ksbs * 100) if total_ksbs > 0 else 0
+    
+    return {
+        "user_id": user_id,
+        "stats": {
+            "total_ksbs": total_ksbs,
+            "covered_ksbs": covered_ksbs,
+            "coverage_percentage": round(coverage_percentage, 1),
+            "total_evidence": user_evidence_count,
+            "total_evidence_links": total_evidence_count
+        },
+        "ksb_progress": ksb_progress
+    }
+
+def parse_user_ids(user_ids: str) -> List[int]:
+    """
+    Parses a comma-separated list of user ids, dropping repeats.
+
+    Raises:
+        ValueError: If an id is not an integer, or there are none or too many.
+    """
+    try:
+        parsed = list(dict.fromkeys(int(user_id) for user_id in user_ids.split(",") if user_id.strip()))
+    except ValueError:
+        raise ValueError("user_ids must be a comma-separated list of integers")
+    if not parsed:
+        raise ValueError("user_ids must list at least one user")
+    if len(parsed) > MAX_COHORT_SIZE:
+        raise ValueError(f"user_ids can list at most {MAX_COHORT_SIZE} users")
+    return parsed
+
+def _cohort_evidence_pipeline(user_ids: List[int]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"user_id": {"$in": user_ids}}},
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+    ]
+
+def load_cohort_evidence_counts(mongo_db: Database, user_ids: List[int]) -> Dict[int, int]:
+    """Counts the evidence of many users with one $group aggregation over the user_id index"""
+    counts = {user_id: 0 for user_id in user_ids}
+    for row in mongo_db.evidence.aggregate(_cohort_evidence_pipeline(user_ids)):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+async def load_cohort_evidence_counts_async(mongo_db: AsyncDatabase, user_ids: List[int]) -> Dict[int, int]:
+    """Async counterpart of load_cohort_evidence_counts"""
+    counts = {user_id: 0 for user_id in user_ids}
+    async for row in await mongo_db.evidence.aggregate(_cohort_evidence_pipeline(user_ids)):
+        counts[row["_id"]] = row["count"]
+    return counts
+
+def build_cohort_matrix(
+    user_ids: List[int],
+    catalogue: KSBCatalogue,
+    coverage: Dict[int, Dict[int, int]],
+    evidence_counts: Dict[int, int],
+    otj_totals: Dict[int, OTJTotals],
+    today: date,
+    contracted_hours_per_week: float = DEFAULT_CONTRACTED_HOURS_PER_WEEK
+) -> Dict[str, Any]:
+    """
+    Assemble the cohort payload: one row per user, with the evidence count
+    for each KSB given as a list in the order of the "ksbs" columns.
+    """
+    ksb_ids = [ksb.id for ksb in catalogue.ksbs]
+    total_ksbs = len(ksb_ids)
+    users = []
+    for user_id in user_ids:
+        counts = coverage.get(user_id, {})
+        ksb_evidence = [counts.get(ksb_id, 0) for ksb_id in ksb_ids]
+        covered_ksbs = sum(1 for count in ksb_evidence if count > 0)
+        users.append({
+            "user_id": user_id,
+            "total_evidence": evidence_counts.get(user_id, 0),
+            "covered_ksbs": covered_ksbs,
+            "coverage_percentage": round(covered_ksbs / total_ksbs * 100, 1) if total_ksbs else 0,
+            "otj": otj_summary(otj_totals[user_id], today, contracted_hours_per_week),
+            "ksb_evidence": ksb_evidence,
+        })
+
+    return {
+        "ksbs": [{"id": ksb.id, "code": ksb.code} for ksb in catalogue.ksbs],
+        "users": users,
+    }
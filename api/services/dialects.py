@@ -0,0 +1,27 @@
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def upsert_insert(dialect_name: str):
+    """Return the dialect's insert() construct, which offers on_conflict_do_update"""
+    return _UPSERT_INSERTS[dialect_name]
+
+def period_start_expression(dialect_name: str, period: str, column):
+    """
+    Return a SQL expression truncating a datetime column to the start of
+    its ISO week (Monday) or calendar month, for GROUP BY aggregates.
+
+    PostgreSQL returns a timestamp and SQLite a "YYYY-MM-DD" string.
+    The period is rendered as a literal so the expression is identical in
+    the SELECT and GROUP BY clauses.
+    """
+    if dialect_name == "postgresql":
+        return func.date_trunc(literal_column(f"'{period}'"), column)
+    if period == "week":
+        return func.date(column, literal_column("'weekday 0'"), literal_column("'-6 days'"))
+    return func.date(column, literal_column("'start of month'"))
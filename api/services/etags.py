@@ -0,0 +1,41 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Response, status
+
+# Cache-Control policies per route. These responses include per-user counts
+# that change as soon as evidence is saved, so clients may store them but
+# must revalidate every time; the ETag makes that a cheap 304.
+KSB_CACHE_CONTROL = "private, no-cache"
+DASHBOARD_CACHE_CONTROL = "private, no-cache"
+EVIDENCE_CACHE_CONTROL = "private, no-cache"
+EXPORT_CACHE_CONTROL = "private, no-cache"
+
+def make_etag(*stamp: Any) -> str:
+    """
+    Builds a strong ETag from a version stamp such as counts, versions and
+    last-modified times. Only the stamp is hashed, never the response body.
+    """
+    digest = hashlib.sha1("|".join(map(str, stamp)).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag, using the weak comparison RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified(if_none_match: Optional[str], etag: str, cache_control: str) -> Optional[Response]:
+    """Return a 304 response if the client already holds this ETag, otherwise None"""
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": cache_control}
+        )
+    return None
+
+def set_cache_headers(response: Response, etag: str, cache_control: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,101 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FULL_VIEW = "full"
+SUMMARY_VIEW = "summary"
+VIEWS = (FULL_VIEW, SUMMARY_VIEW)
+
+EXCERPT_LENGTH = 280
+
+# Every field a list response can carry; "excerpt" and "content_length" are
+# stored on the document at write time so lists never need the body
+LIST_FIELDS = (
+    "id",
+    "user_id",
+    "project_id",
+    "title",
+    "content_type",
+    "content",
+    "excerpt",
+    "content_length",
+    "ksb_ids",
+    "created_at",
+    "updated_at",
+)
+
+SUMMARY_FIELDS = tuple(field for field in LIST_FIELDS if field != "content")
+
+# Fields that are not stored on the evidence document under their own name
+_DERIVED_FIELDS = {"id"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+def content_summary(content: str, length: int = EXCERPT_LENGTH) -> Dict[str, Any]:
+    """
+    Builds the stored excerpt and length of an evidence body.
+
+    The excerpt is the start of the content with whitespace collapsed, cut
+    at a word boundary and marked with an ellipsis when it was shortened.
+    """
+    text = _WHITESPACE.sub(" ", content).strip()
+    if len(text) > length:
+        cut = text[:length]
+        if " " in cut:
+            cut = cut[:cut.rindex(" ")]
+        text = cut.rstrip() + "…"
+    return {"excerpt": text, "content_length": len(content)}
+
+def select_fields(fields: Optional[str] = None, view: Optional[str] = None) -> Optional[Tuple[str, ...]]:
+    """
+    Resolves the 'fields' and 'view' query parameters of an evidence list.
+
+    Args:
+        fields (Optional[str]): Comma-separated field names; takes precedence over view.
+        view (Optional[str]): "summary" for every field except the content, or "full".
+
+    Returns:
+        Optional[Tuple[str, ...]]: The fields to return in LIST_FIELDS order,
+                                   or None for full EvidenceResponse items.
+
+    Raises:
+        ValueError: If a field or the view is unknown.
+    """
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested - set(LIST_FIELDS))
+        if unknown:
+            raise ValueError(f"Unknown field(s) {', '.join(unknown)}, expected any of {', '.join(LIST_FIELDS)}")
+        # The id is always returned so items can be fetched in full
+        requested.add("id")
+        return tuple(field for field in LIST_FIELDS if field in requested)
+    if view is None or view == FULL_VIEW:
+        return None
+    if view == SUMMARY_VIEW:
+        return SUMMARY_FIELDS
+    raise ValueError(f"Unknown view {view!r}, expected one of {', '.join(VIEWS)}")
+
+def fields_projection(fields: Iterable[str]) -> Dict[str, int]:
+    """Build the MongoDB projection for the selected fields, keeping what the keyset cursor needs"""
+    projection = {field: 1 for field in fields if field not in _DERIVED_FIELDS}
+    projection["created_at"] = 1
+    return projection
+
+def to_sparse_item(
+    doc: Dict[str, Any],
+    fields: Iterable[str],
+    ksb_ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Builds a plain dict with only the selected fields, skipping the Pydantic
+    model a full response needs. Evidence written before excerpts were stored
+    has None for them until scripts/backfill_evidence_summaries.py has run.
+    """
+    item = {}
+    for field in fields:
+        if field == "id":
+            item["id"] = str(doc["_id"])
+        elif field == "ksb_ids":
+            item["ksb_ids"] = ksb_ids or []
+        else:
+            item[field] = doc.get(field)
+    return item
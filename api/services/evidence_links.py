@@ -0,0 +1,107 @@
+from typing import Any, Dict, Iterable, List, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.models.postgres_models import EvidenceKSBLink
+
+def _ksb_links_statement(evidence_ids: List[str]):
+    """Select the (evidence_id, ksb_id) pairs for the given evidence ids"""
+    return select(EvidenceKSBLink.evidence_id, EvidenceKSBLink.ksb_id).where(
+        EvidenceKSBLink.evidence_id.in_(evidence_ids)
+    ).order_by(EvidenceKSBLink.evidence_id, EvidenceKSBLink.ksb_id)
+
+def _group_ksb_ids(ksb_ids_by_evidence: Dict[str, List[int]], rows) -> Dict[str, List[int]]:
+    for evidence_id, ksb_id in rows:
+        ksb_ids_by_evidence[evidence_id].append(ksb_id)
+    return ksb_ids_by_evidence
+
+def link_diff(expected: List[int], actual: List[int]) -> Tuple[List[int], List[int]]:
+    """Return the (added, removed) KSB ids that turn the actual links into the expected ones"""
+    actual_ids = set(actual)
+    expected_ids = set(expected)
+    added = [ksb_id for ksb_id in dict.fromkeys(expected) if ksb_id not in actual_ids]
+    removed = [ksb_id for ksb_id in actual if ksb_id not in expected_ids]
+    return added, removed
+
+def to_object_ids(evidence_ids: Iterable[str]) -> List[ObjectId]:
+    """Convert evidence ids from the link table to ObjectIds, dropping malformed ones"""
+    object_ids = []
+    for evidence_id in evidence_ids:
+        try:
+            object_ids.append(ObjectId(evidence_id))
+        except (InvalidId, TypeError):
+            continue
+    return object_ids
+
+def load_ksb_ids(db: Session, evidence_ids: Iterable[str]) -> Dict[str, List[int]]:
+    """
+    Fetches the KSB ids linked to each evidence id with a single query.
+
+    Args:
+        db (Session): The PostgreSQL session.
+        evidence_ids (Iterable[str]): The MongoDB evidence ids to resolve.
+
+    Returns:
+        Dict[str, List[int]]: KSB ids keyed by evidence id. Every requested
+                              id is present, with an empty list if it has
+                              no links.
+    """
+    ksb_ids_by_evidence: Dict[str, List[int]] = {
+        evidence_id: [] for evidence_id in evidence_ids
+    }
+    if not ksb_ids_by_evidence:
+        return ksb_ids_by_evidence
+
+    rows = db.execute(_ksb_links_statement(list(ksb_ids_by_evidence))).all()
+    return _group_ksb_ids(ksb_ids_by_evidence, rows)
+
+async def load_ksb_ids_async(db: AsyncSession, evidence_ids: Iterable[str]) -> Dict[str, List[int]]:
+    """Async counterpart of load_ksb_ids"""
+    ksb_ids_by_evidence: Dict[str, List[int]] = {
+        evidence_id: [] for evidence_id in evidence_ids
+    }
+    if not ksb_ids_by_evidence:
+        return ksb_ids_by_evidence
+
+    rows = (await db.execute(_ksb_links_statement(list(ksb_ids_by_evidence)))).all()
+    return _group_ksb_ids(ksb_ids_by_evidence, rows)
+
+def _stored_ksb_ids(docs: Iterable[Dict[str, Any]]) -> Tuple[Dict[str, List[int]], List[str]]:
+    """Split documents into the KSB ids they store and the ids of those that store none"""
+    ksb_ids_by_evidence: Dict[str, List[int]] = {}
+    legacy_ids = []
+    for doc in docs:
+        if "ksb_ids" in doc:
+            ksb_ids_by_evidence[str(doc["_id"])] = doc["ksb_ids"]
+        else:
+            legacy_ids.append(str(doc["_id"]))
+    return ksb_ids_by_evidence, legacy_ids
+
+def document_ksb_ids(db: Session, docs: Iterable[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """
+    Reads the KSB ids stored on each evidence document.
+
+    Only documents written before ksb_ids were stored on evidence, and not
+    yet backfilled by scripts/backfill_evidence_ksb_ids.py, fall back to one
+    link-table query, so a backfilled collection is served by MongoDB alone.
+
+    Args:
+        db (Session): The PostgreSQL session, used only for the fallback.
+        docs (Iterable[Dict[str, Any]]): MongoDB evidence documents, fetched with ksb_ids.
+
+    Returns:
+        Dict[str, List[int]]: KSB ids keyed by evidence id, for every document.
+    """
+    ksb_ids_by_evidence, legacy_ids = _stored_ksb_ids(docs)
+    if legacy_ids:
+        ksb_ids_by_evidence.update(load_ksb_ids(db, legacy_ids))
+    return ksb_ids_by_evidence
+
+async def document_ksb_ids_async(db: AsyncSession, docs: Iterable[Dict[str, Any]]) -> Dict[str, List[int]]:
+    """Async counterpart of document_ksb_ids"""
+    ksb_ids_by_evidence, legacy_ids = _stored_ksb_ids(docs)
+    if legacy_ids:
+        ksb_ids_by_evidence.update(await load_ksb_ids_async(db, legacy_ids))
+    return ksb_ids_by_evidence
@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+# Sort order that keyset pagination depends on
+KEYSET_SORT = [("created_at", ASCENDING), ("_id", ASCENDING)]
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    """
+    Encodes the (created_at, _id) position of an evidence document as an opaque cursor.
+
+    Args:
+        doc (Dict[str, Any]): The last MongoDB evidence document of a page.
+
+    Returns:
+        str: A URL-safe cursor to pass back as the 'after' parameter.
+    """
+    raw = f"{doc['created_at'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, object_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|")
+        return datetime.fromisoformat(created_at), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def apply_keyset(query: Dict[str, Any], after: Optional[str]) -> Dict[str, Any]:
+    """
+    Restricts a MongoDB evidence query to documents positioned after the cursor.
+
+    Args:
+        query (Dict[str, Any]): The base filter, e.g. by user_id or project_id.
+        after (Optional[str]): A cursor from encode_cursor, or None for the first page.
+
+    Returns:
+        Dict[str, Any]: The filter to use with KEYSET_SORT.
+    """
+    if not after:
+        return query
+
+    created_at, object_id = decode_cursor(after)
+    return {
+        **query,
+        "$or": [
+            {"created_at": {"$gt": created_at}},
+            {"created_at": created_at, "_id": {"$gt": object_id}},
+        ],
+    }
+
+def iter_batches(docs: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Group an iterable of documents, such as a MongoDB cursor, into lists of batch_size"""
+    batch = []
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def aiter_batches(docs: AsyncIterable[Dict[str, Any]], batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Async counterpart of iter_batches, for async MongoDB cursors"""
+    batch = []
+    async for doc in docs:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,189 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from bson import ObjectId
+from pymongo.database import Database
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+from database.models.postgres_models import EvidenceKSBLink, SyncCheckpoint
+from api.services.coverage import replace_links
+from api.services.dialects import upsert_insert
+from api.services.evidence_links import link_diff, load_ksb_ids, to_object_ids
+from api.services.ksb_catalogue import ksb_catalogue
+
+logger = logging.getLogger(__name__)
+
+RECONCILER_CHECKPOINT = "evidence_reconciler"
+
+# Writes younger than this may still be in flight, so they are left for a later run
+DEFAULT_GRACE = timedelta(minutes=10)
+
+# ObjectId timestamps start at the Unix epoch
+EPOCH = datetime(1970, 1, 1)
+
+# Documents are scanned by last write, so edits are checked as well as new evidence
+UPDATED_SORT = [("updated_at", 1), ("_id", 1)]
+
+class ReconcileReport(NamedTuple):
+    start: datetime
+    end: datetime
+    documents_checked: int
+    links_added: int
+    links_removed: int
+    dangling_evidence_ids: List[str]
+
+def load_checkpoint(db: Session, name: str = RECONCILER_CHECKPOINT) -> Optional[datetime]:
+    return db.execute(select(SyncCheckpoint.position).where(SyncCheckpoint.name == name)).scalar()
+
+def save_checkpoint(db: Session, position: datetime, name: str = RECONCILER_CHECKPOINT) -> None:
+    stmt = upsert_insert(db.get_bind().dialect.name)(SyncCheckpoint).values(
+        name=name, position=position, updated_at=datetime.utcnow()
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SyncCheckpoint.name],
+        set_={"position": stmt.excluded.position, "updated_at": stmt.excluded.updated_at}
+    ))
+
+def _object_id_bound(moment: datetime) -> str:
+    """The smallest evidence id that can have been generated at or after the given time"""
+    return str(ObjectId.from_datetime(moment))
+
+def _repair_links(db: Session, doc: Dict, actual: List[int], known_ksb_ids) -> Tuple[int, int]:
+    """Bring one document's link rows and coverage counters in line with its ksb_ids"""
+    evidence_id = str(doc["_id"])
+    added, removed = link_diff(doc["ksb_ids"], actual)
+    # A KSB deleted since the write cannot be linked; leave it to be reported
+    added = [ksb_id for ksb_id in added if ksb_id in known_ksb_ids]
+    replace_links(db, evidence_id, doc["user_id"], added, removed)
+    return len(added), len(removed)
+
+def _check_documents(
+    db: Session,
+    mongo_db: Database,
+    start: datetime,
+    end: datetime,
+    batch_size: int,
+    repair: bool
+) -> Tuple[int, int, int]:
+    """Compare the ksb_ids of every document written in [start, end) with its link rows"""
+    checked = added = removed = 0
+    known_ksb_ids = ksb_catalogue.get(db).by_id if repair else {}
+    query = {"updated_at": {"$gte": start, "$lt": end}}
+    page_query = query
+    while True:
+        docs = list(
+            mongo_db.evidence.find(page_query, {"user_id": 1, "ksb_ids": 1, "updated_at": 1})
+            .sort(UPDATED_SORT).limit(batch_size)
+        )
+        if not docs:
+            break
+        last = docs[-1]
+        page_query = {
+            **query,
+            "$or": [
+                {"updated_at": {"$gt": last["updated_at"]}},
+                {"updated_at": last["updated_at"], "_id": {"$gt": last["_id"]}},
+            ],
+        }
+
+        # Evidence written before documents recorded their KSB ids cannot be compared
+        docs = [doc for doc in docs if "ksb_ids" in doc]
+        links = load_ksb_ids(db, (str(doc["_id"]) for doc in docs))
+        checked += len(docs)
+        for doc in docs:
+            actual = links[str(doc["_id"])]
+            if sorted(set(doc["ksb_ids"])) == sorted(actual):
+                continue
+            logger.warning("Evidence %s has links %s, expected %s", doc["_id"], actual, doc["ksb_ids"])
+            if repair:
+                doc_added, doc_removed = _repair_links(db, doc, actual, known_ksb_ids)
+                added += doc_added
+                removed += doc_removed
+        if repair:
+            db.commit()
+    return checked, added, removed
+
+def _dangling_links(
+    db: Session,
+    mongo_db: Database,
+    start: datetime,
+    end: datetime,
+    batch_size: int,
+    repair: bool
+) -> List[str]:
+    """Find link rows whose evidence id, generated in [start, end), has no MongoDB document"""
+    dangling = []
+    last = _object_id_bound(start)
+    upper = _object_id_bound(end)
+    first_page = True
+    while True:
+        lower_bound = EvidenceKSBLink.evidence_id >= last if first_page else EvidenceKSBLink.evidence_id > last
+        evidence_ids = db.execute(
+            select(EvidenceKSBLink.evidence_id).distinct()
+            .where(lower_bound, EvidenceKSBLink.evidence_id < upper)
+            .order_by(EvidenceKSBLink.evidence_id).limit(batch_size)
+        ).scalars().all()
+        if not evidence_ids:
+            break
+        last = evidence_ids[-1]
+        first_page = False
+
+        existing = {
+            str(doc["_id"])
+            for doc in mongo_db.evidence.find({"_id": {"$in": to_object_ids(evidence_ids)}}, {"_id": 1})
+        }
+        missing = [evidence_id for evidence_id in evidence_ids if evidence_id not in existing]
+        dangling.extend(missing)
+        if missing and repair:
+            db.execute(delete(EvidenceKSBLink).where(EvidenceKSBLink.evidence_id.in_(missing)))
+            db.commit()
+    return dangling
+
+def reconcile_evidence(
+    db: Session,
+    mongo_db: Database,
+    now: Optional[datetime] = None,
+    grace: timedelta = DEFAULT_GRACE,
+    batch_size: int = 1000,
+    repair: bool = True
+) -> ReconcileReport:
+    """
+    Checks the evidence written since the last run against evidence_ksb_link.
+
+    Evidence is written to MongoDB first, recording the KSB ids it should be
+    linked to, and the links and coverage counters follow in one PostgreSQL
+    transaction; edits change both in the same order. A crash in between
+    leaves a document whose links disagree with it, which this rolls
+    forward. Links whose evidence document no longer exists are removed;
+    their owner is unknown, so coverage counters are not adjusted for them
+    and scripts/rebuild_ksb_coverage.py should follow.
+
+    Only evidence created or edited between the stored checkpoint and
+    now - grace is scanned, so each run costs as much as the evidence
+    written since the previous one.
+
+    Args:
+        db (Session): The PostgreSQL session.
+        mongo_db (Database): The MongoDB database holding the evidence collection.
+        now (Optional[datetime]): The current UTC time, for tests.
+        grace (timedelta): How old evidence must be before it is checked.
+        batch_size (int): Documents (or link evidence ids) read per query.
+        repair (bool): Fix mismatches and advance the checkpoint; if False, only report.
+
+    Returns:
+        ReconcileReport: The scanned window and what was found or repaired.
+    """
+    start = load_checkpoint(db) or EPOCH
+    end = (now or datetime.utcnow()) - grace
+    if end <= start:
+        return ReconcileReport(start, start, 0, 0, 0, [])
+
+    checked, added, removed = _check_documents(db, mongo_db, start, end, batch_size, repair)
+    dangling = _dangling_links(db, mongo_db, start, end, batch_size, repair)
+    if dangling:
+        logger.warning("Removed links for %d missing evidence documents: %s", len(dangling), ", ".join(dangling[:20]))
+
+    if repair:
+        save_checkpoint(db, end)
+        db.commit()
+    return ReconcileReport(start, end, checked, added, removed, dangling)
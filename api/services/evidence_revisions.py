@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Union
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from pymongo.errors import DuplicateKeyError
+from api.services.evidence_writes import versioned_filter
+
+# A delta rebuilds one text from another, line by line: [start, end] copies
+# lines start..end-1 of the source, and a string is inserted as-is. Only the
+# edited lines are stored, so a delta grows with the edit, not the document.
+Delta = List[Union[List[int], str]]
+
+# Fields that are versioned. Anything else on the document is not kept in the history.
+VERSIONED_FIELDS = ("title", "content", "ksb_ids")
+
+# History entries are read newest first, stepping back from the current document
+REVISIONS_SORT = [("revision", -1)]
+HISTORY_PROJECTION = {"_id": 0, "revision": 1, "updated_at": 1}
+
+# A history entry is written before the edit it belongs to. One this old
+# whose edit never landed was left by a failed request and may be replaced.
+ORPHAN_AGE = timedelta(minutes=1)
+
+def _lines(text: str) -> List[str]:
+    return text.splitlines(keepends=True)
+
+def text_delta(source: str, target: str) -> Delta:
+    """Build the delta that turns source into target"""
+    source_lines = _lines(source)
+    target_lines = _lines(target)
+    delta: Delta = []
+    matcher = SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append("".join(target_lines[j1:j2]))
+    return delta
+
+def apply_delta(source: str, delta: Delta) -> str:
+    """Rebuild the target text of text_delta(source, target) from the source"""
+    source_lines = _lines(source)
+    pieces = []
+    for op in delta:
+        if isinstance(op, str):
+            pieces.append(op)
+        else:
+            start, end = op
+            pieces.extend(source_lines[start:end])
+    return "".join(pieces)
+
+def revision_record(before: Dict[str, Any], changes: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    Builds the history entry for an edit, stored in evidence_revisions.
+
+    The entry holds what is needed to step back from the edited version to
+    the one before it: a reverse delta for the content, and the previous
+    value of any other changed field. The newest version is always the
+    evidence document itself, so reading it never touches the history.
+
+    Args:
+        before (Dict[str, Any]): The evidence document before the edit.
+        changes (Dict[str, Any]): The versioned fields that the edit changes.
+        now (datetime): When the edit was made.
+    """
+    record = {
+        "evidence_id": before["_id"],
+        "revision": before.get("revision", 1),
+        "updated_at": before["updated_at"],
+        "created_at": now,
+    }
+    if "content" in changes:
+        record["content_delta"] = text_delta(changes["content"], before["content"])
+    for field in ("title", "ksb_ids"):
+        if field in changes:
+            record[field] = before.get(field)
+    return record
+
+def _is_orphan(existing: Dict[str, Any], now: datetime) -> bool:
+    return existing["created_at"] <= now - ORPHAN_AGE
+
+def save_revision_record(mongo_db: Database, doc: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    """
+    Stores the history entry of an edit before the edit is applied.
+
+    The unique (evidence_id, revision) index lets only one edit of a
+    revision claim its entry, so a concurrent edit is refused here. An
+    old entry left by a failed edit is replaced if the document is still
+    at that revision.
+
+    Returns:
+        bool: False if another edit of the same revision holds the entry.
+    """
+    try:
+        mongo_db.evidence_revisions.insert_one(record)
+        return True
+    except DuplicateKeyError:
+        pass
+    existing = mongo_db.evidence_revisions.find_one(
+        {"evidence_id": record["evidence_id"], "revision": record["revision"]}
+    )
+    still_current = mongo_db.evidence.find_one(versioned_filter(doc), {"_id": 1})
+    if not existing or not still_current or not _is_orphan(existing, record["created_at"]):
+        return False
+    mongo_db.evidence_revisions.delete_one({"_id": existing["_id"]})
+    try:
+        mongo_db.evidence_revisions.insert_one(record)
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def save_revision_record_async(mongo_db: AsyncDatabase, doc: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    """Async counterpart of save_revision_record"""
+    try:
+        await mongo_db.evidence_revisions.insert_one(record)
+        return True
+    except DuplicateKeyError:
+        pass
+    existing = await mongo_db.evidence_revisions.find_one(
+        {"evidence_id": record["evidence_id"], "revision": record["revision"]}
+    )
+    still_current = await mongo_db.evidence.find_one(versioned_filter(doc), {"_id": 1})
+    if not existing or not still_current or not _is_orphan(existing, record["created_at"]):
+        return False
+    await mongo_db.evidence_revisions.delete_one({"_id": existing["_id"]})
+    try:
+        await mongo_db.evidence_revisions.insert_one(record)
+        return True
+    except DuplicateKeyError:
+        return False
+
+def discard_revision_record(mongo_db: Database, record: Dict[str, Any]) -> None:
+    """Remove the history entry of an edit that was not applied"""
+    mongo_db.evidence_revisions.delete_one({"_id": record["_id"]})
+
+async def discard_revision_record_async(mongo_db: AsyncDatabase, record: Dict[str, Any]) -> None:
+    """Async counterpart of discard_revision_record"""
+    await mongo_db.evidence_revisions.delete_one({"_id": record["_id"]})
+
+def _revisions_query(evidence_id: Any, revision: int) -> Dict[str, Any]:
+    return {"evidence_id": evidence_id, "revision": {"$gte": revision}}
+
+def rebuild_revision(doc: Dict[str, Any], revision: int, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Steps back from the current document through the history entries,
+    newest first, until the requested revision is reached.
+
+    Raises:
+        LookupError: If the revision does not exist or part of its history is missing.
+    """
+    current = doc.get("revision", 1)
+    if revision < 1 or revision > current:
+        raise LookupError(f"Evidence has no revision {revision}")
+
+    version = {field: doc.get(field) for field in VERSIONED_FIELDS}
+    version["updated_at"] = doc["updated_at"]
+    expected = current - 1
+    for record in records:
+        if record["revision"] >= current:
+            # Written for an edit that never landed
+            continue
+        if record["revision"] < revision:
+            break
+        if record["revision"] != expected:
+            raise LookupError(f"History for revision {expected} is missing")
+        if "content_delta" in record:
+            version["content"] = apply_delta(version["content"], record["content_delta"])
+        for field in ("title", "ksb_ids"):
+            if field in record:
+                version[field] = record[field]
+        version["updated_at"] = record["updated_at"]
+        expected -= 1
+    if expected != revision - 1:
+        raise LookupError(f"History for revision {expected} is missing")
+
+    version["revision"] = revision
+    return version
+
+def load_revision(mongo_db: Database, doc: Dict[str, Any], revision: int) -> Dict[str, Any]:
+    """
+    Reconstructs one revision of an evidence document.
+
+    Reads only the history entries between that revision and the current
+    one, so recent revisions are the cheapest to rebuild.
+
+    Returns:
+        Dict[str, Any]: The title, content, ksb_ids, updated_at and revision.
+    """
+    records = []
+    if revision < doc.get("revision", 1):
+        records = list(
+            mongo_db.evidence_revisions.find(_revisions_query(doc["_id"], revision)).sort(REVISIONS_SORT)
+        )
+    return rebuild_revision(doc, revision, records)
+
+async def load_revision_async(mongo_db: AsyncDatabase, doc: Dict[str, Any], revision: int) -> Dict[str, Any]:
+    """Async counterpart of load_revision"""
+    records = []
+    if revision < doc.get("revision", 1):
+        records = await mongo_db.evidence_revisions.find(
+            _revisions_query(doc["_id"], revision)
+        ).sort(REVISIONS_SORT).to_list()
+    return rebuild_revision(doc, revision, records)
+
+def _history_query(doc: Dict[str, Any]) -> Dict[str, Any]:
+    # Entries at or above the current revision belong to edits that never landed
+    return {"evidence_id": doc["_id"], "revision": {"$lt": doc.get("revision", 1)}}
+
+def list_revisions(mongo_db: Database, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the revision number and time of every version, newest first, without reading any deltas"""
+    history = mongo_db.evidence_revisions.find(_history_query(doc), HISTORY_PROJECTION).sort(REVISIONS_SORT)
+    return [{"revision": doc.get("revision", 1), "updated_at": doc["updated_at"]}] + list(history)
+
+async def list_revisions_async(mongo_db: AsyncDatabase, doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Async counterpart of list_revisions"""
+    history = await mongo_db.evidence_revisions.find(
+        _history_query(doc), HISTORY_PROJECTION
+    ).sort(REVISIONS_SORT).to_list()
+    return [{"revision": doc.get("revision", 1), "updated_at": doc["updated_at"]}] + history
@@ -0,0 +1,109 @@
+import html
+import re
+from typing import Any, Dict, List, Optional
+from api.schemas.evidence_schemas import EvidenceSearchResult
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+EXCERPT_WIDTH = 200
+
+# Rank by the text index relevance score, newest first among equal scores
+SEARCH_SORT = [("score", {"$meta": "textScore"}), ("created_at", -1), ("_id", -1)]
+
+SEARCH_PROJECTION = {
+    "score": {"$meta": "textScore"},
+    "user_id": 1,
+    "project_id": 1,
+    "title": 1,
+    "content": 1,
+    "ksb_ids": 1,
+    "created_at": 1,
+}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_NEGATED = re.compile(r"(?:^|\s)-(\"[^\"]*\"|\S+)")
+
+def search_terms(q: str) -> List[str]:
+    """
+    Extracts the words to highlight from a MongoDB $text search string.
+    Negated words and phrases ("-word", "-\"a phrase\"") are left out.
+    """
+    positive = _NEGATED.sub(" ", q)
+    terms = {word.lower() for word in _WORD.findall(positive)}
+    # Longest first so overlapping alternatives prefer the fuller match
+    return sorted(terms, key=lambda term: (-len(term), term))
+
+def search_filter(
+    q: str,
+    user_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    ksb_ids: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Builds the MongoDB filter for a ranked text search.
+
+    Args:
+        q (str): The search string, in MongoDB $text syntax.
+        user_id (Optional[int]): Restrict to this user's evidence.
+        project_id (Optional[int]): Restrict to evidence for this project.
+        ksb_ids (Optional[List[int]]): Restrict to evidence tagged with any of
+                                       these KSBs, using the ksb_ids index.
+    """
+    query: Dict[str, Any] = {"$text": {"$search": q}}
+    if user_id:
+        query["user_id"] = user_id
+    if project_id:
+        query["project_id"] = project_id
+    if ksb_ids is not None:
+        query["ksb_ids"] = {"$in": ksb_ids}
+    return query
+
+def build_excerpt(content: str, terms: List[str], width: int = EXCERPT_WIDTH) -> str:
+    """
+    Cuts a window of content around the first matching term and wraps every
+    term match in <mark> tags. The surrounding text is HTML-escaped.
+
+    Matching is by word prefix, so "learn" also marks "learning", which
+    roughly mirrors the stemming done by the text index.
+    """
+    if not terms:
+        return html.escape(content[:width])
+
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + r")\w*", re.IGNORECASE)
+    first = pattern.search(content)
+    start = max(0, first.start() - width // 3) if first else 0
+    end = min(len(content), start + width)
+
+    # Snap the window to whitespace so words are not cut in half
+    if start > 0:
+        space = content.find(" ", start, first.start() if first else end)
+        start = space + 1 if space != -1 else start
+    if end < len(content):
+        space = content.rfind(" ", start, end)
+        end = space if space > start else end
+
+    window = content[start:end]
+    pieces = []
+    last = 0
+    for match in pattern.finditer(window):
+        pieces.append(html.escape(window[last:match.start()]))
+        pieces.append(f"<mark>{html.escape(match.group(0))}</mark>")
+        last = match.end()
+    pieces.append(html.escape(window[last:]))
+    highlighted = "".join(pieces)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(content) else ""
+    return f"{prefix}{highlighted}{suffix}"
+
+def to_search_result(doc: Dict[str, Any], ksb_ids: List[int], terms: List[str]) -> EvidenceSearchResult:
+    """Build a search result from a document fetched with SEARCH_PROJECTION"""
+    return EvidenceSearchResult(
+        id=str(doc["_id"]),
+        user_id=doc["user_id"],
+        project_id=doc.get("project_id"),
+        title=doc["title"],
+        excerpt=build_excerpt(doc["content"], terms),
+        score=doc["score"],
+        ksb_ids=ksb_ids,
+        created_at=doc["created_at"]
+    )
@@ -0,0 +1,150 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+from pymongo.errors import BulkWriteError
+from api.schemas.evidence_schemas import EvidenceBulkItemResult, EvidenceBulkResponse, EvidenceCreate
+from api.services.evidence_fields import content_summary
+from api.services.ksb_catalogue import KSBCatalogue
+
+def new_evidence_document(evidence: EvidenceCreate, now: datetime) -> Dict[str, Any]:
+    """
+    Build the MongoDB document for a new evidence entry.
+
+    The document records the KSB ids it is to be linked to, so a write that
+    fails before its links are committed can be detected and rolled forward
+    (see api.services.evidence_reconciler).
+    """
+    now = _truncate_to_milliseconds(now)
+    return {
+        "user_id": evidence.user_id,
+        "project_id": evidence.project_id,
+        "title": evidence.title,
+        "content_type": evidence.content_type,
+        "content": evidence.content,
+        **content_summary(evidence.content),
+        # A repeated KSB id would collide on the link table's primary key
+        "ksb_ids": list(dict.fromkeys(evidence.ksb_ids)),
+        "created_at": now,
+        "updated_at": now
+    }
+
+def _truncate_to_milliseconds(now: datetime) -> datetime:
+    # BSON dates have millisecond precision; truncate so the document matches what is stored
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+def evidence_changes(doc: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the fields of a partial update whose value differs from the document"""
+    changes = {field: value for field, value in update.items() if field != "ksb_ids" and doc.get(field) != value}
+    if "ksb_ids" in update:
+        ksb_ids = list(dict.fromkeys(update["ksb_ids"]))
+        # Tags are a set; reordering them is not an edit
+        if "ksb_ids" not in doc or sorted(ksb_ids) != sorted(doc["ksb_ids"]):
+            changes["ksb_ids"] = ksb_ids
+    return changes
+
+def versioned_filter(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Match the document only while it is still at the revision that was read"""
+    if "revision" in doc:
+        return {"_id": doc["_id"], "revision": doc["revision"]}
+    return {"_id": doc["_id"], "revision": {"$exists": False}}
+
+def evidence_update(doc: Dict[str, Any], changes: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """
+    Build the $set for an edit: the changed fields, a fresh excerpt if the
+    content changed, a new updated_at (which changes the ETag) and the next
+    revision number.
+    """
+    update = dict(changes)
+    if "content" in changes:
+        update.update(content_summary(changes["content"]))
+    update["updated_at"] = _truncate_to_milliseconds(now)
+    update["revision"] = doc.get("revision", 1) + 1
+    return update
+
+def evidence_restore(doc: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the update that undoes evidence_update, for when the matching link changes fail"""
+    restore: Dict[str, Any] = {}
+    previous = {field: doc[field] for field in update if field in doc}
+    if previous:
+        restore["$set"] = previous
+    missing = {field: "" for field in update if field not in doc}
+    if missing:
+        restore["$unset"] = missing
+    return restore
+
+class BulkEvidencePlan:
+    """
+    Tracks a bulk evidence insert from validation through to the result report.
+
+    Items are validated against the KSB catalogue up front. Only the valid
+    items get a MongoDB document. Failures from the insert itself are then
+    recorded by document position, and the link rows are built from the
+    documents that were actually written.
+    """
+
+    def __init__(self, items: List[EvidenceCreate], catalogue: KSBCatalogue):
+        now = datetime.utcnow()
+        self.items = items
+        self.results: List[EvidenceBulkItemResult] = []
+        self.documents: List[Dict[str, Any]] = []
+        self._document_indexes: List[int] = []
+        self._ksb_ids: List[List[int]] = []
+
+        for index, item in enumerate(items):
+            missing_ksb_ids = catalogue.missing_ids(item.ksb_ids)
+            if missing_ksb_ids:
+                self.results.append(EvidenceBulkItemResult(
+                    index=index,
+                    status="failed",
+                    error=f"KSB with id {missing_ksb_ids[0]} not found"
+                ))
+                continue
+
+            self.results.append(EvidenceBulkItemResult(index=index, status="created"))
+            document = new_evidence_document(item, now)
+            self.documents.append(document)
+            self._document_indexes.append(index)
+            self._ksb_ids.append(document["ksb_ids"])
+
+    def record_write_errors(self, error: BulkWriteError) -> None:
+        """Mark the items whose documents an unordered insert_many rejected"""
+        for write_error in error.details.get("writeErrors", []):
+            index = self._document_indexes[write_error["index"]]
+            self.results[index] = EvidenceBulkItemResult(
+                index=index, status="failed", error=write_error.get("errmsg")
+            )
+
+    def inserted_documents(self) -> List[Tuple[Dict[str, Any], List[int]]]:
+        """Return (document, ksb_ids) for every document that was written"""
+        return [
+            (doc, ksb_ids)
+            for doc, index, ksb_ids in zip(self.documents, self._document_indexes, self._ksb_ids)
+            if self.results[index].status == "created"
+        ]
+
+    def link_rows(self) -> List[Dict[str, Any]]:
+        return [
+            {"evidence_id": str(doc["_id"]), "ksb_id": ksb_id}
+            for doc, ksb_ids in self.inserted_documents()
+            for ksb_id in ksb_ids
+        ]
+
+    def coverage_pairs(self) -> List[Tuple[int, int]]:
+        return [
+            (doc["user_id"], ksb_id)
+            for doc, ksb_ids in self.inserted_documents()
+            for ksb_id in ksb_ids
+        ]
+
+    def inserted_ids(self) -> List[Any]:
+        return [doc["_id"] for doc, _ in self.inserted_documents()]
+
+    def response(self) -> EvidenceBulkResponse:
+        for doc, index in zip(self.documents, self._document_indexes):
+            if self.results[index].status == "created":
+                self.results[index].id = str(doc["_id"])
+        created = sum(1 for result in self.results if result.status == "created")
+        return EvidenceBulkResponse(
+            created=created,
+            failed=len(self.results) - created,
+            results=self.results
+        )
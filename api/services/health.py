@@ -0,0 +1,207 @@
+import asyncio
+import math
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict
+import pymongo
+from pymongo import monitoring
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from starlette.concurrency import run_in_threadpool
+
+class MongoPoolStats(monitoring.ConnectionPoolListener):
+    """
+    Tracks MongoDB connection pool usage from pymongo's CMAP events.
+
+    pymongo has no public pool counters, so pass an instance in the
+    client's event_listeners and read snapshot() for the totals across
+    every server the client talks to.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+
+    def _add(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def connection_created(self, event):
+        self._add(open=1)
+
+    def connection_closed(self, event):
+        self._add(open=-1)
+
+    def connection_check_out_started(self, event):
+        self._add(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._add(waiting=-1, checked_out=1)
+
+    def connection_check_out_failed(self, event):
+        self._add(waiting=-1, checkout_failures=1)
+
+    def connection_checked_in(self, event):
+        self._add(checked_out=-1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "open": self.open,
+                "checked_out": self.checked_out,
+                "waiting": self.waiting,
+                "checkout_failures": self.checkout_failures,
+            }
+
+def postgres_pool_stats(engine) -> Dict[str, Any]:
+    """Report the SQLAlchemy pool's size and usage. Pools without counters (e.g. StaticPool) report only their class."""
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        return stats
+    stats.update({
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        # QueuePool counts overflow from -size; report only connections beyond the pool size
+        "overflow": max(pool.overflow(), 0),
+    })
+    return stats
+
+def _probe_connect_args(url: str, timeout: float) -> Dict[str, Any]:
+    """Driver options that bound connecting and every statement to the probe timeout"""
+    driver = make_url(url).get_driver_name()
+    if driver == "psycopg2":
+        # libpq only takes whole seconds for the connect timeout
+        return {
+            "connect_timeout": max(math.ceil(timeout), 1),
+            "options": f"-c statement_timeout={int(timeout * 1000)}",
+        }
+    if driver == "asyncpg":
+        return {"timeout": timeout, "command_timeout": timeout}
+    return {}
+
+def create_probe_engine(url: str, timeout: float):
+    """
+    Creates the engine the readiness probe connects with.
+
+    asyncio.wait_for only stops awaiting a probe run in the threadpool;
+    the worker thread stays blocked until the driver gives up, holding a
+    threadpool token the sync routers need. This engine bounds the
+    connect and the statement to the timeout, so the thread is released
+    with the probe, and its NullPool never waits on, or holds, one of the
+    application pool's connections.
+    """
+    return create_engine(url, poolclass=NullPool, connect_args=_probe_connect_args(url, timeout))
+
+def create_async_probe_engine(url: str, timeout: float):
+    """Async counterpart of create_probe_engine"""
+    return create_async_engine(url, poolclass=NullPool, connect_args=_probe_connect_args(url, timeout))
+
+async def _timed(probe: Callable[[], Awaitable[Any]], timeout: float) -> Dict[str, Any]:
+    """Run a probe with a timeout and report its status and round-trip latency"""
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(probe(), timeout)
+    except asyncio.TimeoutError:
+        return {"status": "down", "error": f"no response within {timeout}s"}
+    except Exception as e:
+        return {"status": "down", "error": f"{type(e).__name__}: {e}"}
+    return {"status": "up", "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+def _select_one(engine) -> None:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+async def ping_postgres(engine, probe_engine, timeout: float) -> Dict[str, Any]:
+    """
+    Runs SELECT 1 on the probe engine and reports the application engine's pool.
+
+    The blocking call runs in the threadpool. On timeout, the caller gets
+    a "down" report at once, and the worker thread gives up soon after,
+    because the probe engine bounds the connect and the statement (see
+    create_probe_engine).
+    """
+    result = await _timed(lambda: run_in_threadpool(_select_one, probe_engine), timeout)
+    result["pool"] = postgres_pool_stats(engine)
+    return result
+
+async def ping_postgres_async(engine, probe_engine, timeout: float) -> Dict[str, Any]:
+    """Async counterpart of ping_postgres, for AsyncEngines"""
+    async def select_one():
+        async with probe_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    result = await _timed(select_one, timeout)
+    result["pool"] = postgres_pool_stats(engine.sync_engine)
+    return result
+
+def _ping(mongo_db, timeout: float) -> None:
+    # pymongo.timeout also bounds server selection, so the worker thread gives up with the probe
+    with pymongo.timeout(timeout):
+        mongo_db.command("ping")
+
+async def ping_mongo(mongo_db, pool_stats: MongoPoolStats, timeout: float) -> Dict[str, Any]:
+    """Runs the ping command on a (blocking) MongoDB database and reports the pool counters"""
+    result = await _timed(lambda: run_in_threadpool(_ping, mongo_db, timeout), timeout)
+    result["pool"] = pool_stats.snapshot()
+    return result
+
+async def ping_mongo_async(mongo_db, pool_stats: MongoPoolStats, timeout: float) -> Dict[str, Any]:
+    """Async counterpart of ping_mongo, for an AsyncDatabase"""
+    async def ping():
+        with pymongo.timeout(timeout):
+            await mongo_db.command("ping")
+
+    result = await _timed(ping, timeout)
+    result["pool"] = pool_stats.snapshot()
+    return result
+
+async def check_readiness(state) -> Dict[str, Any]:
+    """
+    Pings PostgreSQL and MongoDB concurrently with the clients on app.state.
+
+    Returns:
+        Dict[str, Any]: "status" is "ready" only if both databases answered
+                        within settings.health_check_timeout.
+    """
+    settings = state.settings
+    timeout = settings.health_check_timeout
+    if settings.database_mode == "async":
+        postgres, mongodb = await asyncio.gather(
+            ping_postgres_async(state.async_engine, state.async_probe_engine, timeout),
+            ping_mongo_async(state.async_mongo_db, state.mongo_pool_stats, timeout)
+        )
+    else:
+        postgres, mongodb = await asyncio.gather(
+            ping_postgres(state.engine, state.probe_engine, timeout),
+            ping_mongo(state.mongo_db, state.mongo_pool_stats, timeout)
+        )
+
+    ready = postgres["status"] == "up" and mongodb["status"] == "up"
+    return {
+        "status": "ready" if ready else "not_ready",
+        "postgres": postgres,
+        "mongodb": mongodb,
+    }
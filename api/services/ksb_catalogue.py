@@ -0,0 +1,124 @@
+import time
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.models.postgres_models import CatalogueVersion, KSB
+from api.services.dialects import upsert_insert
+from config import settings
+
+KSB_CATALOGUE = "ksbs"
+
+class CachedKSB(NamedTuple):
+    id: int
+    code: str
+    description: str
+
+class KSBCatalogue(NamedTuple):
+    version: int
+    ksbs: List[CachedKSB]
+    by_id: Dict[int, CachedKSB]
+    by_code: Dict[str, CachedKSB]
+
+    @classmethod
+    def from_rows(cls, version: int, rows) -> "KSBCatalogue":
+        ksbs = [CachedKSB(row.id, row.code, row.description) for row in rows]
+        return cls(
+            version=version,
+            ksbs=ksbs,
+            by_id={ksb.id: ksb for ksb in ksbs},
+            # Keyed by the upper-cased code, so lookups match whatever case the code was stored in
+            by_code={ksb.code.upper(): ksb for ksb in ksbs},
+        )
+
+    def missing_ids(self, ksb_ids: List[int]) -> List[int]:
+        """Return the ids that are not in the catalogue, in request order"""
+        return [ksb_id for ksb_id in ksb_ids if ksb_id not in self.by_id]
+
+    def ids_for_codes(self, ksb_codes: List[str]) -> List[int]:
+        """Return the ids of the given KSB codes, matched case-insensitively; unknown codes are skipped"""
+        return [self.by_code[code.upper()].id for code in ksb_codes if code.upper() in self.by_code]
+
+def _version_statement():
+    return select(CatalogueVersion.version).where(CatalogueVersion.name == KSB_CATALOGUE)
+
+def _ksbs_statement():
+    return select(KSB.id, KSB.code, KSB.description).order_by(KSB.id)
+
+class KSBCatalogueCache:
+    """
+    Process-local copy of the KSB catalogue.
+
+    The cached copy is tagged with the version stored in the
+    catalogue_versions table. At most once per check interval, a read
+    compares that version with the database, which costs one primary-key
+    lookup. The KSB rows are reloaded only when another writer (in any
+    worker) has bumped the version.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._catalogue: Optional[KSBCatalogue] = None
+        self._checked_at = 0.0
+
+    def _fresh(self) -> Optional[KSBCatalogue]:
+        if self._catalogue and time.monotonic() - self._checked_at < self.check_interval:
+            return self._catalogue
+        return None
+
+    def _store(self, catalogue: KSBCatalogue) -> KSBCatalogue:
+        self._catalogue = catalogue
+        self._checked_at = time.monotonic()
+        return catalogue
+
+    def get(self, db: Session) -> KSBCatalogue:
+        """Return the catalogue, revalidating it against the database when the check interval has passed"""
+        catalogue = self._fresh()
+        if catalogue:
+            return catalogue
+
+        # Read the version before the rows: a concurrent bump then causes one extra reload, never a stale cache
+        version = db.execute(_version_statement()).scalar() or 0
+        if self._catalogue and self._catalogue.version == version:
+            return self._store(self._catalogue)
+        return self._store(KSBCatalogue.from_rows(version, db.execute(_ksbs_statement()).all()))
+
+    async def get_async(self, db: AsyncSession) -> KSBCatalogue:
+        """Async counterpart of get"""
+        catalogue = self._fresh()
+        if catalogue:
+            return catalogue
+
+        version = (await db.execute(_version_statement())).scalar() or 0
+        if self._catalogue and self._catalogue.version == version:
+            return self._store(self._catalogue)
+        rows = (await db.execute(_ksbs_statement())).all()
+        return self._store(KSBCatalogue.from_rows(version, rows))
+
+    def invalidate(self) -> None:
+        """Drop the local copy so the next read reloads it"""
+        self._catalogue = None
+        self._checked_at = 0.0
+
+ksb_catalogue = KSBCatalogueCache(settings.ksb_cache_check_seconds)
+
+def _bump_statement(dialect_name: str):
+    stmt = upsert_insert(dialect_name)(CatalogueVersion).values(name=KSB_CATALOGUE, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[CatalogueVersion.name],
+        set_={"version": CatalogueVersion.version + 1}
+    )
+
+def bump_ksb_catalogue_version(db: Session) -> None:
+    """
+    Marks the KSB catalogue as changed for every worker.
+
+    Call this in the same transaction as the KSB write, then call
+    ksb_catalogue.invalidate() after the commit so this worker reloads at
+    once. Other workers pick up the change at their next version check.
+    """
+    db.execute(_bump_statement(db.get_bind().dialect.name))
+
+async def bump_ksb_catalogue_version_async(db: AsyncSession) -> None:
+    """Async counterpart of bump_ksb_catalogue_version"""
+    await db.execute(_bump_statement(db.get_bind().dialect.name))
@@ -0,0 +1,271 @@
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+import numpy as np
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from api.services.evidence_links import document_ksb_ids, document_ksb_ids_async
+from api.services.evidence_pagination import KEYSET_SORT, STREAM_BATCH_SIZE, aiter_batches, iter_batches
+from api.services.ksb_catalogue import CachedKSB, KSBCatalogue
+
+DEFAULT_SUGGESTIONS = 5
+MAX_SUGGESTIONS = 20
+# Cosine similarity below this is too weak to be worth showing
+DEFAULT_MIN_SCORE = 0.1
+# Evidence listed under each KSB that no evidence is tagged with yet
+GAP_CANDIDATES = 5
+
+SCAN_PROJECTION = {"title": 1, "content": 1, "ksb_ids": 1}
+
+# Rows scored per matrix product; bounds the dense document block in memory
+_SCORE_BLOCK = 256
+
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+_STOP_WORDS = frozenset("""
+    a about above after again all also an and any are as at be been being both but by can could did do
+    does doing done during each for from further had has have having how i if in into is it its itself
+    may me more most my no nor not of off on once only or other our out over own same should so some
+    such than that the their them then there these they this those through to too under until up use
+    used using very was we were what when where which while who why will with within would you your
+""".split())
+
+class ScoredKSB(NamedTuple):
+    ksb: CachedKSB
+    score: float
+
+def _stem(word: str) -> str:
+    """Strip the commonest English suffixes so "models", "modelling" and "modelled" share a term"""
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4 and not word.endswith("ss"):
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 4 and word[-1] == word[-2]:
+        word = word[:-1]
+    return word
+
+def terms(text: str) -> List[str]:
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS]
+
+def evidence_text(doc: Dict[str, Any]) -> str:
+    return f"{doc.get('title') or ''}\n{doc.get('content') or ''}"
+
+class KSBVectorModel:
+    """
+    TF-IDF vectors of the KSB descriptions, for scoring evidence against
+    every KSB at once.
+
+    The vocabulary and IDF weights come from the KSB descriptions, so only
+    words that can match a KSB are counted. Each KSB is an L2-normalised
+    row of a dense (KSBs x terms) matrix; a block of evidence is turned
+    into the same kind of rows and one matrix product gives the cosine
+    similarity of every evidence item with every KSB.
+    """
+
+    def __init__(self, catalogue: KSBCatalogue):
+        self.version = catalogue.version
+        self.ksbs = list(catalogue.ksbs)
+        documents = [Counter(terms(f"{ksb.code} {ksb.description or ''}")) for ksb in self.ksbs]
+        document_frequency = Counter(term for counts in documents for term in counts)
+        self.vocabulary = {term: index for index, term in enumerate(sorted(document_frequency))}
+        # Smoothed IDF: a term in every description still counts a little
+        count = len(documents)
+        self.idf = np.array(
+            [math.log((1 + count) / (1 + document_frequency[term])) + 1 for term in sorted(document_frequency)],
+            dtype=np.float32
+        )
+        self.matrix = self._vectorise_counts(documents)
+
+    def _vectorise_counts(self, documents: Sequence[Counter]) -> np.ndarray:
+        """Build L2-normalised TF-IDF rows, with sublinear term frequency, ignoring unknown terms"""
+        rows, columns, counts = [], [], []
+        for row, document in enumerate(documents):
+            for term, term_count in document.items():
+                column = self.vocabulary.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+                    counts.append(term_count)
+        vectors = np.zeros((len(documents), len(self.vocabulary)), dtype=np.float32)
+        if rows:
+            columns = np.array(columns)
+            vectors[np.array(rows), columns] = (1 + np.log(np.array(counts, dtype=np.float32))) * self.idf[columns]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    def score(self, texts: Sequence[str]) -> np.ndarray:
+        """Return the (texts x KSBs) cosine similarities, in catalogue order"""
+        scores = np.zeros((len(texts), len(self.ksbs)), dtype=np.float32)
+        for start in range(0, len(texts), _SCORE_BLOCK):
+            block = [Counter(terms(text)) for text in texts[start:start + _SCORE_BLOCK]]
+            scores[start:start + len(block)] = self._vectorise_counts(block) @ self.matrix.T
+        return scores
+
+    def top(
+        self,
+        scores: np.ndarray,
+        top_k: int = DEFAULT_SUGGESTIONS,
+        min_score: float = DEFAULT_MIN_SCORE,
+        exclude: Iterable[int] = ()
+    ) -> List[ScoredKSB]:
+        """Pick the best KSBs from one row of scores, skipping those already tagged"""
+        excluded = set(exclude)
+        suggestions = []
+        for index in np.argsort(-scores, kind="stable"):
+            score = float(scores[index])
+            if score < min_score or len(suggestions) >= top_k:
+                break
+            if self.ksbs[index].id not in excluded:
+                suggestions.append(ScoredKSB(self.ksbs[index], round(score, 4)))
+        return suggestions
+
+    def suggest(
+        self,
+        text: str,
+        top_k: int = DEFAULT_SUGGESTIONS,
+        min_score: float = DEFAULT_MIN_SCORE,
+        exclude: Iterable[int] = ()
+    ) -> List[ScoredKSB]:
+        """Score one text against every KSB and return the best matches, highest first"""
+        return self.top(self.score([text])[0], top_k, min_score, exclude)
+
+class KSBVectorModelCache:
+    """
+    Process-local KSB vector model, built from the cached KSB catalogue.
+
+    The model is tagged with the catalogue version it was built from and
+    rebuilt only when ksb_catalogue returns a different version, so the
+    KSB matrix is computed once per catalogue change, not per request.
+    """
+
+    def __init__(self):
+        self._model: Optional[KSBVectorModel] = None
+
+    def get(self, catalogue: KSBCatalogue) -> KSBVectorModel:
+        model = self._model
+        if model is None or model.version != catalogue.version:
+            model = self._model = KSBVectorModel(catalogue)
+        return model
+
+    def invalidate(self) -> None:
+        self._model = None
+
+ksb_vectors = KSBVectorModelCache()
+
+class PortfolioScan:
+    """
+    Re-scores a user's evidence in batches and collects what is missing.
+
+    For every evidence item it keeps the best KSBs the item is not tagged
+    with; for every KSB that no evidence is tagged with (a coverage gap) it
+    keeps the few items that match it best.
+    """
+
+    def __init__(self, model: KSBVectorModel, top_k: int, min_score: float):
+        self.model = model
+        self.top_k = top_k
+        self.min_score = min_score
+        self.evidence_scored = 0
+        self.tagged: Set[int] = set()
+        self.items: List[Dict[str, Any]] = []
+        self._candidates: Dict[int, List[Tuple[float, str, str]]] = {ksb.id: [] for ksb in model.ksbs}
+
+    def add_batch(self, docs: List[Dict[str, Any]], ksb_ids_by_evidence: Dict[str, List[int]]) -> None:
+        scores = self.model.score([evidence_text(doc) for doc in docs])
+        self.evidence_scored += len(docs)
+        # Every KSB a document matches at all, row by row
+        above = scores >= self.min_score
+        for row, doc in enumerate(docs):
+            evidence_id = str(doc["_id"])
+            tagged = ksb_ids_by_evidence[evidence_id]
+            self.tagged.update(tagged)
+            suggestions = self.model.top(scores[row], self.top_k, self.min_score, exclude=tagged)
+            if suggestions:
+                self.items.append({
+                    "id": evidence_id,
+                    "title": doc.get("title"),
+                    "ksb_ids": tagged,
+                    "suggestions": [suggestion_item(suggestion) for suggestion in suggestions],
+                })
+            for index in np.flatnonzero(above[row]):
+                candidates = self._candidates[self.model.ksbs[index].id]
+                entry = (float(scores[row, index]), evidence_id, doc.get("title"))
+                if len(candidates) < GAP_CANDIDATES:
+                    heapq.heappush(candidates, entry)
+                elif entry > candidates[0]:
+                    heapq.heapreplace(candidates, entry)
+
+    def result(self, user_id: int) -> Dict[str, Any]:
+        gaps = []
+        for ksb in self.model.ksbs:
+            if ksb.id in self.tagged:
+                continue
+            candidates = sorted(self._candidates[ksb.id], reverse=True)
+            gaps.append({
+                "ksb_id": ksb.id,
+                "code": ksb.code,
+                "description": ksb.description,
+                "evidence": [
+                    {"id": evidence_id, "title": title, "score": round(score, 4)}
+                    for score, evidence_id, title in candidates
+                ],
+            })
+        return {
+            "user_id": user_id,
+            "evidence_scored": self.evidence_scored,
+            "covered_ksbs": len(self.tagged & {ksb.id for ksb in self.model.ksbs}),
+            "total_ksbs": len(self.model.ksbs),
+            "gaps": gaps,
+            "evidence": self.items,
+        }
+
+def suggestion_item(suggestion: ScoredKSB) -> Dict[str, Any]:
+    """The KSBSuggestion response fields of a scored KSB"""
+    return {
+        "ksb_id": suggestion.ksb.id,
+        "code": suggestion.ksb.code,
+        "description": suggestion.ksb.description,
+        "score": suggestion.score,
+    }
+
+def scan_portfolio(
+    db: Session,
+    mongo_db: Database,
+    catalogue: KSBCatalogue,
+    user_id: int,
+    top_k: int = DEFAULT_SUGGESTIONS,
+    min_score: float = DEFAULT_MIN_SCORE
+) -> Dict[str, Any]:
+    """
+    Scores all of a user's evidence against every KSB, one batch of
+    documents and one matrix product at a time.
+
+    Returns:
+        Dict[str, Any]: The KSBs with no tagged evidence and the evidence
+                        that best matches each, and the untagged KSBs
+                        suggested for each evidence item.
+    """
+    scan = PortfolioScan(ksb_vectors.get(catalogue), top_k, min_score)
+    cursor = mongo_db.evidence.find({"user_id": user_id}, SCAN_PROJECTION).sort(KEYSET_SORT)
+    for batch in iter_batches(cursor.batch_size(STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+        scan.add_batch(batch, document_ksb_ids(db, batch))
+    return scan.result(user_id)
+
+async def scan_portfolio_async(
+    db: AsyncSession,
+    mongo_db: AsyncDatabase,
+    catalogue: KSBCatalogue,
+    user_id: int,
+    top_k: int = DEFAULT_SUGGESTIONS,
+    min_score: float = DEFAULT_MIN_SCORE
+) -> Dict[str, Any]:
+    """Async counterpart of scan_portfolio; batches are scored in the threadpool to keep the event loop free"""
+    scan = PortfolioScan(ksb_vectors.get(catalogue), top_k, min_score)
+    cursor = mongo_db.evidence.find({"user_id": user_id}, SCAN_PROJECTION).sort(KEYSET_SORT)
+    async for batch in aiter_batches(cursor.batch_size(STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+        await run_in_threadpool(scan.add_batch, batch, await document_ksb_ids_async(db, batch))
+    return scan.result(user_id)
@@ -0,0 +1,115 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    Process-local counters and histograms, rendered in the Prometheus text
+    exposition format. Each worker keeps its own registry, and Prometheus
+    aggregates across the scraped instances.
+    """
+
+    def __init__(self, latency_buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self._latency_buckets = latency_buckets
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = defaultdict(lambda: defaultdict(float))
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = defaultdict(dict)
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        self._help[name] = (metric_type, help_text)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        with self._lock:
+            self._counters[name][_labels(**labels)] += amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = _labels(**labels)
+        with self._lock:
+            histogram = self._histograms[name].get(key)
+            if histogram is None:
+                histogram = self._histograms[name][key] = _Histogram(self._latency_buckets)
+            histogram.observe(value)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(set(self._counters) | set(self._histograms)):
+                if name in self._help:
+                    metric_type, help_text = self._help[name]
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                for labels, histogram in sorted(self._histograms.get(name, {}).items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.total)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Dict[Labels, float]]:
+        """Return the current counter values and histogram observation counts, keyed by metric name and labels"""
+        with self._lock:
+            values = {name: dict(series) for name, series in self._counters.items()}
+            for name, series in self._histograms.items():
+                values[name] = {labels: histogram.count for labels, histogram in series.items()}
+            return values
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+REQUEST_DURATION = "http_request_duration_seconds"
+DB_STATEMENTS = "db_statements_total"
+DB_TIME = "db_time_seconds_total"
+BUDGET_EXCEEDED = "http_request_budget_exceeded_total"
+
+metrics = MetricsRegistry()
+metrics.describe(REQUEST_DURATION, "histogram", "Request latency by route, method and status.")
+metrics.describe(DB_STATEMENTS, "counter", "Database statements and commands issued, by route and store.")
+metrics.describe(DB_TIME, "counter", "Time spent waiting on each store, by route.")
+metrics.describe(BUDGET_EXCEEDED, "counter", "Requests over the query-count or latency budget, by route.")
@@ -0,0 +1,147 @@
+from typing import Any, Dict, List
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.database import Database
+from api.services.evidence_pagination import KEYSET_SORT
+
+# Indexes on apprentice_hub.evidence. Each filter field is followed by the
+# keyset sort keys, so filtered listings are served in index order.
+EVIDENCE_INDEXES = [
+    IndexModel(
+        [("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+        name="user_id_created_at"
+    ),
+    IndexModel(
+        [("project_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+        name="project_id_created_at"
+    ),
+    IndexModel(
+        [("created_at", ASCENDING), ("_id", ASCENDING)],
+        name="created_at"
+    ),
+    IndexModel(
+        [("updated_at", ASCENDING), ("_id", ASCENDING)],
+        name="updated_at"
+    ),
+    # Multikey: one entry per KSB tag, so "tagged with any of" filters need no link-table join
+    IndexModel(
+        [("ksb_ids", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+        name="ksb_ids_created_at"
+    ),
+    IndexModel(
+        [("title", TEXT), ("content", TEXT)],
+        weights={"title": 5, "content": 1},
+        default_language="english",
+        name="title_content_text"
+    ),
+]
+
+# History entries for edited evidence, one per revision (see api.services.evidence_revisions)
+EVIDENCE_REVISION_INDEXES = [
+    IndexModel(
+        [("evidence_id", ASCENDING), ("revision", ASCENDING)],
+        unique=True,
+        name="evidence_id_revision"
+    ),
+]
+
+# Representative shapes of the evidence queries issued by the routers and
+# models, expressed as explain-able commands. Filter values are placeholders.
+EVIDENCE_QUERY_SHAPES: Dict[str, Dict[str, Any]] = {
+    "evidence list": {
+        "find": "evidence", "filter": {}, "sort": dict(KEYSET_SORT), "limit": 101
+    },
+    "evidence list by user": {
+        "find": "evidence", "filter": {"user_id": 0}, "sort": dict(KEYSET_SORT), "limit": 101
+    },
+    "evidence list by project": {
+        "find": "evidence", "filter": {"project_id": 0}, "sort": dict(KEYSET_SORT), "limit": 101
+    },
+    "evidence list by user and project": {
+        "find": "evidence", "filter": {"user_id": 0, "project_id": 0}, "sort": dict(KEYSET_SORT), "limit": 101
+    },
+    "evidence list by ksb": {
+        "find": "evidence", "filter": {"ksb_ids": {"$in": [0, 1]}}, "sort": dict(KEYSET_SORT), "limit": 101
+    },
+    "dashboard evidence count": {
+        "count": "evidence", "query": {"user_id": 0}
+    },
+    "project related evidence": {
+        "find": "evidence", "filter": {"project_id": {"$in": [0, 1]}}, "sort": dict(KEYSET_SORT)
+    },
+    "project evidence counts": {
+        "aggregate": "evidence", "cursor": {},
+        "pipeline": [{"$match": {"project_id": {"$in": [0, 1]}}}, {"$group": {"_id": "$project_id", "count": {"$sum": 1}}}]
+    },
+    "cohort evidence counts": {
+        "aggregate": "evidence", "cursor": {},
+        "pipeline": [{"$match": {"user_id": {"$in": [0, 1]}}}, {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}]
+    },
+    "portfolio stamp": {
+        "aggregate": "evidence", "cursor": {},
+        "pipeline": [{"$match": {"user_id": 0}}, {"$group": {"_id": None, "count": {"$sum": 1}, "last_updated": {"$max": "$updated_at"}}}]
+    },
+    "portfolio by ksb": {
+        "aggregate": "evidence", "cursor": {}, "allowDiskUse": True,
+        "pipeline": [
+            {"$match": {"user_id": 0}}, {"$project": {"ksb_ids": 1, "title": 1, "project_id": 1, "created_at": 1}},
+            {"$unwind": "$ksb_ids"}, {"$sort": {"ksb_ids": 1, "created_at": 1, "_id": 1}}
+        ]
+    },
+    "evidence revisions": {
+        "find": "evidence_revisions", "filter": {"evidence_id": 0, "revision": {"$gte": 1}}, "sort": {"revision": -1}
+    },
+    "reconciler scan": {
+        "find": "evidence", "filter": {"updated_at": {"$gte": 0, "$lt": 1}}, "sort": {"updated_at": 1, "_id": 1}, "limit": 1000
+    },
+    "evidence search": {
+        "find": "evidence", "filter": {"$text": {"$search": "placeholder"}, "user_id": 0}
+    },
+}
+
+def ensure_indexes(mongo_db: Database) -> List[str]:
+    """
+    Creates the declared evidence and revision history indexes. Safe to run
+    repeatedly: indexes that already exist with the same specification are
+    left untouched.
+
+    Returns:
+        List[str]: The names of the declared indexes.
+    """
+    return (
+        mongo_db.evidence.create_indexes(EVIDENCE_INDEXES)
+        + mongo_db.evidence_revisions.create_indexes(EVIDENCE_REVISION_INDEXES)
+    )
+
+def _has_collscan(plan: Any) -> bool:
+    """Walk an explain plan tree looking for a COLLSCAN stage"""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(_has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_has_collscan(item) for item in plan)
+    return False
+
+def _winning_plans(explanation: Any) -> List[Any]:
+    """Collect every winningPlan in an explain result; aggregations nest theirs under their first stage"""
+    if isinstance(explanation, dict):
+        if "winningPlan" in explanation:
+            return [explanation["winningPlan"]]
+        return [plan for value in explanation.values() for plan in _winning_plans(value)]
+    if isinstance(explanation, list):
+        return [plan for item in explanation for plan in _winning_plans(item)]
+    return []
+
+def find_collection_scans(mongo_db: Database) -> List[str]:
+    """
+    Explains every query shape in EVIDENCE_QUERY_SHAPES.
+
+    Returns:
+        List[str]: Names of the query shapes whose winning plan is a collection scan.
+    """
+    offenders = []
+    for name, command in EVIDENCE_QUERY_SHAPES.items():
+        explanation = mongo_db.command("explain", command, verbosity="queryPlanner")
+        if _has_collscan(_winning_plans(explanation)):
+            offenders.append(name)
+    return offenders
@@ -0,0 +1,427 @@
+import logging
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.models.postgres_models import LearningLog, OffTheJobBucket
+from api.services.dialects import period_start_expression, upsert_insert
+
+WEEK = "week"
+MONTH = "month"
+PERIODS = (WEEK, MONTH)
+
+# The off-the-job training target, as a share of contracted hours
+OTJ_TARGET_RATIO = 0.2
+DEFAULT_CONTRACTED_HOURS_PER_WEEK = 30.0
+ROLLING_WEEKS = 12
+
+# Logs can be entered late, so a period is only stored as a bucket once it
+# ended this long ago; younger periods are always aggregated live
+ROLLUP_GRACE = timedelta(days=28)
+
+logger = logging.getLogger(__name__)
+
+def utc_today() -> date:
+    """Today's date in UTC, the day every off-the-job period and dashboard figure is measured from"""
+    return datetime.utcnow().date()
+
+class OTJPeriod(NamedTuple):
+    period_start: date
+    minutes: int
+    log_count: int
+
+def period_start(day: date, period: str) -> date:
+    """Return the first day of the ISO week (Monday) or calendar month containing the day"""
+    if period == WEEK:
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+def next_period_start(start: date, period: str) -> date:
+    if period == WEEK:
+        return start + timedelta(days=7)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+def _as_date(value) -> date:
+    """Normalise a truncated period from either dialect (timestamp or ISO string) to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _buckets_statement(user_id: int, period: str):
+    return select(
+        OffTheJobBucket.period_start,
+        OffTheJobBucket.minutes,
+        OffTheJobBucket.log_count
+    ).where(
+        OffTheJobBucket.user_id == user_id,
+        OffTheJobBucket.period == period
+    ).order_by(OffTheJobBucket.period_start)
+
+def _live_totals_statement(dialect_name: str, user_id: int, period: str, live_from: Optional[date]):
+    """Group the logs from live_from onwards into periods with one aggregate over (user_id, date)"""
+    start = period_start_expression(dialect_name, period, LearningLog.date)
+    stmt = select(
+        start,
+        func.coalesce(func.sum(LearningLog.duration_minutes), 0),
+        func.count()
+    ).where(LearningLog.user_id == user_id)
+    if live_from is not None:
+        stmt = stmt.where(LearningLog.date >= datetime.combine(live_from, datetime.min.time()))
+    return stmt.group_by(start).order_by(start)
+
+def _merge_periods(
+    period: str,
+    buckets,
+    live_rows,
+    live_from: Optional[date],
+    current_start: date,
+    rollup_before: date
+) -> Tuple[List[OTJPeriod], List[OTJPeriod]]:
+    """
+    Combine stored buckets with live totals into a gap-free series, and pick
+    out the periods that were computed live and ended before rollup_before,
+    which should now be stored.
+    """
+    totals = {start: OTJPeriod(start, minutes, log_count) for start, minutes, log_count in buckets}
+    for start, minutes, log_count in live_rows:
+        start = _as_date(start)
+        totals[start] = OTJPeriod(start, int(minutes), log_count)
+    if not totals:
+        return [], []
+
+    # Periods without logs count as zero, so rolling averages and targets see them
+    series = []
+    start, last = min(totals), max(max(totals), current_start)
+    while start <= last:
+        series.append(totals.get(start, OTJPeriod(start, 0, 0)))
+        start = next_period_start(start, period)
+
+    to_store = [
+        row for row in series
+        if next_period_start(row.period_start, period) <= rollup_before
+        and (live_from is None or row.period_start >= live_from)
+    ]
+    return series, to_store
+
+def _store_buckets_statement(dialect_name: str, user_id: int, period: str, rows: List[OTJPeriod]):
+    now = datetime.utcnow()
+    stmt = upsert_insert(dialect_name)(OffTheJobBucket).values([
+        {
+            "user_id": user_id, "period": period, "period_start": row.period_start,
+            "minutes": row.minutes, "log_count": row.log_count, "updated_at": now,
+        }
+        for row in rows
+    ])
+    # A concurrent request may have rolled the same periods up already
+    return stmt.on_conflict_do_nothing()
+
+def load_otj_periods(
+    db: Session,
+    user_id: int,
+    period: str,
+    today: Optional[date] = None,
+    grace: timedelta = ROLLUP_GRACE,
+    best_effort: bool = True
+) -> List[OTJPeriod]:
+    """
+    Reads a user's off-the-job minutes per week or month.
+
+    Old periods are read from the pre-rolled otj_hours_buckets table.
+    Only the logs after the last stored bucket are aggregated live, with
+    one GROUP BY over the (user_id, date) index. Periods in that live
+    result that ended more than `grace` ago are then stored as buckets, so
+    each period is aggregated from the raw logs once, after late logs have
+    had time to arrive. Logs added to a stored period afterwards need
+    invalidate_otj_buckets or scripts/rebuild_otj_buckets.py.
+
+    Storing the buckets is only a cache write, so by default a failure
+    (e.g. a lock conflict with a concurrent request for the same user) is
+    rolled back and logged, and the totals are still returned; the next
+    read tries again.
+
+    Args:
+        db (Session): The PostgreSQL session. New buckets are committed on it.
+        user_id (int): The apprentice whose logs are aggregated.
+        period (str): "week" or "month".
+        today (Optional[date]): The current date, which decides the open period. Defaults to today (UTC).
+        grace (timedelta): How long after a period ends it is still aggregated live.
+        best_effort (bool): Ignore a failure to store the buckets. Pass False to raise it instead.
+
+    Returns:
+        List[OTJPeriod]: One entry per period from the user's first logged
+                         period up to the current one, including empty periods.
+    """
+    today = today or utc_today()
+    current_start = period_start(today, period)
+    dialect_name = db.get_bind().dialect.name
+
+    buckets = db.execute(_buckets_statement(user_id, period)).all()
+    live_from = next_period_start(buckets[-1].period_start, period) if buckets else None
+    live_rows = db.execute(_live_totals_statement(dialect_name, user_id, period, live_from)).all()
+
+    series, to_store = _merge_periods(period, buckets, live_rows, live_from, current_start, today - grace)
+    if to_store:
+        try:
+            db.execute(_store_buckets_statement(dialect_name, user_id, period, to_store))
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            if not best_effort:
+                raise
+            logger.warning("Could not store %s buckets for user %s", period, user_id, exc_info=True)
+    return series
+
+async def load_otj_periods_async(
+    db: AsyncSession,
+    user_id: int,
+    period: str,
+    today: Optional[date] = None,
+    grace: timedelta = ROLLUP_GRACE,
+    best_effort: bool = True
+) -> List[OTJPeriod]:
+    """Async counterpart of load_otj_periods"""
+    today = today or utc_today()
+    current_start = period_start(today, period)
+    dialect_name = db.get_bind().dialect.name
+
+    buckets = (await db.execute(_buckets_statement(user_id, period))).all()
+    live_from = next_period_start(buckets[-1].period_start, period) if buckets else None
+    live_rows = (await db.execute(_live_totals_statement(dialect_name, user_id, period, live_from))).all()
+
+    series, to_store = _merge_periods(period, buckets, live_rows, live_from, current_start, today - grace)
+    if to_store:
+        try:
+            await db.execute(_store_buckets_statement(dialect_name, user_id, period, to_store))
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            if not best_effort:
+                raise
+            logger.warning("Could not store %s buckets for user %s", period, user_id, exc_info=True)
+    return series
+
+def _invalidate_statements(user_id: Optional[int], log_date: Optional[date]):
+    statements = []
+    for period in PERIODS:
+        stmt = delete(OffTheJobBucket).where(OffTheJobBucket.period == period)
+        if user_id is not None:
+            stmt = stmt.where(OffTheJobBucket.user_id == user_id)
+        if log_date is not None:
+            stmt = stmt.where(OffTheJobBucket.period_start >= period_start(log_date, period))
+        statements.append(stmt)
+    return statements
+
+def invalidate_otj_buckets(db: Session, user_id: int, log_date: date) -> None:
+    """
+    Drops the stored buckets from the period containing log_date onwards.
+
+    Call this in the same transaction as any insert, update or delete of
+    a learning log dated in a closed period. The dropped periods are
+    aggregated live and rolled up again on the next read. Later buckets
+    are dropped too, because the stored buckets must stay contiguous.
+    """
+    for stmt in _invalidate_statements(user_id, log_date):
+        db.execute(stmt)
+
+async def invalidate_otj_buckets_async(db: AsyncSession, user_id: int, log_date: date) -> None:
+    """Async counterpart of invalidate_otj_buckets"""
+    for stmt in _invalidate_statements(user_id, log_date):
+        await db.execute(stmt)
+
+def rebuild_otj_buckets(
+    db: Session,
+    user_id: Optional[int] = None,
+    since: Optional[date] = None,
+    today: Optional[date] = None
+) -> int:
+    """
+    Drops stored buckets and rolls them up again from the learning logs.
+
+    Use this after logs were written without invalidate_otj_buckets, for
+    example by an import, or to repair drift.
+
+    Args:
+        db (Session): The PostgreSQL session; the rebuild is committed on it.
+        user_id (Optional[int]): Only rebuild this user; all users if None.
+        since (Optional[date]): Only rebuild periods from the one containing this date.
+        today (Optional[date]): The current date. Defaults to today (UTC).
+
+    Returns:
+        int: The number of users whose buckets were rolled up again.
+    """
+    for stmt in _invalidate_statements(user_id, since):
+        db.execute(stmt)
+    db.commit()
+
+    user_ids = [user_id] if user_id is not None else db.execute(
+        select(LearningLog.user_id).distinct().order_by(LearningLog.user_id)
+    ).scalars().all()
+    for log_user_id in user_ids:
+        for period in PERIODS:
+            # Reading the periods stores every bucket that is past the grace window
+            load_otj_periods(db, log_user_id, period, today, best_effort=False)
+    return len(user_ids)
+
+def minutes_to_hours(minutes: float) -> float:
+    return round(minutes / 60, 2)
+
+def rolling_averages(minutes: Iterable[int], window: int = ROLLING_WEEKS) -> List[float]:
+    """Trailing mean over the last `window` values, or over all values seen so far while fewer are available"""
+    averages = []
+    recent = deque(maxlen=window)
+    total = 0
+    for value in minutes:
+        if len(recent) == window:
+            total -= recent[0]
+        recent.append(value)
+        total += value
+        averages.append(total / len(recent))
+    return averages
+
+def weekly_hours(weeks: List[OTJPeriod]) -> List[Dict[str, Any]]:
+    """Weekly totals in hours with the rolling 12-week average at each week"""
+    averages = rolling_averages(week.minutes for week in weeks)
+    return [
+        {
+            "period_start": week.period_start,
+            "hours": minutes_to_hours(week.minutes),
+            "log_count": week.log_count,
+            "rolling_average_hours": minutes_to_hours(average),
+        }
+        for week, average in zip(weeks, averages)
+    ]
+
+def monthly_hours(months: List[OTJPeriod]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "period_start": month.period_start,
+            "hours": minutes_to_hours(month.minutes),
+            "log_count": month.log_count,
+        }
+        for month in months
+    ]
+
+def otj_compliance(
+    user_id: int,
+    weeks: List[OTJPeriod],
+    today: date,
+    contracted_hours_per_week: float = DEFAULT_CONTRACTED_HOURS_PER_WEEK,
+    since: Optional[date] = None
+) -> Dict[str, Any]:
+    """
+    Compares a user's off-the-job hours with the 20% target.
+
+    The target is measured over completed weeks, from the week containing
+    `since` (or the user's first logged week) to last week, so a partly
+    logged current week never counts against the apprentice. The current
+    week's hours are reported separately.
+    """
+    current_start = period_start(today, WEEK)
+    first_start = period_start(since, WEEK) if since else (weeks[0].period_start if weeks else current_start)
+    closed = [week for week in weeks if first_start <= week.period_start < current_start]
+    weeks_elapsed = max((current_start - first_start).days // 7, 0)
+
+    weekly_target_minutes = contracted_hours_per_week * 60 * OTJ_TARGET_RATIO
+    target_minutes = weekly_target_minutes * weeks_elapsed
+    actual_minutes = sum(week.minutes for week in closed)
+    current_minutes = sum(week.minutes for week in weeks if week.period_start == current_start)
+    recent = [week.minutes for week in closed[-ROLLING_WEEKS:]]
+    recent_weeks = min(weeks_elapsed, ROLLING_WEEKS)
+
+    return {
+        "user_id": user_id,
+        "since": first_start,
+        "weeks_elapsed": weeks_elapsed,
+        "contracted_hours_per_week": contracted_hours_per_week,
+        "weekly_target_hours": minutes_to_hours(weekly_target_minutes),
+        "target_hours": minutes_to_hours(target_minutes),
+        "actual_hours": minutes_to_hours(actual_minutes),
+        "current_week_hours": minutes_to_hours(current_minutes),
+        "rolling_average_hours": minutes_to_hours(sum(recent) / recent_weeks) if recent_weeks else 0.0,
+        "percentage_of_target": round(actual_minutes / target_minutes * 100, 1) if target_minutes else 0.0,
+        "on_track": actual_minutes >= target_minutes,
+    }
+
+class OTJTotals(NamedTuple):
+    first_log_date: Optional[date]
+    closed_minutes: int
+    recent_minutes: int
+    current_minutes: int
+
+def _cohort_totals_statement(user_ids: List[int], today: date):
+    """One aggregate over (user_id, date) splitting each user's minutes by closed, recent and current weeks"""
+    current_start = datetime.combine(period_start(today, WEEK), datetime.min.time())
+    recent_start = current_start - timedelta(weeks=ROLLING_WEEKS)
+    minutes = LearningLog.duration_minutes
+
+    def minutes_where(condition):
+        return func.coalesce(func.sum(case((condition, minutes), else_=0)), 0)
+
+    return select(
+        LearningLog.user_id,
+        func.min(LearningLog.date),
+        minutes_where(LearningLog.date < current_start),
+        minutes_where((LearningLog.date >= recent_start) & (LearningLog.date < current_start)),
+        minutes_where(LearningLog.date >= current_start),
+    ).where(LearningLog.user_id.in_(user_ids)).group_by(LearningLog.user_id)
+
+def _group_cohort_totals(user_ids: List[int], rows) -> Dict[int, OTJTotals]:
+    totals = {user_id: OTJTotals(None, 0, 0, 0) for user_id in user_ids}
+    for user_id, first_log, closed, recent, current in rows:
+        totals[user_id] = OTJTotals(_as_date(first_log), int(closed), int(recent), int(current))
+    return totals
+
+def load_cohort_otj_totals(db: Session, user_ids: List[int], today: Optional[date] = None) -> Dict[int, OTJTotals]:
+    """
+    Totals the off-the-job minutes of many users with a single grouped query.
+
+    Unlike load_otj_periods this reads no buckets and writes none: a cohort
+    view needs only each user's totals, not their weekly series.
+
+    Returns:
+        Dict[int, OTJTotals]: Keyed by user id. Every requested user is present.
+    """
+    if not user_ids:
+        return {}
+    today = today or utc_today()
+    return _group_cohort_totals(user_ids, db.execute(_cohort_totals_statement(user_ids, today)).all())
+
+async def load_cohort_otj_totals_async(
+    db: AsyncSession,
+    user_ids: List[int],
+    today: Optional[date] = None
+) -> Dict[int, OTJTotals]:
+    """Async counterpart of load_cohort_otj_totals"""
+    if not user_ids:
+        return {}
+    today = today or utc_today()
+    rows = (await db.execute(_cohort_totals_statement(user_ids, today))).all()
+    return _group_cohort_totals(user_ids, rows)
+
+def otj_summary(
+    totals: OTJTotals,
+    today: date,
+    contracted_hours_per_week: float = DEFAULT_CONTRACTED_HOURS_PER_WEEK
+) -> Dict[str, Any]:
+    """The headline figures of otj_compliance, measured from the user's first logged week"""
+    current_start = period_start(today, WEEK)
+    first_start = period_start(totals.first_log_date, WEEK) if totals.first_log_date else current_start
+    weeks_elapsed = max((current_start - first_start).days // 7, 0)
+    target_minutes = contracted_hours_per_week * 60 * OTJ_TARGET_RATIO * weeks_elapsed
+    recent_weeks = min(weeks_elapsed, ROLLING_WEEKS)
+
+    return {
+        "actual_hours": minutes_to_hours(totals.closed_minutes),
+        "target_hours": minutes_to_hours(target_minutes),
+        "current_week_hours": minutes_to_hours(totals.current_minutes),
+        "rolling_average_hours": minutes_to_hours(totals.recent_minutes / recent_weeks) if recent_weeks else 0.0,
+        "percentage_of_target": round(totals.closed_minutes / target_minutes * 100, 1) if target_minutes else 0.0,
+        "on_track": totals.closed_minutes >= target_minutes,
+    }
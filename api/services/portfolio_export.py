@@ -0,0 +1,362 @@
+import re
+import zipfile
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from database.models.postgres_models import Project, User
+from api.services.etags import make_etag
+from api.services.evidence_links import document_ksb_ids, document_ksb_ids_async
+from api.services.evidence_pagination import KEYSET_SORT, STREAM_BATCH_SIZE, aiter_batches, iter_batches
+from api.services.ksb_catalogue import CachedKSB, KSBCatalogue, ksb_catalogue
+
+PORTFOLIO_MEDIA_TYPE = "application/zip"
+
+EVIDENCE_PROJECTION = {
+    "title": 1, "content": 1, "content_type": 1, "project_id": 1,
+    "ksb_ids": 1, "created_at": 1, "updated_at": 1, "revision": 1,
+}
+
+# Zip timestamps cannot predate 1980
+_ZIP_EPOCH = datetime(1980, 1, 1)
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+class ExportProject(NamedTuple):
+    id: int
+    name: Optional[str]
+    description: Optional[str]
+    status: Optional[str]
+    start_date: Optional[datetime]
+    end_date: Optional[datetime]
+
+class PortfolioContext(NamedTuple):
+    """Everything an export needs besides the evidence itself, and the stamp its ETag is built from"""
+    user_id: int
+    user_name: Optional[str]
+    projects: Dict[int, ExportProject]
+    catalogue: KSBCatalogue
+    evidence_count: int
+    last_updated: Optional[datetime]
+
+def _user_statement(user_id: int):
+    return select(User.name).where(User.id == user_id)
+
+def _projects_statement(user_id: int):
+    return select(
+        Project.id, Project.name, Project.description, Project.status, Project.start_date, Project.end_date
+    ).where(Project.user_id == user_id).order_by(Project.id)
+
+def _stamp_pipeline(user_id: int) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "last_updated": {"$max": "$updated_at"}}},
+    ]
+
+def _portfolio_context(user_id, user_name, project_rows, catalogue, stamp_rows) -> PortfolioContext:
+    stamp = stamp_rows[0] if stamp_rows else {"count": 0, "last_updated": None}
+    return PortfolioContext(
+        user_id=user_id,
+        user_name=user_name,
+        projects={row.id: ExportProject(*row) for row in project_rows},
+        catalogue=catalogue,
+        evidence_count=stamp["count"],
+        last_updated=stamp["last_updated"],
+    )
+
+def load_portfolio_context(db: Session, mongo_db: Database, user_id: int) -> PortfolioContext:
+    """Load the user, their projects, the KSB catalogue and the evidence count and last write time"""
+    return _portfolio_context(
+        user_id,
+        db.execute(_user_statement(user_id)).scalar(),
+        db.execute(_projects_statement(user_id)).all(),
+        ksb_catalogue.get(db),
+        list(mongo_db.evidence.aggregate(_stamp_pipeline(user_id))),
+    )
+
+async def load_portfolio_context_async(db: AsyncSession, mongo_db: AsyncDatabase, user_id: int) -> PortfolioContext:
+    """Async counterpart of load_portfolio_context"""
+    return _portfolio_context(
+        user_id,
+        (await db.execute(_user_statement(user_id))).scalar(),
+        (await db.execute(_projects_statement(user_id))).all(),
+        await ksb_catalogue.get_async(db),
+        await (await mongo_db.evidence.aggregate(_stamp_pipeline(user_id))).to_list(),
+    )
+
+def portfolio_etag(context: PortfolioContext) -> str:
+    """
+    The archive is built deterministically from what this stamp covers, so
+    equal ETags mean byte-identical archives and a download can be resumed.
+    """
+    last_updated = context.last_updated.isoformat() if context.last_updated else None
+    return make_etag(
+        "portfolio", context.user_id, context.user_name, context.catalogue.version,
+        context.evidence_count, last_updated, *context.projects.values()
+    )
+
+def _ksb_evidence_pipeline(user_id: int) -> List[Dict[str, Any]]:
+    """One row per (KSB, evidence) pair of the user's evidence, in KSB order"""
+    return [
+        {"$match": {"user_id": user_id}},
+        {"$project": {"ksb_ids": 1, "title": 1, "project_id": 1, "created_at": 1}},
+        {"$unwind": "$ksb_ids"},
+        {"$sort": {"ksb_ids": 1, "created_at": 1, "_id": 1}},
+    ]
+
+def _date_time(moment: Optional[datetime]) -> tuple:
+    return max(moment or _ZIP_EPOCH, _ZIP_EPOCH).timetuple()[:6]
+
+def _ksb_path(ksb: CachedKSB) -> str:
+    return f"ksbs/{_UNSAFE_NAME.sub('-', ksb.code)}.md"
+
+def evidence_path(doc: Dict[str, Any]) -> str:
+    """The archive path of an evidence item, derived only from fields both export passes read"""
+    slug = _UNSAFE_NAME.sub("-", (doc.get("title") or "").lower()).strip("-")[:40].rstrip("-") or "evidence"
+    return f"evidence/{doc['created_at']:%Y-%m-%d}-{slug}-{doc['_id']}.md"
+
+def _first_line(text: Optional[str]) -> str:
+    for line in (text or "").splitlines():
+        line = line.strip().lstrip("#").strip()
+        if line:
+            return line
+    return ""
+
+def _table_cell(text: str) -> str:
+    return text.replace("|", "\\|")
+
+class _ZipBuffer:
+    """A write-only file object that collects the zip output until it is taken"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+class PortfolioArchive:
+    """
+    Builds the portfolio zip one entry at a time.
+
+    Each entry is compressed as it is written and the output is taken after
+    every step, so memory holds one evidence item or KSB line at a time, not
+    the archive. Layout:
+
+        index.md            KSB coverage table, gaps and projects
+        ksbs/<code>.md      the KSB description and its evidence, oldest first
+        evidence/<file>.md  one file per evidence item with its project and KSBs
+
+    Entries are written in a fixed order with timestamps taken from the data,
+    so the same portfolio always gives the same bytes.
+    """
+
+    def __init__(self, context: PortfolioContext):
+        self.context = context
+        self.ksb_counts: Dict[int, int] = {}
+        self._buffer = _ZipBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, "w", compression=zipfile.ZIP_DEFLATED)
+        self._pending_ksbs = iter(context.catalogue.ksbs)
+        self._ksb: Optional[CachedKSB] = None
+        self._ksb_file = None
+
+    def _entry(self, path: str, moment: Optional[datetime]) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(path, date_time=_date_time(moment))
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        return info
+
+    def take(self) -> bytes:
+        return self._buffer.take()
+
+    def _close_ksb(self) -> None:
+        if self._ksb_file is None:
+            return
+        if not self.ksb_counts.get(self._ksb.id):
+            self._ksb_file.write(b"No evidence is tagged with this KSB yet.\n")
+        self._ksb_file.close()
+        self._ksb_file = None
+
+    def _open_next_ksb(self) -> bool:
+        self._close_ksb()
+        self._ksb = next(self._pending_ksbs, None)
+        if self._ksb is None:
+            return False
+        self._ksb_file = self._zip.open(self._entry(_ksb_path(self._ksb), self.context.last_updated), "w")
+        self._ksb_file.write(f"# {self._ksb.code}\n\n{self._ksb.description or ''}\n\n## Evidence\n\n".encode("utf-8"))
+        return True
+
+    def add_ksb_evidence(self, row: Dict[str, Any]) -> None:
+        """Add one row of _ksb_evidence_pipeline; rows must arrive in KSB id order"""
+        ksb_id = row["ksb_ids"]
+        while self._ksb is None or self._ksb.id < ksb_id:
+            if not self._open_next_ksb():
+                return
+        if self._ksb.id != ksb_id:
+            # Tagged with a KSB that has since been removed from the catalogue
+            return
+        self.ksb_counts[ksb_id] = self.ksb_counts.get(ksb_id, 0) + 1
+        project = self.context.projects.get(row.get("project_id"))
+        context = f"{row['created_at']:%Y-%m-%d}" + (f", {project.name}" if project else "")
+        self._ksb_file.write(f"- [{row.get('title', '')}](../{evidence_path(row)}) ({context})\n".encode("utf-8"))
+
+    def finish_ksbs(self) -> None:
+        """Write the files of the KSBs after the last one that has evidence"""
+        while self._open_next_ksb():
+            pass
+
+    def add_evidence(self, doc: Dict[str, Any], ksb_ids: List[int]) -> None:
+        by_id = self.context.catalogue.by_id
+        ksbs = [by_id[ksb_id] for ksb_id in sorted(ksb_ids) if ksb_id in by_id]
+        project = self.context.projects.get(doc.get("project_id"))
+        lines = [f"# {doc.get('title', '')}", ""]
+        if project:
+            lines.append(f"- Project: {project.name}")
+        if ksbs:
+            lines.append("- KSBs: " + ", ".join(f"[{ksb.code}](../{_ksb_path(ksb)})" for ksb in ksbs))
+        lines.append(f"- Created: {doc['created_at']:%Y-%m-%d %H:%M}")
+        lines.append(f"- Last updated: {doc['updated_at']:%Y-%m-%d %H:%M} (revision {doc.get('revision', 1)})")
+        lines += ["", "---", "", doc.get("content", "")]
+        self._zip.writestr(self._entry(evidence_path(doc), doc["updated_at"]), "\n".join(lines))
+
+    def _index(self) -> str:
+        context = self.context
+        ksbs = context.catalogue.ksbs
+        covered = sum(1 for ksb in ksbs if self.ksb_counts.get(ksb.id))
+        lines = [
+            f"# Portfolio: {context.user_name or f'user {context.user_id}'}",
+            "",
+            f"{context.evidence_count} evidence items, {covered} of {len(ksbs)} KSBs evidenced.",
+        ]
+        if context.last_updated:
+            lines.append(f"Evidence last updated {context.last_updated:%Y-%m-%d %H:%M} UTC.")
+        lines += ["", "## KSBs", "", "| KSB | Evidence | Description |", "| --- | ---: | --- |"]
+        for ksb in ksbs:
+            lines.append(
+                f"| [{ksb.code}]({_ksb_path(ksb)}) | {self.ksb_counts.get(ksb.id, 0)} "
+                f"| {_table_cell(_first_line(ksb.description))} |"
+            )
+        gaps = [ksb.code for ksb in ksbs if not self.ksb_counts.get(ksb.id)]
+        if gaps:
+            lines += ["", "## Not yet evidenced", "", ", ".join(gaps)]
+        if context.projects:
+            lines += ["", "## Projects"]
+            for project in context.projects.values():
+                dates = " to ".join(f"{moment:%Y-%m-%d}" for moment in (project.start_date, project.end_date) if moment)
+                details = ", ".join(part for part in (project.status, dates) if part)
+                lines += ["", f"### {project.name}"]
+                if details:
+                    lines.append(f"*{details}*")
+                if project.description:
+                    lines += ["", project.description]
+        return "\n".join(lines) + "\n"
+
+    def finish(self) -> None:
+        """Write the index and the zip central directory"""
+        self._zip.writestr(self._entry("index.md", self.context.last_updated), self._index())
+        self._zip.close()
+
+def iter_portfolio(db: Session, mongo_db: Database, context: PortfolioContext) -> Iterator[bytes]:
+    """
+    Yields the portfolio zip in pieces, reading the evidence with two
+    batched cursors: one $unwind aggregation for the KSB files, then the
+    documents themselves. KSB tags come from the ksb_ids stored on the
+    documents, so evidence written before they were stored appears under
+    its KSBs only after scripts/backfill_evidence_ksb_ids.py has run.
+    """
+    archive = PortfolioArchive(context)
+    rows = mongo_db.evidence.aggregate(
+        _ksb_evidence_pipeline(context.user_id), allowDiskUse=True, batchSize=STREAM_BATCH_SIZE
+    )
+    for batch in iter_batches(rows, STREAM_BATCH_SIZE):
+        for row in batch:
+            archive.add_ksb_evidence(row)
+        yield archive.take()
+    archive.finish_ksbs()
+
+    cursor = mongo_db.evidence.find({"user_id": context.user_id}, EVIDENCE_PROJECTION).sort(KEYSET_SORT)
+    for batch in iter_batches(cursor.batch_size(STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+        ksb_ids_by_evidence = document_ksb_ids(db, batch)
+        for doc in batch:
+            archive.add_evidence(doc, ksb_ids_by_evidence[str(doc["_id"])])
+        yield archive.take()
+
+    archive.finish()
+    yield archive.take()
+
+async def iter_portfolio_async(db: AsyncSession, mongo_db: AsyncDatabase, context: PortfolioContext) -> AsyncIterator[bytes]:
+    """Async counterpart of iter_portfolio"""
+    archive = PortfolioArchive(context)
+    rows = await mongo_db.evidence.aggregate(
+        _ksb_evidence_pipeline(context.user_id), allowDiskUse=True, batchSize=STREAM_BATCH_SIZE
+    )
+    async for batch in aiter_batches(rows, STREAM_BATCH_SIZE):
+        for row in batch:
+            archive.add_ksb_evidence(row)
+        yield archive.take()
+    archive.finish_ksbs()
+
+    cursor = mongo_db.evidence.find({"user_id": context.user_id}, EVIDENCE_PROJECTION).sort(KEYSET_SORT)
+    async for batch in aiter_batches(cursor.batch_size(STREAM_BATCH_SIZE), STREAM_BATCH_SIZE):
+        ksb_ids_by_evidence = await document_ksb_ids_async(db, batch)
+        for doc in batch:
+            archive.add_evidence(doc, ksb_ids_by_evidence[str(doc["_id"])])
+        yield archive.take()
+
+    archive.finish()
+    yield archive.take()
+
+class ArchiveSizes:
+    """
+    Process-local record of archive sizes by ETag.
+
+    A range response must state the full size, which a streamed zip only
+    knows at its end. Sizes are recorded whenever an archive is streamed
+    to completion, so resuming a download normally costs nothing extra; on
+    a miss the archive is generated once without being sent, to measure it.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[int]:
+        size = self._sizes.get(etag)
+        if size is not None:
+            self._sizes.move_to_end(etag)
+        return size
+
+    def set(self, etag: str, size: int) -> None:
+        self._sizes[etag] = size
+        self._sizes.move_to_end(etag)
+        while len(self._sizes) > self.max_entries:
+            self._sizes.popitem(last=False)
+
+    def measured(self, chunks: Iterator[bytes], etag: str) -> Iterator[bytes]:
+        """Pass chunks through, recording the total size if the stream runs to the end"""
+        size = 0
+        for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        self.set(etag, size)
+
+    async def measured_async(self, chunks: AsyncIterator[bytes], etag: str) -> AsyncIterator[bytes]:
+        """Async counterpart of measured"""
+        size = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            yield chunk
+        self.set(etag, size)
+
+archive_sizes = ArchiveSizes()
@@ -0,0 +1,95 @@
+from typing import Any, Dict, Iterable, List, Union
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.database import Database
+from api.services.evidence_pagination import KEYSET_SORT
+
+FULL = "full"
+SUMMARY = "summary"
+COUNT = "count"
+MODES = (FULL, SUMMARY, COUNT)
+
+# Fields returned in summary mode: enough to list evidence without its content
+SUMMARY_PROJECTION = {
+    "user_id": 1,
+    "project_id": 1,
+    "title": 1,
+    "content_type": 1,
+    "excerpt": 1,
+    "content_length": 1,
+    "ksb_ids": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+ProjectEvidence = Dict[int, Union[int, List[Dict[str, Any]]]]
+
+def _count_pipeline(project_ids: List[int]) -> List[Dict[str, Any]]:
+    return [
+        {"$match": {"project_id": {"$in": project_ids}}},
+        {"$group": {"_id": "$project_id", "count": {"$sum": 1}}},
+    ]
+
+def _find_arguments(project_ids: List[int], mode: str):
+    projection = SUMMARY_PROJECTION if mode == SUMMARY else None
+    return {"project_id": {"$in": project_ids}}, projection
+
+def _check_mode(mode: str) -> None:
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode!r}, expected one of {', '.join(MODES)}")
+
+def _group_by_project(project_ids: List[int], docs) -> Dict[int, List[Dict[str, Any]]]:
+    grouped: Dict[int, List[Dict[str, Any]]] = {project_id: [] for project_id in project_ids}
+    for doc in docs:
+        grouped[doc["project_id"]].append(doc)
+    return grouped
+
+def load_project_evidence(mongo_db: Database, project_ids: Iterable[int], mode: str = SUMMARY) -> ProjectEvidence:
+    """
+    Fetches the evidence of many projects with a single MongoDB query.
+
+    Args:
+        mongo_db (Database): The MongoDB database holding the evidence collection.
+        project_ids (Iterable[int]): The projects to load.
+        mode (str): "summary" returns documents without their content,
+                    "full" returns whole documents and "count" returns only
+                    the number of documents per project.
+
+    Returns:
+        ProjectEvidence: Keyed by project id. Every requested id is present,
+                         with an empty list (or 0) if it has no evidence.
+                         Documents are in creation order.
+    """
+    _check_mode(mode)
+    project_ids = list(dict.fromkeys(project_ids))
+    if not project_ids:
+        return {}
+
+    if mode == COUNT:
+        counts = {project_id: 0 for project_id in project_ids}
+        for row in mongo_db.evidence.aggregate(_count_pipeline(project_ids)):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    query, projection = _find_arguments(project_ids, mode)
+    return _group_by_project(project_ids, mongo_db.evidence.find(query, projection).sort(KEYSET_SORT))
+
+async def load_project_evidence_async(
+    mongo_db: AsyncDatabase,
+    project_ids: Iterable[int],
+    mode: str = SUMMARY
+) -> ProjectEvidence:
+    """Async counterpart of load_project_evidence"""
+    _check_mode(mode)
+    project_ids = list(dict.fromkeys(project_ids))
+    if not project_ids:
+        return {}
+
+    if mode == COUNT:
+        counts = {project_id: 0 for project_id in project_ids}
+        async for row in await mongo_db.evidence.aggregate(_count_pipeline(project_ids)):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    query, projection = _find_arguments(project_ids, mode)
+    docs = await mongo_db.evidence.find(query, projection).sort(KEYSET_SORT).to_list()
+    return _group_by_project(project_ids, docs)
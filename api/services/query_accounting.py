@@ -0,0 +1,157 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import List, NamedTuple, Optional
+from pymongo import monitoring
+from sqlalchemy import event
+from api.services.metrics import (
+    BUDGET_EXCEEDED, DB_STATEMENTS, DB_TIME, REQUEST_DURATION, MetricsRegistry, metrics
+)
+
+logger = logging.getLogger(__name__)
+
+POSTGRES = "postgres"
+MONGODB = "mongodb"
+STATEMENT_LOG_WIDTH = 200
+
+class Statement(NamedTuple):
+    store: str
+    text: str
+    duration: float
+
+class RequestStats:
+    """The statements issued while serving one request"""
+
+    def __init__(self):
+        self.statements: List[Statement] = []
+
+    def record(self, store: str, text: str, duration: float) -> None:
+        self.statements.append(Statement(store, text, duration))
+
+    def count(self, store: str) -> int:
+        return sum(1 for statement in self.statements if statement.store == store)
+
+    def time(self, store: str) -> float:
+        return sum(statement.duration for statement in self.statements if statement.store == store)
+
+# Set by the middleware for the duration of a request. Sync routes run in the
+# threadpool with a copy of the context, so they record into the same object.
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_request.get()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_times"].pop()
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record(POSTGRES, " ".join(statement.split()), time.perf_counter() - start)
+
+def instrument_engine(engine) -> None:
+    """Record every statement the engine executes against the current request. Pass an AsyncEngine's sync_engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+class MongoCommandRecorder(monitoring.CommandListener):
+    """
+    Records MongoDB commands against the current request. pymongo publishes
+    the events from the code path issuing the command, so they see the
+    request's context. Pass an instance in the client's event_listeners.
+    """
+
+    def __init__(self):
+        self._started = {}
+
+    def started(self, event):
+        if _current_request.get() is None:
+            return
+        collection = event.command.get(event.command_name)
+        target = f" {event.database_name}.{collection}" if isinstance(collection, str) else ""
+        self._started[(event.connection_id, event.request_id)] = f"{event.command_name}{target}"
+
+    def _finish(self, event, suffix: str = ""):
+        text = self._started.pop((event.connection_id, event.request_id), None)
+        stats = _current_request.get()
+        if stats is not None and text is not None:
+            stats.record(MONGODB, text + suffix, event.duration_micros / 1_000_000)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, " (failed)")
+
+def _route_label(scope) -> str:
+    # Templated paths keep the label set bounded; unmatched paths share one label
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class QueryAccountingMiddleware:
+    """
+    ASGI middleware that times each request and counts its database work.
+
+    It records a latency histogram per route, the number of PostgreSQL
+    statements and MongoDB commands, and the time spent in each store. A
+    request over the statement-count or latency budget is logged with its
+    statement list, which shows N+1 query patterns as they happen.
+    """
+
+    def __init__(
+        self,
+        app,
+        query_budget: int = 20,
+        latency_budget_ms: float = 500.0,
+        registry: MetricsRegistry = metrics
+    ):
+        self.app = app
+        self.query_budget = query_budget
+        self.latency_budget_ms = latency_budget_ms
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            self._record(scope, status_code, time.perf_counter() - start, stats)
+
+    def _record(self, scope, status_code: int, duration: float, stats: RequestStats) -> None:
+        route = _route_label(scope)
+        self.registry.observe(REQUEST_DURATION, duration, method=scope["method"], route=route, status=str(status_code))
+        for store in (POSTGRES, MONGODB):
+            count = stats.count(store)
+            if count:
+                self.registry.inc(DB_STATEMENTS, count, route=route, store=store)
+                self.registry.inc(DB_TIME, stats.time(store), route=route, store=store)
+
+        duration_ms = duration * 1000
+        if len(stats.statements) > self.query_budget or duration_ms > self.latency_budget_ms:
+            self.registry.inc(BUDGET_EXCEEDED, route=route)
+            logger.warning(
+                "%s %s over budget: %.1f ms, %d statements (budget %d statements, %.0f ms)\n%s",
+                scope["method"], scope["path"], duration_ms, len(stats.statements),
+                self.query_budget, self.latency_budget_ms,
+                "\n".join(
+                    f"  [{statement.store}] {statement.duration * 1000:.2f} ms {statement.text[:STATEMENT_LOG_WIDTH]}"
+                    for statement in stats.statements
+                )
+            )
@@ -0,0 +1,37 @@
+import pytest
+
+from api.services.byte_ranges import parse_range, slice_chunks
+
+def test_parse_range_forms():
+    """
+    Tests closed, open-ended and suffix ranges, and that unsupported headers fall back to the full body.
+    """
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=990-5000", 1000) == (990, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=-5000", 1000) == (0, 999)
+    for header in (None, "", "bytes=-", "bytes=0-1,5-6", "items=0-1", "bytes=9-3"):
+        assert parse_range(header, 1000) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=1000-", 1000)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 1000)
+
+def test_slice_chunks_matches_slicing_the_whole_body():
+    """
+    Tests that slicing a chunked body gives the same bytes as slicing it whole, and stops reading once the range ends.
+    """
+    chunks = [b"abc", b"", b"defgh", b"ij", b"klmnop"]
+    body = b"".join(chunks)
+    for start in range(len(body)):
+        for end in range(start, len(body)):
+            assert b"".join(slice_chunks(chunks, start, end)) == body[start:end + 1]
+
+    read = []
+    def tracked():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+    assert b"".join(slice_chunks(tracked(), 0, 4)) == b"abcde"
+    assert len(read) == 3
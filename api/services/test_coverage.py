@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database.models.postgres_models import Base, KSB, KSBCoverage, EvidenceKSBLink
+from api.services.coverage import apply_link_changes, load_ksb_coverage, rebuild_coverage
+from api.services.ksb_catalogue import ksb_catalogue
+
+class MockCursor(list):
+    def batch_size(self, size):
+        return self
+
+class MockEvidenceCollection:
+    def __init__(self, data):
+        self.data = data
+
+    def find(self, query, projection=None):
+        return MockCursor(self.data)
+
+@pytest.fixture
+def db_session():
+    """Fixture providing a session on an in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([KSB(id=i, code=f"K{i}", description=f"KSB {i}") for i in range(1, 4)])
+    session.commit()
+    ksb_catalogue.invalidate()
+    yield session
+    session.close()
+
+def _counts(session, user_id=None):
+    return {row.code: row.evidence_count for row in load_ksb_coverage(session, user_id)}
+
+def test_apply_link_changes_upserts_counters(db_session):
+    """
+    Tests that counters are created, incremented and decremented per user.
+    """
+    apply_link_changes(db_session, 1, added_ksb_ids=[1, 2])
+    apply_link_changes(db_session, 1, added_ksb_ids=[1])
+    apply_link_changes(db_session, 2, added_ksb_ids=[1, 3])
+    apply_link_changes(db_session, 2, removed_ksb_ids=[3])
+    db_session.commit()
+
+    assert _counts(db_session, 1) == {"K1": 2, "K2": 1, "K3": 0}
+    assert _counts(db_session, 2) == {"K1": 1, "K2": 0, "K3": 0}
+    assert _counts(db_session) == {"K1": 3, "K2": 1, "K3": 0}
+
+def test_rebuild_coverage_matches_link_table(db_session):
+    """
+    Tests that a rebuild replaces drifted counters with counts from the link table.
+    """
+    db_session.add_all([
+        EvidenceKSBLink(evidence_id="e1", ksb_id=1),
+        EvidenceKSBLink(evidence_id="e1", ksb_id=2),
+        EvidenceKSBLink(evidence_id="e2", ksb_id=1),
+        EvidenceKSBLink(evidence_id="e3", ksb_id=3),
+        KSBCoverage(user_id=1, ksb_id=3, evidence_count=7),
+    ])
+    db_session.commit()
+    mongo_db = MagicMock()
+    mongo_db.evidence = MockEvidenceCollection([
+        {"_id": "e1", "user_id": 1},
+        {"_id": "e2", "user_id": 1},
+        {"_id": "e3", "user_id": 2},
+    ])
+
+    written = rebuild_coverage(db_session, mongo_db, batch_size=2)
+
+    assert written == 3
+    assert _counts(db_session, 1) == {"K1": 2, "K2": 1, "K3": 0}
+    assert _counts(db_session, 2) == {"K1": 0, "K2": 0, "K3": 1}
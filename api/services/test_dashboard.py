@@ -0,0 +1,46 @@
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+from api.services.dashboard import build_cohort_matrix, load_cohort_evidence_counts, parse_user_ids
+from api.services.ksb_catalogue import KSBCatalogue
+from api.services.otj_hours import OTJTotals
+
+CATALOGUE = KSBCatalogue.from_rows(1, [
+    type("Row", (), {"id": i, "code": f"K{i}", "description": ""}) for i in range(1, 5)
+])
+
+def test_parse_user_ids_validates_the_cohort():
+    """
+    Tests that ids are parsed in order without repeats, and bad lists are rejected.
+    """
+    assert parse_user_ids("3, 1,3,2,") == [3, 1, 2]
+    for bad in ("", "1,x", ",".join(str(i) for i in range(501))):
+        with pytest.raises(ValueError):
+            parse_user_ids(bad)
+
+def test_cohort_matrix_has_one_row_per_user_in_column_order():
+    """
+    Tests that evidence is counted with one aggregation and coverage is laid out per KSB column.
+    """
+    mongo_db = MagicMock()
+    mongo_db.evidence.aggregate.return_value = [{"_id": 1, "count": 5}]
+    evidence_counts = load_cohort_evidence_counts(mongo_db, [1, 2])
+    mongo_db.evidence.aggregate.assert_called_once()
+
+    matrix = build_cohort_matrix(
+        [1, 2],
+        CATALOGUE,
+        {1: {2: 3, 4: 1}, 2: {}},
+        evidence_counts,
+        {1: OTJTotals(date(2024, 3, 4), 720, 720, 0), 2: OTJTotals(None, 0, 0, 0)},
+        date(2024, 3, 20)
+    )
+
+    assert [ksb["code"] for ksb in matrix["ksbs"]] == ["K1", "K2", "K3", "K4"]
+    first, second = matrix["users"]
+    assert first["ksb_evidence"] == [0, 3, 0, 1]
+    assert (first["total_evidence"], first["covered_ksbs"], first["coverage_percentage"]) == (5, 2, 50.0)
+    assert first["otj"]["actual_hours"] == first["otj"]["target_hours"] == 12.0 and first["otj"]["on_track"]
+    assert second["ksb_evidence"] == [0, 0, 0, 0] and second["total_evidence"] == 0
@@ -0,0 +1,36 @@
+from api.services.etags import etag_matches, make_etag, not_modified
+
+def test_make_etag_is_strong_and_stamp_sensitive():
+    """
+    Tests that ETags are quoted strong validators that change with the stamp.
+    """
+    etag = make_etag("ksbs", 1, 3, 65, 120)
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("ksbs", 1, 3, 65, 120)
+    assert etag != make_etag("ksbs", 1, 3, 65, 121)
+
+def test_if_none_match_comparison():
+    """
+    Tests list, wildcard and weak-prefixed If-None-Match values.
+    """
+    etag = make_etag("dashboard", 1)
+
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f"W/{etag}", etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+def test_not_modified_returns_304_with_headers():
+    """
+    Tests that a matching validator yields a 304 carrying the ETag and Cache-Control.
+    """
+    etag = make_etag("evidence", "abc")
+
+    response = not_modified(etag, etag, "private, no-cache")
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert not_modified('"stale"', etag, "private, no-cache") is None
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+from api.services.evidence_fields import (
+    SUMMARY_FIELDS,
+    content_summary,
+    fields_projection,
+    select_fields,
+    to_sparse_item,
+)
+
+def test_select_fields_builds_a_projection_without_the_content():
+    """
+    Tests that view=summary and fields= resolve to a projection that never reads the body.
+    """
+    assert select_fields() is None
+    assert select_fields(view="full") is None
+    assert select_fields(view="summary") == SUMMARY_FIELDS
+    assert select_fields(fields="ksb_ids, title", view="full") == ("id", "title", "ksb_ids")
+    with pytest.raises(ValueError):
+        select_fields(fields="title,secret")
+
+    projection = fields_projection(SUMMARY_FIELDS)
+    assert "content" not in projection
+    assert {"excerpt", "content_length", "created_at"} <= set(projection)
+    assert fields_projection(("id", "title")) == {"title": 1, "created_at": 1}
+
+def test_content_summary_and_sparse_items():
+    """
+    Tests that excerpts are cut at a word boundary and items carry only the selected fields.
+    """
+    summary = content_summary("# Heading\n\n" + "word " * 100, length=20)
+    assert summary == {"excerpt": "# Heading word word…", "content_length": 511}
+    assert content_summary("short") == {"excerpt": "short", "content_length": 5}
+
+    doc = {"_id": "e1", "title": "t", "created_at": datetime(2024, 1, 1)}
+    assert to_sparse_item(doc, ("id", "title", "excerpt", "ksb_ids"), [3]) == {
+        "id": "e1", "title": "t", "excerpt": None, "ksb_ids": [3]
+    }
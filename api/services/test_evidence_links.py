@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.models.postgres_models import Base, KSB, EvidenceKSBLink
+from bson import ObjectId
+from api.services.evidence_links import document_ksb_ids, load_ksb_ids, to_object_ids
+
+@pytest.fixture
+def db_session():
+    """Fixture providing a session on an in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([KSB(id=i, code=f"K{i}", description=f"KSB {i}") for i in range(1, 4)])
+    session.commit()
+    yield session
+    session.close()
+
+def _count_queries(session, func):
+    """Runs func and returns the number of SQL statements it executed."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+def test_load_ksb_ids_groups_links_by_evidence(db_session):
+    """
+    Tests that links are grouped per evidence id and unlinked ids map to an empty list.
+    """
+    db_session.add_all([
+        EvidenceKSBLink(evidence_id="e1", ksb_id=2),
+        EvidenceKSBLink(evidence_id="e1", ksb_id=1),
+        EvidenceKSBLink(evidence_id="e2", ksb_id=3),
+    ])
+    db_session.commit()
+
+    result = load_ksb_ids(db_session, ["e1", "e2", "e3"])
+
+    assert result == {"e1": [1, 2], "e2": [3], "e3": []}
+
+def test_load_ksb_ids_query_count_is_constant(db_session):
+    """
+    Tests that resolving links costs one query regardless of how many evidence ids are requested.
+    """
+    evidence_ids = [f"e{i}" for i in range(200)]
+    db_session.add_all([
+        EvidenceKSBLink(evidence_id=evidence_id, ksb_id=(i % 3) + 1)
+        for i, evidence_id in enumerate(evidence_ids)
+    ])
+    db_session.commit()
+
+    small = _count_queries(db_session, lambda: load_ksb_ids(db_session, evidence_ids[:1]))
+    large = _count_queries(db_session, lambda: load_ksb_ids(db_session, evidence_ids))
+
+    assert small == large == 1
+    assert _count_queries(db_session, lambda: load_ksb_ids(db_session, [])) == 0
+
+def test_document_ksb_ids_only_queries_for_untagged_documents(db_session):
+    """
+    Tests that stored ksb_ids are used as-is and only legacy documents fall back to the link table.
+    """
+    db_session.add(EvidenceKSBLink(evidence_id="e2", ksb_id=3))
+    db_session.commit()
+    tagged = [{"_id": "e1", "ksb_ids": [2, 1]}, {"_id": "e3", "ksb_ids": []}]
+
+    assert _count_queries(db_session, lambda: document_ksb_ids(db_session, tagged)) == 0
+    assert document_ksb_ids(db_session, tagged + [{"_id": "e2"}]) == {"e1": [2, 1], "e3": [], "e2": [3]}
+
+def test_to_object_ids_drops_malformed_ids():
+    """
+    Tests that link-table ids convert to ObjectIds and malformed ones are skipped.
+    """
+    valid = "0123456789abcdef01234567"
+    assert to_object_ids([valid, "not-an-id", 42, valid]) == [ObjectId(valid), ObjectId(valid)]
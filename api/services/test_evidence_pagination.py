@@ -0,0 +1,37 @@
+import pytest
+from datetime import datetime
+from bson import ObjectId
+
+from api.services.evidence_pagination import apply_keyset, decode_cursor, encode_cursor, iter_batches
+
+def test_cursor_round_trip_and_keyset_filter():
+    """
+    Tests that a cursor decodes to the document position and restricts the query after it.
+    """
+    doc = {"_id": ObjectId(), "created_at": datetime(2025, 6, 1, 12, 30, 0, 123000)}
+
+    cursor = encode_cursor(doc)
+    query = apply_keyset({"user_id": 1}, cursor)
+
+    assert decode_cursor(cursor) == (doc["created_at"], doc["_id"])
+    assert query == {
+        "user_id": 1,
+        "$or": [
+            {"created_at": {"$gt": doc["created_at"]}},
+            {"created_at": doc["created_at"], "_id": {"$gt": doc["_id"]}},
+        ],
+    }
+    assert apply_keyset({"user_id": 1}, None) == {"user_id": 1}
+
+def test_invalid_cursor_raises_value_error():
+    """
+    Tests that a malformed cursor is rejected with a ValueError.
+    """
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_iter_batches_yields_bounded_lists():
+    """
+    Tests that documents are grouped into lists no larger than the batch size.
+    """
+    assert list(iter_batches(range(5), 2)) == [[0, 1], [2, 3], [4]]
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from database.models.postgres_models import Base, KSB, EvidenceKSBLink, KSBCoverage
+from api.services.evidence_reconciler import load_checkpoint, reconcile_evidence
+from api.services.ksb_catalogue import ksb_catalogue
+
+class MockCursor(list):
+    def sort(self, keys):
+        return MockCursor(sorted(self, key=lambda doc: (doc["updated_at"], doc["_id"])))
+
+    def limit(self, count):
+        return MockCursor(self[:count])
+
+class MockEvidenceCollection:
+    """Understands the updated_at window, keyset and _id $in filters the reconciler sends"""
+
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        if "_id" in query:
+            return MockCursor(doc for doc in self.docs if doc["_id"] in query["_id"]["$in"])
+        window = query["updated_at"]
+        docs = [doc for doc in self.docs if window["$gte"] <= doc["updated_at"] < window["$lt"]]
+        if "$or" in query:
+            after = query["$or"][1]
+            docs = [doc for doc in docs if (doc["updated_at"], doc["_id"]) > (after["updated_at"], after["_id"]["$gt"])]
+        return MockCursor(docs)
+
+class MockMongoDB:
+    def __init__(self, docs):
+        self.evidence = MockEvidenceCollection(docs)
+
+@pytest.fixture
+def db_session():
+    """Fixture providing a session on an in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([KSB(id=i, code=f"K{i}", description=f"KSB {i}") for i in range(1, 4)])
+    session.commit()
+    ksb_catalogue.invalidate()
+    yield session
+    session.close()
+
+def _links(session):
+    return sorted(session.execute(select(EvidenceKSBLink.evidence_id, EvidenceKSBLink.ksb_id)).all())
+
+def _setup(session):
+    updated_at = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    unlinked, mislinked, legacy, missing = (ObjectId() for _ in range(4))
+    docs = [
+        {"_id": unlinked, "user_id": 1, "ksb_ids": [1, 2], "updated_at": updated_at},
+        {"_id": mislinked, "user_id": 1, "ksb_ids": [3], "updated_at": updated_at},
+        {"_id": legacy, "user_id": 2, "updated_at": updated_at + timedelta(seconds=1)},
+    ]
+    session.add_all([
+        EvidenceKSBLink(evidence_id=str(mislinked), ksb_id=1),
+        EvidenceKSBLink(evidence_id=str(mislinked), ksb_id=3),
+        EvidenceKSBLink(evidence_id=str(legacy), ksb_id=2),
+        EvidenceKSBLink(evidence_id=str(missing), ksb_id=2),
+        KSBCoverage(user_id=1, ksb_id=1, evidence_count=1),
+        KSBCoverage(user_id=1, ksb_id=3, evidence_count=1),
+    ])
+    session.commit()
+    # The evidence ids were generated just now, so look slightly ahead to include them
+    now = datetime.utcnow() + timedelta(minutes=11)
+    return MockMongoDB(docs), now, (unlinked, mislinked, legacy, missing)
+
+def test_reconcile_rolls_links_forward_and_removes_dangling_links(db_session):
+    """
+    Tests that links are made to match each document's ksb_ids, links to missing evidence are removed, and the checkpoint advances.
+    """
+    mongo_db, now, (unlinked, mislinked, legacy, missing) = _setup(db_session)
+
+    report = reconcile_evidence(db_session, mongo_db, now=now, batch_size=1)
+
+    assert (report.documents_checked, report.links_added, report.links_removed) == (2, 2, 1)
+    assert report.dangling_evidence_ids == [str(missing)]
+    assert _links(db_session) == sorted([
+        (str(unlinked), 1), (str(unlinked), 2), (str(mislinked), 3), (str(legacy), 2)
+    ])
+    counts = {
+        (row.user_id, row.ksb_id): row.evidence_count
+        for row in db_session.query(KSBCoverage).all()
+    }
+    assert counts == {(1, 1): 1, (1, 2): 1, (1, 3): 1}
+    assert load_checkpoint(db_session) == now - timedelta(minutes=10)
+
+    # The next pass only looks at evidence written since the checkpoint
+    report = reconcile_evidence(db_session, mongo_db, now=now + timedelta(minutes=1))
+    assert (report.documents_checked, report.dangling_evidence_ids) == (0, [])
+
+def test_reconcile_dry_run_reports_without_repairing(db_session):
+    """
+    Tests that a dry run leaves the links and checkpoint untouched.
+    """
+    mongo_db, now, (_, _, _, missing) = _setup(db_session)
+    before = _links(db_session)
+
+    report = reconcile_evidence(db_session, mongo_db, now=now, repair=False)
+
+    assert report.documents_checked == 2
+    assert report.dangling_evidence_ids == [str(missing)]
+    assert _links(db_session) == before
+    assert load_checkpoint(db_session) is None
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from api.services.evidence_revisions import (
+    ORPHAN_AGE,
+    apply_delta,
+    list_revisions,
+    load_revision,
+    rebuild_revision,
+    revision_record,
+    save_revision_record,
+    text_delta,
+)
+from api.services.evidence_writes import evidence_changes, evidence_update, versioned_filter
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict):
+            if "$exists" in condition and (field in doc) != condition["$exists"]:
+                return False
+            if "$gte" in condition and not value >= condition["$gte"]:
+                return False
+            if "$lt" in condition and not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+class MockCursor(list):
+    def sort(self, keys):
+        (field, direction), = keys
+        return MockCursor(sorted(self, key=lambda doc: doc[field], reverse=direction < 0))
+
+class MockCollection:
+    """Understands the filters the revision history sends, with an optional unique key"""
+
+    def __init__(self, unique=None):
+        self.docs = []
+        self.unique = unique
+
+    def insert_one(self, doc):
+        if self.unique and any(all(other[key] == doc[key] for key in self.unique) for other in self.docs):
+            raise DuplicateKeyError("duplicate key")
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+
+    def find(self, query, projection=None):
+        return MockCursor(dict(doc) for doc in self.docs if _matches(doc, query))
+
+    def find_one(self, query, projection=None):
+        return next(iter(self.find(query)), None)
+
+    def update_one(self, query, update):
+        for doc in self.docs:
+            if _matches(doc, query):
+                doc.update(update["$set"])
+
+    def delete_one(self, query):
+        self.docs = [doc for doc in self.docs if not _matches(doc, query)]
+
+class MockMongoDB:
+    def __init__(self):
+        self.evidence = MockCollection()
+        self.evidence_revisions = MockCollection(unique=("evidence_id", "revision"))
+
+def test_delta_stores_only_the_edited_lines():
+    """
+    Tests that a delta rebuilds the target text and carries the changed lines but none of the unchanged ones.
+    """
+    source = "".join(f"line {number}\n" for number in range(1000))
+    target = source.replace("line 500\n", "line five hundred\n") + "appended"
+
+    delta = text_delta(source, target)
+
+    assert apply_delta(source, delta) == target
+    assert [op for op in delta if isinstance(op, str)] == ["line five hundred\n", "appended"]
+    assert apply_delta(target, text_delta(target, "")) == ""
+
+def test_rebuild_steps_back_through_each_revision():
+    """
+    Tests that every earlier version is rebuilt from the current document and the reverse deltas, and a gap is reported.
+    """
+    start = datetime(2024, 1, 1)
+    doc = {"_id": "e1", "title": "Draft", "content": "one\ntwo\n", "ksb_ids": [1], "updated_at": start}
+    versions = [{"title": "Draft", "content": "one\ntwo\n", "ksb_ids": [1]}]
+    records = []
+    for number, update in enumerate([
+        {"content": "one\n2\n"},
+        {"title": "Final", "ksb_ids": [2, 1, 2]},
+        {"content": "one\n2\nthree\n", "ksb_ids": [1, 2]},
+    ], start=1):
+        now = start + timedelta(days=number)
+        changes = evidence_changes(doc, update)
+        records.append(revision_record(doc, changes, now))
+        doc = {**doc, **evidence_update(doc, changes, now)}
+        versions.append({field: doc[field] for field in ("title", "content", "ksb_ids")})
+
+    # Reordering the tags of revision 3 was not an edit
+    assert "ksb_ids" not in records[2]
+    assert doc["revision"] == 4
+    newest_first = records[::-1]
+    for revision, expected in enumerate(versions, start=1):
+        version = rebuild_revision(doc, revision, newest_first)
+        assert {field: version[field] for field in expected} == expected
+        assert version["updated_at"] == start + timedelta(days=revision - 1)
+
+    with pytest.raises(LookupError):
+        rebuild_revision(doc, 5, newest_first)
+    with pytest.raises(LookupError):
+        rebuild_revision(doc, 1, [record for record in newest_first if record["revision"] != 2])
+
+def _edit(mongo_db, doc, update, now, apply=True):
+    """The PATCH write order: claim the history entry, then apply the versioned $set"""
+    changes = evidence_changes(doc, update)
+    record = revision_record(doc, changes, now)
+    if not save_revision_record(mongo_db, doc, record):
+        return None
+    if apply:
+        mongo_db.evidence.update_one(versioned_filter(doc), {"$set": evidence_update(doc, changes, now)})
+    return mongo_db.evidence.find_one({"_id": doc["_id"]})
+
+def test_failed_edit_leaves_history_readable_and_is_recovered():
+    """
+    Tests that an edit failing between the history insert and the document update does not break older revisions, and its entry is taken over once stale.
+    """
+    start = datetime(2024, 1, 1)
+    mongo_db = MockMongoDB()
+    doc = {"_id": ObjectId(), "title": "Draft", "content": "one\n", "ksb_ids": [1], "updated_at": start}
+    mongo_db.evidence.insert_one(doc)
+    doc = _edit(mongo_db, doc, {"content": "one\ntwo\n"}, start + timedelta(hours=1))
+    assert doc["revision"] == 2
+
+    # The history entry for revision 2 is written, then the update never happens
+    failed_at = start + timedelta(hours=2)
+    assert _edit(mongo_db, doc, {"content": "lost\n"}, failed_at, apply=False) is not None
+    assert mongo_db.evidence.find_one({"_id": doc["_id"]})["revision"] == 2
+
+    assert [entry["revision"] for entry in list_revisions(mongo_db, doc)] == [2, 1]
+    assert load_revision(mongo_db, doc, 1)["content"] == "one\n"
+    assert load_revision(mongo_db, doc, 2)["content"] == "one\ntwo\n"
+
+    # A concurrent edit is refused while the entry may still be in use, and takes it over once stale
+    assert _edit(mongo_db, doc, {"content": "three\n"}, failed_at + ORPHAN_AGE / 2) is None
+    doc = _edit(mongo_db, doc, {"content": "three\n"}, failed_at + ORPHAN_AGE)
+    assert doc["revision"] == 3
+    assert [load_revision(mongo_db, doc, revision)["content"] for revision in (1, 2, 3)] == [
+        "one\n", "one\ntwo\n", "three\n"
+    ]
@@ -0,0 +1,29 @@
+from api.services.evidence_search import build_excerpt, search_filter, search_terms
+
+def test_search_terms_skip_negations_and_lowercase():
+    """
+    Tests that highlight terms are lowercased words, excluding negated words and phrases.
+    """
+    assert search_terms('Pipeline "feature store" -draft -"old notes"') == ["pipeline", "feature", "store"]
+
+def test_build_excerpt_highlights_and_escapes():
+    """
+    Tests that the excerpt is centred on the first match, marks prefix matches and escapes HTML.
+    """
+    content = "Intro text. " * 30 + "I deployed the <model> while learning MLOps. " + "Outro. " * 30
+
+    excerpt = build_excerpt(content, ["learn", "model"], width=80)
+
+    assert excerpt.startswith("…") and excerpt.endswith("…")
+    assert "&lt;<mark>model</mark>&gt;" in excerpt
+    assert "<mark>learning</mark>" in excerpt
+
+def test_search_filter_scopes_text_query():
+    """
+    Tests that optional filters are combined with the $text query.
+    """
+    assert search_filter("mlops", user_id=3, ksb_ids=[7]) == {
+        "$text": {"$search": "mlops"},
+        "user_id": 3,
+        "ksb_ids": {"$in": [7]},
+    }
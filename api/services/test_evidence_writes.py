@@ -0,0 +1,46 @@
+from pymongo.errors import BulkWriteError
+
+from api.schemas.evidence_schemas import EvidenceCreate
+from api.services.evidence_writes import BulkEvidencePlan
+from api.services.ksb_catalogue import KSBCatalogue
+
+CATALOGUE = KSBCatalogue.from_rows(1, [
+    type("Row", (), {"id": i, "code": f"K{i}", "description": ""}) for i in range(1, 4)
+])
+
+def _item(title, ksb_ids, user_id=1):
+    return EvidenceCreate(title=title, content="notes", user_id=user_id, ksb_ids=ksb_ids)
+
+def test_bulk_plan_validates_up_front_and_reports_per_item():
+    """
+    Tests that invalid KSB ids fail only their own item, and insert errors are mapped back by index.
+    """
+    plan = BulkEvidencePlan([
+        _item("ok", [1, 2, 1]),
+        _item("bad ksb", [9]),
+        _item("rejected", [3]),
+        _item("other user", [3], user_id=2),
+    ], CATALOGUE)
+    assert len(plan.documents) == 3
+
+    for number, doc in enumerate(plan.documents):
+        doc["_id"] = f"id{number}"
+    plan.record_write_errors(BulkWriteError({
+        "writeErrors": [{"index": 1, "errmsg": "duplicate key"}]
+    }))
+
+    assert plan.link_rows() == [
+        {"evidence_id": "id0", "ksb_id": 1},
+        {"evidence_id": "id0", "ksb_id": 2},
+        {"evidence_id": "id2", "ksb_id": 3},
+    ]
+    assert plan.coverage_pairs() == [(1, 1), (1, 2), (2, 3)]
+
+    response = plan.response()
+    assert (response.created, response.failed) == (2, 2)
+    assert [(r.index, r.status, r.id, r.error) for r in response.results] == [
+        (0, "created", "id0", None),
+        (1, "failed", None, "KSB with id 9 not found"),
+        (2, "failed", None, "duplicate key"),
+        (3, "created", "id2", None),
+    ]
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from api.services.health import MongoPoolStats, _probe_connect_args, check_readiness, create_probe_engine
+
+def _state(mongo_db):
+    return SimpleNamespace(
+        settings=SimpleNamespace(database_mode="sync", health_check_timeout=0.2),
+        engine=create_engine("sqlite://", poolclass=QueuePool, pool_size=2),
+        probe_engine=create_probe_engine("sqlite://", 0.2),
+        mongo_db=mongo_db,
+        mongo_pool_stats=MongoPoolStats(),
+    )
+
+def test_readiness_reports_latency_and_pool_usage():
+    """
+    Tests that a healthy probe is ready and reports latency and pool counters.
+    """
+    state = _state(MagicMock())
+    state.mongo_pool_stats.connection_created(None)
+    state.mongo_pool_stats.connection_check_out_started(None)
+    state.mongo_pool_stats.connection_checked_out(None)
+
+    report = asyncio.run(check_readiness(state))
+
+    assert report["status"] == "ready"
+    assert report["postgres"]["latency_ms"] >= 0
+    # The probe has its own connection, so the application pool is left alone
+    assert report["postgres"]["pool"] == {
+        "pool": "QueuePool", "size": 2, "checked_out": 0, "checked_in": 0, "overflow": 0
+    }
+    assert report["mongodb"]["pool"] == {"open": 1, "checked_out": 1, "waiting": 0, "checkout_failures": 0}
+
+def test_readiness_fails_when_a_database_times_out():
+    """
+    Tests that a database that does not answer within the timeout makes the probe not ready.
+    """
+    mongo_db = MagicMock()
+    mongo_db.command.side_effect = lambda *args: time.sleep(1)
+
+    start = time.perf_counter()
+    report = asyncio.run(check_readiness(_state(mongo_db)))
+
+    assert time.perf_counter() - start < 0.9
+    assert report["status"] == "not_ready"
+    assert report["postgres"]["status"] == "up"
+    assert report["mongodb"] == {
+        "status": "down",
+        "error": "no response within 0.2s",
+        "pool": {"open": 0, "checked_out": 0, "waiting": 0, "checkout_failures": 0},
+    }
+
+def test_probe_engine_bounds_connect_and_statement_time():
+    """
+    Tests that the probe engine passes the timeout to the PostgreSQL drivers
+    and keeps no pool of its own.
+    """
+    assert _probe_connect_args("postgresql://u:p@db/hub", 2.5) == {
+        "connect_timeout": 3, "options": "-c statement_timeout=2500"
+    }
+    assert _probe_connect_args("postgresql+asyncpg://u:p@db/hub", 2.5) == {"timeout": 2.5, "command_timeout": 2.5}
+    assert _probe_connect_args("sqlite://", 2.5) == {}
+    assert isinstance(create_probe_engine("sqlite://", 2.5).pool, NullPool)
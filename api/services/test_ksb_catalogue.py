@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database.models.postgres_models import Base, KSB
+from api.services.ksb_catalogue import CachedKSB, KSBCatalogue, KSBCatalogueCache, bump_ksb_catalogue_version
+
+@pytest.fixture
+def db_session():
+    """Fixture providing a session on an in-memory SQLite database."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([KSB(id=i, code=f"K{i}", description=f"KSB {i}") for i in range(1, 4)])
+    session.commit()
+    yield session
+    session.close()
+
+@pytest.fixture
+def statements(db_session):
+    """Fixture recording every SQL statement executed on the session's engine."""
+    executed = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", before_cursor_execute)
+    return executed
+
+def test_cache_serves_reads_without_queries_until_interval(db_session, statements):
+    """
+    Tests that reads inside the check interval need no database query.
+    """
+    cache = KSBCatalogueCache(check_interval=60)
+
+    catalogue = cache.get(db_session)
+    queries_after_load = len(statements)
+    cache.get(db_session)
+
+    assert catalogue.by_code["K2"].id == 2
+    assert catalogue.missing_ids([1, 9, 3]) == [9]
+    assert len(statements) == queries_after_load
+
+def test_cache_reloads_only_when_version_changes(db_session, statements):
+    """
+    Tests that an expired check costs one version lookup, and rows are reloaded after a bump.
+    """
+    cache = KSBCatalogueCache(check_interval=0)
+    cache.get(db_session)
+
+    del statements[:]
+    cache.get(db_session)
+    assert len(statements) == 1
+
+    db_session.add(KSB(id=4, code="K4", description="KSB 4"))
+    bump_ksb_catalogue_version(db_session)
+    db_session.commit()
+
+    catalogue = cache.get(db_session)
+    assert catalogue.version == 1
+    assert 4 in catalogue.by_id
+
+def test_codes_match_regardless_of_stored_case():
+    """
+    Tests that ids_for_codes finds KSBs whose code was stored in lower or mixed case.
+    """
+    catalogue = KSBCatalogue.from_rows(1, [
+        CachedKSB(1, "K1", "Upper"), CachedKSB(2, "s2", "Lower"), CachedKSB(3, "St0763-b3", "Mixed")
+    ])
+
+    assert catalogue.ids_for_codes(["k1", "S2", "ST0763-B3", "K9"]) == [1, 2, 3]
+    assert catalogue.by_code["S2"].code == "s2"
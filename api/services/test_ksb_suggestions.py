@@ -0,0 +1,74 @@
+import numpy as np
+from bson import ObjectId
+
+from api.services.ksb_catalogue import KSBCatalogue
+from api.services.ksb_suggestions import KSBVectorModel, KSBVectorModelCache, PortfolioScan, terms
+
+DESCRIPTIONS = {
+    1: "Supervised and unsupervised machine learning models for business objectives",
+    2: "Ethical, legal and regulatory protection of personal data",
+    3: "Project management techniques and agile delivery",
+    4: "Communicating findings to technical and non-technical stakeholders",
+}
+
+def _catalogue(version=1, descriptions=DESCRIPTIONS):
+    return KSBCatalogue.from_rows(version, [
+        type("Row", (), {"id": ksb_id, "code": f"K{ksb_id}", "description": text})
+        for ksb_id, text in descriptions.items()
+    ])
+
+def test_suggestions_rank_matching_ksbs_and_skip_tagged_ones():
+    """
+    Tests that evidence is matched to the KSB sharing its terms, already tagged KSBs are skipped, and batch scores equal single scores.
+    """
+    model = KSBVectorModel(_catalogue())
+    assert terms("Modelling the models it modelled") == terms("model models model")
+
+    text = "Trained a supervised model and presented the findings to stakeholders"
+    suggestions = model.suggest(text, top_k=2, min_score=0.05)
+    assert [suggestion.ksb.id for suggestion in suggestions] == [4, 1]
+    assert suggestions[0].score >= suggestions[1].score
+    assert [suggestion.ksb.id for suggestion in model.suggest(text, top_k=2, min_score=0.05, exclude=[4])] == [1]
+    assert model.suggest("nothing relevant here", min_score=0.05) == []
+
+    texts = [text, "GDPR and personal data protection", "", "sprint planning with agile project management"]
+    scores = model.score(texts)
+    assert scores.shape == (4, 4)
+    for row, single in enumerate(texts):
+        assert np.allclose(scores[row], model.score([single])[0])
+    assert scores.argmax(axis=1).tolist()[1:] == [1, 0, 2]
+    assert not scores[2].any()
+
+def test_model_cache_rebuilds_only_for_a_new_catalogue_version():
+    """
+    Tests that the KSB matrix is reused until the catalogue version changes.
+    """
+    cache = KSBVectorModelCache()
+    model = cache.get(_catalogue(version=1))
+    assert cache.get(_catalogue(version=1)) is model
+
+    rebuilt = cache.get(_catalogue(version=2, descriptions={**DESCRIPTIONS, 5: "Cloud deployment"}))
+    assert rebuilt is not model
+    assert rebuilt.matrix.shape[0] == 5
+
+def test_portfolio_scan_reports_gaps_and_untagged_matches():
+    """
+    Tests that KSBs without tagged evidence are listed with their best matching evidence, and each item gets its untagged matches.
+    """
+    model = KSBVectorModel(_catalogue())
+    scan = PortfolioScan(model, top_k=3, min_score=0.1)
+    docs = [
+        {"_id": ObjectId(), "title": "Churn model", "content": "supervised machine learning model"},
+        {"_id": ObjectId(), "title": "Privacy review", "content": "personal data protection and stakeholders"},
+    ]
+    scan.add_batch(docs, {str(docs[0]["_id"]): [1], str(docs[1]["_id"]): []})
+    result = scan.result(user_id=7)
+
+    assert (result["evidence_scored"], result["covered_ksbs"], result["total_ksbs"]) == (2, 1, 4)
+    gaps = {gap["code"]: gap["evidence"] for gap in result["gaps"]}
+    assert set(gaps) == {"K2", "K3", "K4"}
+    assert [item["id"] for item in gaps["K2"]] == [str(docs[1]["_id"])]
+    assert gaps["K3"] == []
+    items = {item["id"]: item for item in result["evidence"]}
+    assert list(items) == [str(docs[1]["_id"])]
+    assert [suggestion["code"] for suggestion in items[str(docs[1]["_id"])]["suggestions"]] == ["K2", "K4"]
@@ -0,0 +1,29 @@
+from unittest.mock import MagicMock
+
+from api.services.mongo_indexes import EVIDENCE_QUERY_SHAPES, find_collection_scans
+
+def _explanation(stage):
+    return {"queryPlanner": {"winningPlan": {"stage": "LIMIT", "inputStage": {"stage": stage}}}}
+
+def test_find_collection_scans_reports_collscan_plans():
+    """
+    Tests that query shapes whose winning plan contains a COLLSCAN are reported by name.
+    """
+    mongo_db = MagicMock()
+    mongo_db.command.side_effect = lambda name, command, verbosity: _explanation(
+        "COLLSCAN" if command.get("filter") in ({"project_id": 0}, {"project_id": {"$in": [0, 1]}}) else "IXSCAN"
+    )
+
+    offenders = find_collection_scans(mongo_db)
+
+    assert offenders == ["evidence list by project", "project related evidence"]
+    assert mongo_db.command.call_count == len(EVIDENCE_QUERY_SHAPES)
+
+def test_find_collection_scans_passes_when_indexed():
+    """
+    Tests that no shapes are reported when every plan uses an index.
+    """
+    mongo_db = MagicMock()
+    mongo_db.command.return_value = _explanation("IXSCAN")
+
+    assert find_collection_scans(mongo_db) == []
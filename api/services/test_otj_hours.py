@@ -0,0 +1,142 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from database.models.postgres_models import Base, LearningLog, OffTheJobBucket, User
+from api.services.otj_hours import (
+    MONTH, WEEK, OTJTotals, invalidate_otj_buckets, load_cohort_otj_totals, load_otj_periods,
+    otj_compliance, otj_summary, rebuild_otj_buckets, rolling_averages
+)
+
+TODAY = date(2024, 3, 20) # A Wednesday
+
+@pytest.fixture
+def db_session():
+    """Fixture providing a session on an in-memory SQLite database with one user's logs."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(id=1, email="apprentice@example.com", name="Apprentice"))
+    session.add_all([
+        LearningLog(user_id=1, date=datetime(2024, 2, 26, 9), duration_minutes=120),
+        LearningLog(user_id=1, date=datetime(2024, 3, 3, 23), duration_minutes=60),
+        LearningLog(user_id=1, date=datetime(2024, 3, 12, 10), duration_minutes=90),
+        LearningLog(user_id=1, date=datetime(2024, 3, 19, 14), duration_minutes=30),
+        LearningLog(user_id=2, date=datetime(2024, 3, 19, 14), duration_minutes=600),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def _stored(session, period):
+    return session.execute(
+        select(OffTheJobBucket.period_start, OffTheJobBucket.minutes).where(
+            OffTheJobBucket.user_id == 1, OffTheJobBucket.period == period
+        ).order_by(OffTheJobBucket.period_start)
+    ).all()
+
+def test_load_otj_periods_rolls_up_closed_weeks(db_session):
+    """
+    Tests the weekly series is gap-free, and that only closed weeks are stored as buckets.
+    """
+    weeks = load_otj_periods(db_session, 1, WEEK, TODAY, grace=timedelta(0))
+
+    assert [(week.period_start, week.minutes) for week in weeks] == [
+        (date(2024, 2, 26), 180),
+        (date(2024, 3, 4), 0),
+        (date(2024, 3, 11), 90),
+        (date(2024, 3, 18), 30),
+    ]
+    assert _stored(db_session, WEEK) == [
+        (date(2024, 2, 26), 180),
+        (date(2024, 3, 4), 0),
+        (date(2024, 3, 11), 90),
+    ]
+
+    # Closed weeks now come from the buckets until they are invalidated
+    db_session.add(LearningLog(user_id=1, date=datetime(2024, 3, 5, 9), duration_minutes=45))
+    assert load_otj_periods(db_session, 1, WEEK, TODAY, grace=timedelta(0))[1].minutes == 0
+    invalidate_otj_buckets(db_session, 1, date(2024, 3, 5))
+    assert load_otj_periods(db_session, 1, WEEK, TODAY, grace=timedelta(0))[1].minutes == 45
+
+    months = load_otj_periods(db_session, 1, MONTH, TODAY)
+    assert [(month.period_start, month.minutes) for month in months] == [
+        (date(2024, 2, 1), 120),
+        (date(2024, 3, 1), 225),
+    ]
+
+def test_late_logs_count_until_the_grace_window_ends(db_session):
+    """
+    Tests that recent closed weeks stay live so late logs are counted, and a rebuild picks up logs in stored weeks.
+    """
+    load_otj_periods(db_session, 1, WEEK, TODAY)
+    # No week ended 28 days before today, so nothing is stored yet
+    assert _stored(db_session, WEEK) == []
+
+    # Entered on Wednesday for last week, which is still aggregated live
+    db_session.add(LearningLog(user_id=1, date=datetime(2024, 3, 15, 9), duration_minutes=15))
+    db_session.commit()
+    assert load_otj_periods(db_session, 1, WEEK, TODAY)[2].minutes == 105
+
+    # A log for a week that is already stored is only seen after a rebuild
+    later = TODAY + timedelta(days=60)
+    load_otj_periods(db_session, 1, WEEK, later)
+    db_session.add(LearningLog(user_id=1, date=datetime(2024, 3, 5, 9), duration_minutes=45))
+    db_session.commit()
+    assert load_otj_periods(db_session, 1, WEEK, later)[1].minutes == 0
+    assert rebuild_otj_buckets(db_session, today=later) == 2
+    assert load_otj_periods(db_session, 1, WEEK, later)[1].minutes == 45
+    assert (date(2024, 3, 4), 45) in _stored(db_session, WEEK)
+
+def test_failed_bucket_write_does_not_fail_the_read(db_session):
+    """
+    Tests that a read whose bucket write fails still returns the totals and
+    stores nothing, while a rebuild raises the failure.
+    """
+    def fail_bucket_writes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO OTJ_HOURS_BUCKETS"):
+            raise OperationalError(statement, parameters, Exception("database is locked"))
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", fail_bucket_writes)
+    weeks = load_otj_periods(db_session, 1, WEEK, TODAY, grace=timedelta(0))
+
+    assert [week.minutes for week in weeks] == [180, 0, 90, 30]
+    assert _stored(db_session, WEEK) == []
+    with pytest.raises(OperationalError):
+        rebuild_otj_buckets(db_session, user_id=1, today=TODAY + timedelta(days=60))
+
+    event.remove(db_session.get_bind(), "before_cursor_execute", fail_bucket_writes)
+    assert load_otj_periods(db_session, 1, WEEK, TODAY, grace=timedelta(0)) == weeks
+    assert len(_stored(db_session, WEEK)) == 3
+
+def test_rolling_averages_and_compliance(db_session):
+    """
+    Tests the trailing average window and the 20% target over completed weeks.
+    """
+    assert rolling_averages([60, 0, 30, 90], window=2) == [60, 30, 15, 60]
+
+    weeks = load_otj_periods(db_session, 1, WEEK, TODAY)
+    compliance = otj_compliance(1, weeks, TODAY, contracted_hours_per_week=5)
+
+    # Three completed weeks at 1 hour a week, against 4.5 hours logged
+    assert compliance["weeks_elapsed"] == 3
+    assert compliance["target_hours"] == 3.0
+    assert compliance["actual_hours"] == 4.5
+    assert compliance["current_week_hours"] == 0.5
+    assert compliance["percentage_of_target"] == 150.0
+    assert compliance["on_track"] is True
+
+def test_cohort_totals_agree_with_compliance(db_session):
+    """
+    Tests that one grouped query gives every user the same headline figures as otj_compliance.
+    """
+    totals = load_cohort_otj_totals(db_session, [1, 2, 3], TODAY)
+
+    assert totals[1] == OTJTotals(date(2024, 2, 26), 270, 270, 30)
+    assert totals[3] == OTJTotals(None, 0, 0, 0)
+    compliance = otj_compliance(1, load_otj_periods(db_session, 1, WEEK, TODAY), TODAY)
+    summary = otj_summary(totals[1], TODAY)
+    assert summary == {key: compliance[key] for key in summary}
+    assert otj_summary(totals[2], TODAY)["current_week_hours"] == 10.0
@@ -0,0 +1,97 @@
+import io
+import zipfile
+from datetime import datetime
+
+from bson import ObjectId
+
+from api.services.ksb_catalogue import KSBCatalogue
+from api.services.portfolio_export import ArchiveSizes, ExportProject, PortfolioArchive, PortfolioContext, evidence_path
+
+CATALOGUE = KSBCatalogue.from_rows(1, [
+    type("Row", (), {"id": i, "code": f"K{i}", "description": f"# Knowledge {i}\nDetail"}) for i in range(1, 5)
+])
+
+def _doc(number, title, ksb_ids, project_id=None):
+    return {
+        "_id": ObjectId(f"{number:024x}"),
+        "title": title,
+        "content": f"Notes for {title}",
+        "project_id": project_id,
+        "ksb_ids": ksb_ids,
+        "created_at": datetime(2024, 1, number),
+        "updated_at": datetime(2024, 2, number),
+    }
+
+DOCS = [_doc(1, "Built a pipeline", [2, 1], project_id=7), _doc(2, "Model review", [2, 9])]
+
+def _build():
+    context = PortfolioContext(
+        user_id=1,
+        user_name="Sam",
+        projects={7: ExportProject(7, "Forecasting", "Demand model", "active", datetime(2024, 1, 1), None)},
+        catalogue=CATALOGUE,
+        evidence_count=len(DOCS),
+        last_updated=datetime(2024, 2, 2),
+    )
+    archive = PortfolioArchive(context)
+    pieces = []
+    # The rows _ksb_evidence_pipeline returns, in KSB order; KSB 9 is not in the catalogue
+    rows = sorted(({**doc, "ksb_ids": ksb_id} for doc in DOCS for ksb_id in doc["ksb_ids"]), key=lambda row: row["ksb_ids"])
+    for row in rows:
+        archive.add_ksb_evidence(row)
+        pieces.append(archive.take())
+    archive.finish_ksbs()
+    for doc in DOCS:
+        archive.add_evidence(doc, doc["ksb_ids"])
+        pieces.append(archive.take())
+    archive.finish()
+    pieces.append(archive.take())
+    return b"".join(pieces)
+
+def test_archive_groups_evidence_by_ksb_and_is_reproducible():
+    """
+    Tests that every KSB gets a file listing its evidence, the index reports gaps, and the same data gives the same bytes.
+    """
+    body = _build()
+    assert body == _build()
+
+    archive = zipfile.ZipFile(io.BytesIO(body))
+    assert archive.testzip() is None
+    assert archive.namelist() == [
+        "ksbs/K1.md", "ksbs/K2.md", "ksbs/K3.md", "ksbs/K4.md",
+        evidence_path(DOCS[0]), evidence_path(DOCS[1]), "index.md",
+    ]
+    assert evidence_path(DOCS[0]) == f"evidence/2024-01-01-built-a-pipeline-{DOCS[0]['_id']}.md"
+
+    ksb2 = archive.read("ksbs/K2.md").decode("utf-8")
+    assert "# Knowledge 2" in ksb2
+    assert f"[Built a pipeline](../{evidence_path(DOCS[0])}) (2024-01-01, Forecasting)" in ksb2
+    assert f"[Model review](../{evidence_path(DOCS[1])}) (2024-01-02)" in ksb2
+    assert "No evidence" in archive.read("ksbs/K3.md").decode("utf-8")
+
+    evidence = archive.read(evidence_path(DOCS[0])).decode("utf-8")
+    assert "- Project: Forecasting" in evidence
+    assert "- KSBs: [K1](../ksbs/K1.md), [K2](../ksbs/K2.md)" in evidence
+    assert evidence.endswith("Notes for Built a pipeline")
+
+    index = archive.read("index.md").decode("utf-8")
+    assert "2 evidence items, 2 of 4 KSBs evidenced." in index
+    assert "| [K2](ksbs/K2.md) | 2 | Knowledge 2 |" in index
+    assert "K3, K4" in index
+    assert "### Forecasting" in index
+
+def test_archive_sizes_are_recorded_only_for_complete_streams():
+    """
+    Tests that a size is stored once a stream is read to the end, and the oldest sizes are evicted.
+    """
+    sizes = ArchiveSizes(max_entries=2)
+    stream = sizes.measured(iter([b"ab", b"cde"]), '"a"')
+    next(stream)
+    assert sizes.get('"a"') is None
+    list(stream)
+    assert sizes.get('"a"') == 5
+
+    sizes.set('"b"', 1)
+    sizes.get('"a"')
+    sizes.set('"c"', 1)
+    assert (sizes.get('"a"'), sizes.get('"b"')) == (5, None)
@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock
+
+from api.services.project_evidence import COUNT, SUMMARY, SUMMARY_PROJECTION, load_project_evidence
+
+class MockCursor(list):
+    def sort(self, keys):
+        return self
+
+def test_load_project_evidence_batches_projects_into_one_query():
+    """
+    Tests that many projects are loaded with one $in query and grouped per project.
+    """
+    mongo_db = MagicMock()
+    mongo_db.evidence.find.return_value = MockCursor([
+        {"_id": "e1", "project_id": 1, "title": "a"},
+        {"_id": "e2", "project_id": 3, "title": "b"},
+        {"_id": "e3", "project_id": 1, "title": "c"},
+    ])
+
+    grouped = load_project_evidence(mongo_db, [1, 2, 3, 1], SUMMARY)
+
+    mongo_db.evidence.find.assert_called_once_with({"project_id": {"$in": [1, 2, 3]}}, SUMMARY_PROJECTION)
+    assert {project_id: [doc["_id"] for doc in docs] for project_id, docs in grouped.items()} == {
+        1: ["e1", "e3"], 2: [], 3: ["e2"]
+    }
+
+def test_load_project_evidence_counts_only():
+    """
+    Tests that count mode groups on the server and fills in projects without evidence.
+    """
+    mongo_db = MagicMock()
+    mongo_db.evidence.aggregate.return_value = [{"_id": 1, "count": 4}]
+
+    assert load_project_evidence(mongo_db, [1, 2], COUNT) == {1: 4, 2: 0}
+    mongo_db.evidence.find.assert_not_called()
+    assert mongo_db.evidence.aggregate.call_count == 1
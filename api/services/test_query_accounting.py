@@ -0,0 +1,61 @@
+import logging
+from types import SimpleNamespace
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from api.services.metrics import MetricsRegistry
+from api.services.query_accounting import (
+    MongoCommandRecorder, QueryAccountingMiddleware, _current_request, RequestStats, instrument_engine
+)
+
+def test_mongo_command_recorder_records_into_current_request():
+    """
+    Tests that Mongo command events are attributed to the request in the current context.
+    """
+    recorder = MongoCommandRecorder()
+    stats = RequestStats()
+    token = _current_request.set(stats)
+    try:
+        recorder.started(SimpleNamespace(
+            command_name="find", command={"find": "evidence"}, database_name="apprentice_hub",
+            connection_id=("localhost", 27017), request_id=7
+        ))
+        recorder.succeeded(SimpleNamespace(connection_id=("localhost", 27017), request_id=7, duration_micros=1500))
+    finally:
+        _current_request.reset(token)
+
+    assert stats.statements[0].text == "find apprentice_hub.evidence"
+    assert stats.count("mongodb") == 1
+    assert stats.time("mongodb") == 0.0015
+
+def test_middleware_counts_statements_and_logs_budget_violations(caplog):
+    """
+    Tests the per-route histogram and statement counters, and the over-budget log.
+    """
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    registry = MetricsRegistry(latency_buckets=(0.5, 5.0))
+    app = FastAPI()
+    app.add_middleware(QueryAccountingMiddleware, query_budget=2, registry=registry)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as connection:
+            for _ in range(item_id):
+                connection.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    client = TestClient(app)
+    with caplog.at_level(logging.WARNING, logger="api.services.query_accounting"):
+        client.get("/items/1")
+        client.get("/items/3")
+
+    rendered = registry.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2' in rendered
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",status="200",le="+Inf"} 2' in rendered
+    assert 'db_statements_total{route="/items/{item_id}",store="postgres"} 4.0' in rendered
+    assert 'http_request_budget_exceeded_total{route="/items/{item_id}"} 1.0' in rendered
+    assert len(caplog.records) == 1
+    assert "GET /items/3 over budget" in caplog.text
+    assert caplog.text.count("[postgres]") == 3
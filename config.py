@@ -1,21 +1,48 @@
 
 # config.py
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
-    # Database settings
-    postgres_user: str = os.environ.get("POSTGRES_USER")
-    postgres_password: str = os.environ.get("POSTGRES_PASSWORD")
-    postgres_host: str = os.environ.get("POSTGRES_HOST", "127.0.0.1")
-    postgres_port: str = os.environ.get("POSTGRES_PORT", "5432")
-    postgres_db: str = os.environ.get("POSTGRES_DB")
+    # Database settings, read from the environment or .env (POSTGRES_USER, ...)
+    postgres_user: Optional[str] = None
+    postgres_password: Optional[str] = None
+    postgres_host: str = "127.0.0.1"
+    postgres_port: str = "5432"
+    postgres_db: Optional[str] = None
 
     @property
     def postgres_url(self):
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
 
+    @property
+    def postgres_async_url(self):
+        return f"postgresql+asyncpg://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+
+    # Connection pools, per worker process
+    postgres_pool_size: int = 5
+    postgres_max_overflow: int = 10
+    postgres_pool_timeout: float = 30.0
+    mongodb_max_pool_size: int = 100
+    mongodb_wait_queue_timeout_ms: Optional[int] = None
+
     mongodb_url: str = "mongodb://localhost:27017/"
+    mongodb_database: str = "apprentice_hub"
+
+    # How long the readiness probe waits for each database, in seconds
+    health_check_timeout: float = 2.0
+
+    # Requests issuing more statements or taking longer than this are logged with their statements
+    request_query_budget: int = 20
+    request_latency_budget_ms: float = 500.0
+
+    # "sync" serves the API from blocking sessions in the threadpool,
+    # "async" from asyncpg and the async MongoDB client on the event loop
+    database_mode: str = "sync"
+
+    # How often each worker checks the KSB catalogue version, in seconds
+    ksb_cache_check_seconds: float = 5.0
 
     # Security settings
     secret_key: str = "your-secret-key-change-this-in-production"
@@ -28,7 +55,8 @@ class Settings(BaseSettings):
     debug: bool = False
 
     class Config:
-        env_file = ".env"
+        env_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env")
+        extra = "ignore"
 
+# Safe to import anywhere: reading settings never connects to a database
 settings = Settings()
-
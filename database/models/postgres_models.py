@@ -1,9 +1,11 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
 from pymongo import MongoClient
+from config import settings
 
-mongo_client = MongoClient('mongodb://localhost:27017/') # This needs to be mocked
+# connect=False defers connecting until the first query, so importing the models never opens a connection
+mongo_client = MongoClient(settings.mongodb_url, connect=False) # This needs to be mocked
 
 Base = declarative_base()
 
@@ -25,6 +27,8 @@ class KSB(Base):
     id = Column(Integer, primary_key=True, index=True)
     code = Column(String, unique=True, index=True)
     description = Column(Text)
+    # SHA-256 of the description as last imported from markdown, so re-imports skip unchanged KSBs
+    content_hash = Column(String(64))
 
     evidence_links = relationship("EvidenceKSBLink", back_populates="ksb")
 
@@ -42,17 +46,24 @@ class Project(Base):
 
     owner = relationship("User", back_populates="projects")
 
-    def get_related_evidence(self):
+    def get_related_evidence(self, mongo_db=None, mode="full"):
         """
         Fetches related evidence documents from MongoDB.
-        Note: This assumes the MongoDB connection is handled and 'project_id'
-        is used to link evidence to projects.
+
+        To load the evidence of many projects, call
+        api.services.project_evidence.load_project_evidence once with all
+        their ids instead, which costs a single MongoDB query.
+
+        Args:
+            mongo_db: The MongoDB database to read. Defaults to the configured
+                      database on the module-level client.
+            mode (str): "full", "summary" (no content) or "count".
         """
-        # TODO: Centralize MongoDB client and database name in config
-        db = mongo_client.get_database('apprentice_hub_db')
-        evidence_collection = db.evidence
-        evidence_list = list(evidence_collection.find({"project_id": self.id}))
-        return evidence_list
+        from api.services.project_evidence import load_project_evidence
+
+        if mongo_db is None:
+            mongo_db = mongo_client.get_database(settings.mongodb_database)
+        return load_project_evidence(mongo_db, [self.id], mode)[self.id]
 
 class EvidenceKSBLink(Base):
     __tablename__ = "evidence_ksb_link"
@@ -66,8 +77,48 @@ class EvidenceKSBLink(Base):
     # evidence = relationship("Evidence", back_populates="ksb_links") 
     # project = relationship("Project", back_populates="ksb_links")
 
+class CatalogueVersion(Base):
+    __tablename__ = "catalogue_versions"
+
+    # Bumped whenever a cached catalogue (e.g. "ksbs") changes, so every worker can invalidate
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SyncCheckpoint(Base):
+    __tablename__ = "sync_checkpoints"
+
+    # How far a background job (e.g. the evidence reconciler) has processed, by evidence write time
+    name = Column(String, primary_key=True)
+    position = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class KSBCoverage(Base):
+    __tablename__ = "ksb_coverage"
+
+    # Per-user evidence count for each KSB, maintained alongside evidence_ksb_link
+    user_id = Column(Integer, primary_key=True)
+    ksb_id = Column(Integer, ForeignKey("ksbs.id"), primary_key=True)
+    evidence_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class OffTheJobBucket(Base):
+    __tablename__ = "otj_hours_buckets"
+
+    # Pre-rolled off-the-job totals for closed weeks and months, so only the current period is aggregated live
+    user_id = Column(Integer, primary_key=True)
+    period = Column(String, primary_key=True) # "week" or "month"
+    period_start = Column(Date, primary_key=True)
+    minutes = Column(Integer, nullable=False, default=0)
+    log_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class LearningLog(Base):
     __tablename__ = "learning_logs"
+    __table_args__ = (
+        # Serves the per-user date range scans of the off-the-job hours aggregates
+        Index("ix_learning_logs_user_id_date", "user_id", "date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
@@ -7,15 +7,26 @@ from unittest.mock import patch, MagicMock
 # You might need to adjust the import path based on your project structure.
 from database.models.postgres_models import Project
 
+class MockCursor(list):
+    def sort(self, keys):
+        return self
+
+def _matches(item, query):
+    # Simple simulation of equality and $in conditions
+    return all(
+        item.get(k) in v["$in"] if isinstance(v, dict) else item.get(k) == v
+        for k, v in query.items()
+    )
+
 class MockMongoCollection:
     def __init__(self, data):
         self.data = data
+        self.find = MagicMock(side_effect=self._find)
 
-    def find(self, query):
+    def _find(self, query, projection=None):
         # Simple simulation of finding documents based on a query
         # In a real scenario, this would be more sophisticated
-        results = [item for item in self.data if all(item.get(k) == v for k, v in query.items())]
-        return results
+        return MockCursor(item for item in self.data if _matches(item, query))
 
 @pytest.fixture
 def mock_mongo_db():
@@ -97,5 +108,6 @@ def test_project_evidence_relationship_with_mock_mongo(mock_mongo_client, mock_p
     assert "evidence2" in evidence_ids
     assert "evidence3" not in evidence_ids # Ensure evidence from another project is not included
 
-    # Verify that the find method was called with the correct query
-    mock_mongo_db.evidence.find.assert_called_once_with({"project_id": mock_project.id})
\ No newline at end of file
+    # Verify that a single batched find was issued against the configured database
+    mock_mongo_client.get_database.assert_called_once_with("apprentice_hub")
+    mock_mongo_db.evidence.find.assert_called_once_with({"project_id": {"$in": [mock_project.id]}}, None)
\ No newline at end of file
@@ -1,81 +1,121 @@
-
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from pymongo import MongoClient
-import os
-from database.models.postgres_models import Base
-from dotenv import load_dotenv  # Import load_dotenv
-load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))  # Load environment variables from .env file
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from pymongo import AsyncMongoClient, MongoClient
+from config import Settings, settings as default_settings
+from api.services.health import MongoPoolStats, create_async_probe_engine, create_probe_engine
+from api.services.query_accounting import MongoCommandRecorder, QueryAccountingMiddleware, instrument_engine
 
-db_user = os.environ.get("POSTGRES_USER")
-db_password = os.environ.get("POSTGRES_PASSWORD")
-db = os.environ.get("POSTGRES_DB")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the database clients when the server starts and closes them on
+    shutdown. Engines and clients connect on first use, so starting the
+    app does not wait for PostgreSQL or MongoDB. The schema is created
+    out of process by scripts/create_schema.py.
+    """
+    settings: Settings = app.state.settings
+    state = app.state
 
-# Database configuration
+    pool_options = {
+        "pool_size": settings.postgres_pool_size,
+        "max_overflow": settings.postgres_max_overflow,
+        "pool_timeout": settings.postgres_pool_timeout,
+    }
+    # pymongo exposes pool usage only through events, which the readiness probe reports
+    state.mongo_pool_stats = MongoPoolStats()
+    mongo_options = {
+        "connect": False,
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "waitQueueTimeoutMS": settings.mongodb_wait_queue_timeout_ms,
+        "event_listeners": [state.mongo_pool_stats, MongoCommandRecorder()],
+    }
 
-postgres_url: str = f"postgresql://{db_user}:{db_password}@[::1]:5432/{db}"
-MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017/")
+    if settings.database_mode == "async":
+        state.async_engine = create_async_engine(settings.postgres_async_url, **pool_options)
+        state.async_session_factory = async_sessionmaker(state.async_engine, expire_on_commit=False)
+        instrument_engine(state.async_engine.sync_engine)
+        state.async_probe_engine = create_async_probe_engine(settings.postgres_async_url, settings.health_check_timeout)
+        state.async_mongo_client = AsyncMongoClient(settings.mongodb_url, **mongo_options)
+        state.async_mongo_db = state.async_mongo_client[settings.mongodb_database]
+    else:
+        state.engine = create_engine(settings.postgres_url, **pool_options)
+        state.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=state.engine)
+        instrument_engine(state.engine)
+        state.probe_engine = create_probe_engine(settings.postgres_url, settings.health_check_timeout)
+        state.mongo_client = MongoClient(settings.mongodb_url, **mongo_options)
+        state.mongo_db = state.mongo_client[settings.mongodb_database]
 
-# PostgreSQL setup
-engine = create_engine(postgres_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base.metadata.create_all(bind=engine)
+    try:
+        yield
+    finally:
+        if settings.database_mode == "async":
+            await state.async_mongo_client.close()
+            await state.async_engine.dispose()
+            await state.async_probe_engine.dispose()
+        else:
+            state.mongo_client.close()
+            state.engine.dispose()
+            state.probe_engine.dispose()
 
-# MongoDB setup
-mongo_client = MongoClient(MONGODB_URL)
-mongo_db = mongo_client.apprentice_hub
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the FastAPI application. No database is touched until the server starts."""
+    settings = settings or default_settings
 
-app = FastAPI(
-    title="Apprentice Hub Backend",
-    description="A centralized platform for managing AI apprenticeship learning and evidence",
-    version="1.0.0"
-)
+    app = FastAPI(
+        title="Apprentice Hub Backend",
+        description="A centralized platform for managing AI apprenticeship learning and evidence",
+        version=settings.app_version,
+        lifespan=lifespan
+    )
+    app.state.settings = settings
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure this properly for production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure this properly for production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
-# Dependency to get PostgreSQL database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Per-route latency and database statement accounting, exposed on /metrics
+    app.add_middleware(
+        QueryAccountingMiddleware,
+        query_budget=settings.request_query_budget,
+        latency_budget_ms=settings.request_latency_budget_ms
+    )
 
-# Dependency to get MongoDB database
-def get_mongo_db():
-    return mongo_db
+    @app.get("/")
+    def read_root():
+        return {
+            "message": "Apprentice Hub Backend",
+            "version": settings.app_version,
+            "status": "MVP Development"
+        }
 
-@app.get("/")
-def read_root():
-    return {
-        "message": "Apprentice Hub Backend", 
-        "version": "1.0.0",
-        "status": "MVP Development"
-    }
+    # Include API routers
+    if settings.database_mode == "async":
+        from api.routers.aio import ksbs, evidence, dashboard, otj_hours, export
+    else:
+        from api.routers import ksbs, evidence, dashboard, otj_hours, export
+    from api.routers import health, metrics
 
-# Include API routers
-from api.routers import ksbs, evidence, dashboard
+    app.include_router(ksbs.router, prefix="/api")
+    app.include_router(evidence.router, prefix="/api")
+    app.include_router(dashboard.router, prefix="/api")
+    app.include_router(otj_hours.router, prefix="/api")
+    app.include_router(export.router, prefix="/api")
+    app.include_router(health.router)
+    app.include_router(metrics.router)
 
-app.include_router(ksbs.router, prefix="/api")
-app.include_router(evidence.router, prefix="/api")
-app.include_router(dashboard.router, prefix="/api")
+    return app
 
-@app.get("/health")
-def health_check():
-    return {
-        "status": "healthy",
-        "postgres": "connected",
-        "mongodb": "connected"
-    }
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from pymongo import MongoClient, UpdateOne
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.evidence_links import load_ksb_ids
+from api.services.mongo_indexes import ensure_indexes
+from config import Settings
+
+def backfill_evidence_ksb_ids(db_url, mongodb_url, mongodb_database="apprentice_hub", batch_size=1000):
+    """
+    Copies each evidence document's KSB links from evidence_ksb_link onto the
+    document as ksb_ids, so evidence reads and KSB filters no longer need
+    the link table. Documents that already have ksb_ids are skipped, so the
+    backfill can be stopped and resumed.
+
+    Args:
+        db_url (str): The database URL.
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The database holding the evidence collection.
+        batch_size (int): Documents resolved per link query and bulk write.
+    """
+    engine = create_engine(db_url)
+    DBSession = sessionmaker(bind=engine)
+    session = DBSession()
+    mongo_client = MongoClient(mongodb_url)
+    mongo_db = mongo_client[mongodb_database]
+    updated = 0
+
+    def write_batch(evidence_ids):
+        ksb_ids_by_evidence = load_ksb_ids(session, [str(evidence_id) for evidence_id in evidence_ids])
+        result = mongo_db.evidence.bulk_write([
+            # Guard on the field being absent so a concurrent write is never overwritten
+            UpdateOne(
+                {"_id": evidence_id, "ksb_ids": {"$exists": False}},
+                {"$set": {"ksb_ids": ksb_ids_by_evidence[str(evidence_id)]}}
+            )
+            for evidence_id in evidence_ids
+        ], ordered=False)
+        return result.modified_count
+
+    try:
+        ensure_indexes(mongo_db)
+        cursor = mongo_db.evidence.find({"ksb_ids": {"$exists": False}}, {"_id": 1}).batch_size(batch_size)
+        evidence_ids = []
+        for doc in cursor:
+            evidence_ids.append(doc["_id"])
+            if len(evidence_ids) == batch_size:
+                updated += write_batch(evidence_ids)
+                evidence_ids = []
+        if evidence_ids:
+            updated += write_batch(evidence_ids)
+    finally:
+        session.close()
+        mongo_client.close()
+    print(f"Evidence KSB backfill complete: {updated} documents tagged.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store KSB ids on evidence documents written before they were kept there.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents resolved per batch")
+    args = parser.parse_args()
+
+    settings = Settings()
+    backfill_evidence_ksb_ids(settings.postgres_url, settings.mongodb_url, settings.mongodb_database, args.batch_size)
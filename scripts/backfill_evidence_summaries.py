@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+from pymongo import MongoClient, UpdateOne
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.evidence_fields import content_summary
+from config import Settings
+
+def backfill_evidence_summaries(mongodb_url, mongodb_database="apprentice_hub", batch_size=1000):
+    """
+    Stores the excerpt and content length on evidence written before they were
+    kept on the document, so summary lists do not have to read the content.
+
+    Args:
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The database holding the evidence collection.
+        batch_size (int): Number of documents updated per bulk write.
+    """
+    mongo_client = MongoClient(mongodb_url)
+    collection = mongo_client[mongodb_database].evidence
+    updated = 0
+
+    try:
+        cursor = collection.find({"excerpt": {"$exists": False}}, {"content": 1}).batch_size(batch_size)
+        updates = []
+        for doc in cursor:
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": content_summary(doc.get("content") or "")}))
+            if len(updates) == batch_size:
+                updated += collection.bulk_write(updates, ordered=False).modified_count
+                updates = []
+        if updates:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+    finally:
+        mongo_client.close()
+    print(f"Evidence summary backfill complete: {updated} documents updated.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store excerpts and content lengths on existing evidence.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents updated per bulk write")
+    args = parser.parse_args()
+
+    settings = Settings()
+    backfill_evidence_summaries(settings.mongodb_url, settings.mongodb_database, args.batch_size)
@@ -0,0 +1,426 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import httpx
+from sqlalchemy import create_engine, insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PROJECT_ROOT)
+
+from database.models.postgres_models import Base, EvidenceKSBLink, KSB, LearningLog, Project, User
+from api.schemas.evidence_schemas import EvidenceCreate
+from api.services.coverage import apply_added_links
+from api.services.evidence_writes import new_evidence_document
+from api.services.health import MongoPoolStats
+from api.services.ksb_catalogue import bump_ksb_catalogue_version, ksb_catalogue
+from api.services.metrics import DB_STATEMENTS, REQUEST_DURATION, metrics
+from api.services.mongo_indexes import ensure_indexes
+from api.services.query_accounting import instrument_engine
+from config import Settings
+from main import create_app
+
+RESULTS_FOLDER = os.path.join(PROJECT_ROOT, "benchmark-results")
+
+WORDS = (
+    "model pipeline feature data training evaluation deployment metric stakeholder dataset "
+    "bias regression classifier cluster experiment hypothesis dashboard monitoring drift "
+    "accuracy latency architecture storage governance ethics review sprint notebook api "
+    "transformer embedding vector label annotation baseline validation test release"
+).split()
+
+class DatasetParams(NamedTuple):
+    users: int
+    projects_per_user: int
+    evidence_per_user: int
+    max_ksbs_per_evidence: int
+    log_days: int
+    seed: int
+
+class Dataset(NamedTuple):
+    user_ids: List[int]
+    evidence_ids: List[str]
+    ksb_ids: List[int]
+
+def markdown_document(rng: random.Random) -> str:
+    """A markdown body whose length follows a log-normal distribution around 1.5 kB, like real evidence write-ups"""
+    target = min(max(int(rng.lognormvariate(math.log(1500), 0.8)), 200), 20000)
+    parts = [f"# {' '.join(rng.choices(WORDS, k=4)).title()}\n"]
+    size = len(parts[0])
+    while size < target:
+        paragraph = " ".join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize() + ".\n"
+        if rng.random() < 0.2:
+            paragraph = f"\n## {' '.join(rng.choices(WORDS, k=3)).title()}\n" + paragraph
+        parts.append(paragraph)
+        size += len(paragraph)
+    return "".join(parts)[:target]
+
+def load_ksb_rows(ksb_folder: str) -> List[Dict[str, str]]:
+    """Read the KSB catalogue from the ksbs/ markdown folder, falling back to the 65 standard codes"""
+    rows = []
+    if os.path.isdir(ksb_folder):
+        for filename in sorted(os.listdir(ksb_folder)):
+            if filename.endswith(".desc.md"):
+                with open(os.path.join(ksb_folder, filename), encoding="utf-8") as f:
+                    rows.append({"code": filename[:-len(".desc.md")].upper(), "description": f.read().strip()})
+    if not rows:
+        codes = [f"K{i}" for i in range(1, 30)] + [f"S{i}" for i in range(1, 29)] + [f"B{i}" for i in range(1, 9)]
+        rows = [{"code": code, "description": f"Synthetic {code}"} for code in codes]
+    return rows
+
+def seed_dataset(engine, mongo_db, params: DatasetParams) -> Dataset:
+    """
+    Replaces the contents of both stores with a synthetic dataset.
+
+    Every user gets projects, evidence whose KSB links fan out across the
+    catalogue, and a year of weekday learning logs. Evidence documents are
+    built by new_evidence_document, as the API builds them, so they carry
+    their ksb_ids and content summary. The same parameters and seed always
+    produce the same dataset.
+    """
+    rng = random.Random(params.seed)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    mongo_db.evidence.drop()
+
+    session = sessionmaker(bind=engine)()
+    try:
+        session.execute(insert(KSB), load_ksb_rows(os.path.join(PROJECT_ROOT, "ksbs")))
+        ksb_ids = list(session.execute(KSB.__table__.select().with_only_columns(KSB.id)).scalars())
+        bump_ksb_catalogue_version(session)
+
+        user_ids = list(range(1, params.users + 1))
+        session.execute(insert(User), [
+            {"id": user_id, "email": f"apprentice{user_id}@example.com", "name": f"Apprentice {user_id}"}
+            for user_id in user_ids
+        ])
+        project_ids = {}
+        project_rows = []
+        for user_id in user_ids:
+            project_ids[user_id] = []
+            for _ in range(params.projects_per_user):
+                project_id = len(project_rows) + 1
+                project_ids[user_id].append(project_id)
+                project_rows.append({"id": project_id, "user_id": user_id, "name": f"Project {project_id}", "status": "active"})
+        session.execute(insert(Project), project_rows)
+
+        today = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0)
+        log_rows = []
+        for user_id in user_ids:
+            for days_ago in range(params.log_days):
+                day = today - timedelta(days=days_ago)
+                if day.weekday() < 5 and rng.random() < 0.6:
+                    log_rows.append({
+                        "user_id": user_id, "date": day, "duration_minutes": rng.randint(15, 240),
+                        "description": " ".join(rng.choices(WORDS, k=8))
+                    })
+        session.execute(insert(LearningLog), log_rows)
+
+        evidence_ids = []
+        for user_id in user_ids:
+            documents = []
+            for _ in range(params.evidence_per_user):
+                created_at = today - timedelta(minutes=rng.randint(0, params.log_days * 24 * 60))
+                documents.append(new_evidence_document(EvidenceCreate(
+                    user_id=user_id,
+                    project_id=rng.choice(project_ids[user_id]) if project_ids[user_id] else None,
+                    title=" ".join(rng.choices(WORDS, k=5)).capitalize(),
+                    content_type="markdown",
+                    content=markdown_document(rng),
+                    ksb_ids=rng.sample(ksb_ids, rng.randint(1, params.max_ksbs_per_evidence)),
+                ), created_at))
+            inserted = mongo_db.evidence.insert_many(documents).inserted_ids
+            link_rows = [
+                {"evidence_id": str(evidence_id), "ksb_id": ksb_id, "project_id": document["project_id"]}
+                for evidence_id, document in zip(inserted, documents)
+                for ksb_id in document["ksb_ids"]
+            ]
+            session.execute(insert(EvidenceKSBLink), link_rows)
+            apply_added_links(session, [(user_id, row["ksb_id"]) for row in link_rows])
+            evidence_ids.extend(str(evidence_id) for evidence_id in inserted)
+        session.commit()
+    finally:
+        session.close()
+
+    ksb_catalogue.invalidate()
+    return Dataset(user_ids, evidence_ids, ksb_ids)
+
+class Endpoint(NamedTuple):
+    name: str
+    method: str
+    make_request: Callable[[random.Random, Dataset], Tuple[str, Optional[Any]]]
+    writes: bool = False
+    # Needs the evidence text index, which the mongomock stand-in cannot serve ($text is unsupported)
+    text_search: bool = False
+
+def _evidence_item(rng: random.Random, data: Dataset) -> Dict[str, Any]:
+    return {
+        "user_id": rng.choice(data.user_ids),
+        "title": " ".join(rng.choices(WORDS, k=5)),
+        "content": markdown_document(rng),
+        "ksb_ids": rng.sample(data.ksb_ids, 3),
+    }
+
+# Every /api endpoint, reads first: writes change the dataset the reads see
+ENDPOINTS = [
+    Endpoint("ksbs list", "GET", lambda rng, data: (f"/api/ksbs/?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("ksb detail", "GET", lambda rng, data: (f"/api/ksbs/{rng.choice(data.ksb_ids)}", None)),
+    Endpoint("evidence list", "GET", lambda rng, data: (f"/api/evidence/?user_id={rng.choice(data.user_ids)}&limit=100", None)),
+    Endpoint("evidence list (summary)", "GET", lambda rng, data: (f"/api/evidence/?user_id={rng.choice(data.user_ids)}&limit=100&view=summary", None)),
+    Endpoint("evidence detail", "GET", lambda rng, data: (f"/api/evidence/{rng.choice(data.evidence_ids)}", None)),
+    Endpoint("evidence revisions", "GET", lambda rng, data: (f"/api/evidence/{rng.choice(data.evidence_ids)}/revisions", None)),
+    Endpoint("evidence search", "GET", lambda rng, data: (f"/api/evidence/search?q={rng.choice(WORDS)}&user_id={rng.choice(data.user_ids)}", None),
+             text_search=True),
+    Endpoint("ksb suggestions (portfolio)", "GET", lambda rng, data: (f"/api/evidence/suggest-ksbs?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("dashboard overview", "GET", lambda rng, data: (f"/api/dashboard/overview?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("dashboard cohort", "GET", lambda rng, data: (f"/api/dashboard/cohort?user_ids={','.join(map(str, data.user_ids))}", None)),
+    Endpoint("portfolio export", "GET", lambda rng, data: (f"/api/export/portfolio?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("otj weekly", "GET", lambda rng, data: (f"/api/otj-hours/weekly?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("otj monthly", "GET", lambda rng, data: (f"/api/otj-hours/monthly?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("otj compliance", "GET", lambda rng, data: (f"/api/otj-hours/compliance?user_id={rng.choice(data.user_ids)}", None)),
+    Endpoint("ksb suggestions", "POST", lambda rng, data: (
+        "/api/evidence/suggest-ksbs", {"title": " ".join(rng.choices(WORDS, k=5)), "content": markdown_document(rng)}
+    )),
+    Endpoint("evidence create", "POST", lambda rng, data: ("/api/evidence/", _evidence_item(rng, data)), writes=True),
+    Endpoint("evidence edit", "PATCH", lambda rng, data: (
+        f"/api/evidence/{rng.choice(data.evidence_ids)}", {"title": " ".join(rng.choices(WORDS, k=5))}
+    ), writes=True),
+    Endpoint("evidence bulk (20)", "POST", lambda rng, data: (
+        "/api/evidence/bulk", {"items": [_evidence_item(rng, data) for _ in range(20)]}
+    ), writes=True),
+    Endpoint("ksb create", "POST", lambda rng, data: (
+        "/api/ksbs/", {"code": f"BENCH-{rng.getrandbits(48):x}", "description": "Benchmark KSB"}
+    ), writes=True),
+]
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def _statements_per_request() -> Dict[str, float]:
+    snapshot = metrics.snapshot()
+    requests = sum(snapshot.get(REQUEST_DURATION, {}).values())
+    per_store: Dict[str, float] = {}
+    for labels, count in snapshot.get(DB_STATEMENTS, {}).items():
+        store = dict(labels)["store"]
+        per_store[store] = per_store.get(store, 0) + count
+    return {store: round(count / requests, 2) for store, count in sorted(per_store.items())} if requests else {}
+
+async def run_endpoint(client: httpx.AsyncClient, endpoint: Endpoint, data: Dataset,
+                       requests: int, concurrency: int, warmup: int, seed: int) -> Dict[str, Any]:
+    """Send `requests` requests to one endpoint from `concurrency` concurrent workers"""
+    rng = random.Random(f"{seed}-{endpoint.name}")
+    planned = [endpoint.make_request(rng, data) for _ in range(warmup + requests)]
+
+    async def send(url, body):
+        response = await client.request(endpoint.method, url, json=body)
+        return response.status_code
+
+    for url, body in planned[:warmup]:
+        await send(url, body)
+    metrics.reset()
+
+    queue = list(reversed(planned[warmup:]))
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker():
+        while queue:
+            url, body = queue.pop()
+            start = time.perf_counter()
+            try:
+                status = str(await send(url, body))
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": requests,
+        "errors": errors,
+        "status_codes": statuses,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "queries_per_request": _statements_per_request(),
+    }
+
+def standin_lifespan(engine, mongo_db):
+    """A lifespan that serves the app from an SQLite engine and an in-process MongoDB stand-in"""
+    @asynccontextmanager
+    async def lifespan(app):
+        state = app.state
+        state.engine = engine
+        state.probe_engine = engine
+        state.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        state.mongo_db = mongo_db
+        state.mongo_pool_stats = MongoPoolStats()
+        instrument_engine(engine)
+        yield
+    return lifespan
+
+def build_backend(args):
+    """Create the stores to seed and the app to drive, for the chosen backend"""
+    if args.backend == "standin":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("The stand-in backend needs mongomock (pip install mongomock), or use --backend local.")
+        if args.mode != "sync":
+            sys.exit("The stand-in backend only serves the sync database mode.")
+        path = os.path.join(tempfile.mkdtemp(prefix="apprentice-hub-bench-"), "bench.db")
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        mongo_db = mongomock.MongoClient().apprentice_hub
+        app = create_app(Settings(database_mode="sync"))
+        app.router.lifespan_context = standin_lifespan(engine, mongo_db)
+        return engine, mongo_db, app, lambda: engine.dispose()
+
+    if not (args.postgres_url and args.mongodb_url):
+        sys.exit("--backend local needs --postgres-url and --mongodb-url of databases the benchmark may wipe.")
+    from pymongo import MongoClient
+    url = make_url(args.postgres_url)
+    settings = Settings(
+        postgres_user=url.username, postgres_password=url.password, postgres_host=url.host or "127.0.0.1",
+        postgres_port=str(url.port or 5432), postgres_db=url.database,
+        mongodb_url=args.mongodb_url, mongodb_database=args.mongodb_database, database_mode=args.mode
+    )
+    engine = create_engine(settings.postgres_url)
+    mongo_client = MongoClient(settings.mongodb_url)
+    mongo_db = mongo_client[settings.mongodb_database]
+
+    def close():
+        mongo_client.close()
+        engine.dispose()
+
+    return engine, mongo_db, create_app(settings), close
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    params = DatasetParams(args.users, args.projects_per_user, args.evidence_per_user,
+                           args.max_ksbs_per_evidence, args.log_days, args.seed)
+    engine, mongo_db, app, close = build_backend(args)
+    try:
+        started = time.perf_counter()
+        data = seed_dataset(engine, mongo_db, params)
+        if args.backend == "local":
+            ensure_indexes(mongo_db)
+        print(f"Seeded {len(data.user_ids)} users, {len(data.evidence_ids)} evidence, "
+              f"{len(data.ksb_ids)} KSBs in {time.perf_counter() - started:.1f}s")
+
+        endpoints = [e for e in ENDPOINTS if not (args.skip_writes and e.writes)]
+        if args.only:
+            endpoints = [e for e in endpoints if any(name in e.name for name in args.only)]
+        unsupported = [e.name for e in endpoints if args.backend == "standin" and e.text_search]
+        endpoints = [e for e in endpoints if e.name not in unsupported]
+        for name in unsupported:
+            print(f"{name:<22} skipped: the stand-in backend has no $text search, use --backend local")
+
+        results = {}
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for endpoint in endpoints:
+                    results[endpoint.name] = await run_endpoint(
+                        client, endpoint, data, args.requests, args.concurrency, args.warmup, args.seed
+                    )
+                    print_endpoint(endpoint.name, results[endpoint.name])
+    finally:
+        close()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "backend": args.backend,
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "dataset": params._asdict(),
+            # The stand-in does not emit pymongo command events, so only PostgreSQL statements are counted
+            "mongodb_commands_counted": args.backend == "local",
+            "unsupported_endpoints": unsupported,
+        },
+        "endpoints": results,
+    }
+
+def print_endpoint(name: str, result: Dict[str, Any]) -> None:
+    queries = ", ".join(f"{store} {count}" for store, count in result["queries_per_request"].items()) or "-"
+    print(f"{name:<22} p50 {result['p50_ms']:>8.2f}  p95 {result['p95_ms']:>8.2f}  p99 {result['p99_ms']:>8.2f} ms  "
+          f"{result['throughput_rps']:>8.1f} req/s  errors {result['errors']:<4} queries/req {queries}")
+
+def print_comparison(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    for name, result in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        print(f"{name:<22} p95 {before['p95_ms']:>8.2f} -> {result['p95_ms']:>8.2f} ms ({change:+.1f}%)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a synthetic dataset and benchmark every /api endpoint.")
+    parser.add_argument("--backend", choices=["standin", "local"], default="standin",
+                        help="standin: SQLite and mongomock in-process; local: the given PostgreSQL and MongoDB (wiped)")
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync", help="database mode to serve (default: sync)")
+    parser.add_argument("--postgres-url", help="PostgreSQL URL for --backend local")
+    parser.add_argument("--mongodb-url", help="MongoDB URL for --backend local")
+    parser.add_argument("--mongodb-database", default="apprentice_hub_bench", help="MongoDB database for --backend local")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects-per-user", type=int, default=3)
+    parser.add_argument("--evidence-per-user", type=int, default=40)
+    parser.add_argument("--max-ksbs-per-evidence", type=int, default=6)
+    parser.add_argument("--log-days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint (default: 200)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients (default: 8)")
+    parser.add_argument("--warmup", type=int, default=10, help="unmeasured requests per endpoint (default: 10)")
+    parser.add_argument("--skip-writes", action="store_true", help="only benchmark read endpoints")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="only endpoints whose name contains one of these")
+    parser.add_argument("--output", help="results file (default: benchmark-results/<commit>-<time>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="print p95 changes against an earlier results file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+
+    output = args.output or os.path.join(
+        RESULTS_FOLDER, f"{results['meta']['commit'] or 'unknown'}-{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), results)
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so module caches never flatter the numbers
+CHILD_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+try:
+    import main
+    imported = time.perf_counter()
+
+    async def run_lifespan():
+        async with main.app.router.lifespan_context(main.app):
+            return time.perf_counter()
+
+    started = asyncio.run(run_lifespan())
+    print(json.dumps({"import": imported - start, "startup": started - imported}))
+except Exception as e:
+    print(json.dumps({"error": f"{type(e).__name__}: {e}"[:200], "elapsed": time.perf_counter() - start}))
+"""
+
+def measure_startup(project_root, timeout):
+    """
+    Imports main and runs the app's startup and shutdown in a new process.
+
+    Returns:
+        dict: "import" and "startup" times in seconds, or "error" and
+              "elapsed" if the app could not start.
+    """
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD_SCRIPT],
+            cwd=project_root, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return {"error": f"timed out after {timeout}s", "elapsed": timeout}
+    lines = result.stdout.strip().splitlines()
+    if not lines:
+        return {"error": result.stderr.strip().splitlines()[-1:] or "no output", "elapsed": None}
+    return json.loads(lines[-1])
+
+def benchmark(project_root, repeat, timeout):
+    runs = [measure_startup(project_root, timeout) for _ in range(repeat)]
+    ok = [run for run in runs if "error" not in run]
+    summary = {"runs": repeat, "failed": repeat - len(ok)}
+    for key in ("import", "startup"):
+        values = [run[key] * 1000 for run in ok]
+        if values:
+            summary[f"{key}_ms"] = {
+                "median": round(statistics.median(values), 1),
+                "min": round(min(values), 1),
+                "max": round(max(values), 1),
+            }
+    errors = [run for run in runs if "error" in run]
+    if errors:
+        summary["error"] = errors[0]["error"]
+        summary["elapsed_s"] = errors[0]["elapsed"]
+    return summary
+
+def print_summary(label, summary):
+    print(f"{label}: {summary['runs'] - summary['failed']}/{summary['runs']} runs started")
+    for key in ("import_ms", "startup_ms"):
+        if key in summary:
+            stats = summary[key]
+            print(f"  {key[:-3]:<8} median {stats['median']} ms (min {stats['min']}, max {stats['max']})")
+    if "error" in summary:
+        print(f"  failed after {summary['elapsed_s']}s: {summary['error']}")
+
+def benchmark_ref(ref, repeat, timeout):
+    """Benchmark another revision from a temporary git worktree"""
+    worktree = tempfile.mkdtemp(prefix="startup-bench-")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, ref],
+                   cwd=PROJECT_ROOT, check=True, capture_output=True)
+    try:
+        return benchmark(worktree, repeat, timeout)
+    finally:
+        subprocess.run(["git", "worktree", "remove", "--force", worktree],
+                       cwd=PROJECT_ROOT, capture_output=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how long the API takes to import and start.")
+    parser.add_argument("--repeat", type=int, default=5, help="number of cold starts to measure (default: 5)")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds before a start counts as failed (default: 60)")
+    parser.add_argument("--compare", metavar="REF",
+                        help="also measure this git revision, e.g. the commit before the app factory")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = {"current": benchmark(PROJECT_ROOT, args.repeat, args.timeout)}
+    if args.compare:
+        results[args.compare] = benchmark_ref(args.compare, args.repeat, args.timeout)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for label, summary in results.items():
+            print_summary(label, summary)
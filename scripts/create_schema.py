@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine
+from pymongo import MongoClient
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models.postgres_models import Base
+from api.services.mongo_indexes import ensure_indexes
+from config import Settings
+
+def create_schema(db_url, mongodb_url, mongodb_database="apprentice_hub", skip_mongo=False):
+    """
+    Creates the PostgreSQL tables and the MongoDB evidence indexes.
+
+    The API no longer does this at import or startup, so run this once per
+    deployment, before starting the server. Both steps are idempotent:
+    existing tables and indexes are left as they are. Columns and indexes
+    added to existing tables are applied by the Alembic revisions in
+    alembic/versions instead (run "alembic upgrade head"); they skip what
+    this script has already created.
+
+    Args:
+        db_url (str): The database URL.
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The MongoDB database holding the evidence collection.
+        skip_mongo (bool): Only create the PostgreSQL tables.
+    """
+    engine = create_engine(db_url)
+    try:
+        Base.metadata.create_all(engine)
+    finally:
+        engine.dispose()
+    print(f"PostgreSQL tables ensured: {len(Base.metadata.tables)}")
+
+    if skip_mongo:
+        return
+
+    mongo_client = MongoClient(mongodb_url)
+    try:
+        for name in ensure_indexes(mongo_client[mongodb_database]):
+            print(f"Index ensured: evidence.{name}")
+    finally:
+        mongo_client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the database tables and indexes.")
+    parser.add_argument("--skip-mongo", action="store_true",
+                        help="only create the PostgreSQL tables")
+    args = parser.parse_args()
+
+    settings = Settings()
+    create_schema(settings.postgres_url, settings.mongodb_url, settings.mongodb_database, skip_mongo=args.skip_mongo)
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+from pymongo import MongoClient
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.services.mongo_indexes import ensure_indexes, find_collection_scans
+from config import Settings
+
+def ensure_mongo_indexes(mongodb_url, mongodb_database="apprentice_hub", check=False):
+    """
+    Creates the declared MongoDB evidence indexes and optionally verifies them.
+
+    Args:
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The database holding the evidence collection.
+        check (bool): Explain every router query shape afterwards and report
+                      any that would still scan the whole collection.
+
+    Returns:
+        bool: False if the check found a collection scan, True otherwise.
+    """
+    mongo_client = MongoClient(mongodb_url)
+    try:
+        mongo_db = mongo_client[mongodb_database]
+        for name in ensure_indexes(mongo_db):
+            print(f"Index ensured: evidence.{name}")
+
+        if not check:
+            return True
+
+        offenders = find_collection_scans(mongo_db)
+        for name in offenders:
+            print(f"COLLSCAN: {name}")
+        if offenders:
+            return False
+        print("All evidence queries are served by an index.")
+        return True
+    finally:
+        mongo_client.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the MongoDB evidence indexes.")
+    parser.add_argument("--check", action="store_true",
+                        help="fail if any router query would do a collection scan")
+    args = parser.parse_args()
+
+    settings = Settings()
+    if not ensure_mongo_indexes(settings.mongodb_url, settings.mongodb_database, check=args.check):
+        sys.exit(1)
@@ -1,50 +1,239 @@
+import argparse
+import hashlib
+import json
 import os
 import sys
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker
 
 # Add the project root to the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.models.postgres_models import KSB, Base
+from api.services.dialects import upsert_insert
+from api.services.ksb_catalogue import bump_ksb_catalogue_version
 from config import Settings
 
-def import_ksbs_from_markdown(ksb_folder_path, db_url):
+KSB_FILE_SUFFIX = ".desc.md"
+MANIFEST_FILENAME = ".import_manifest.json"
+
+def content_hash(description):
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+def read_description(filepath):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return f.read().strip()
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get("files", {})
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(manifest_path, files):
+    # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def ksb_code(relpath, namespace=None):
+    """
+    Derives a KSB code from a file's path relative to its import folder.
+
+    "k1.desc.md" becomes "K1" and "st0763/k1.desc.md" becomes "ST0763-K1".
+    The folder's namespace, if it has one, prefixes every code in it, so
+    with namespace "st0787" those become "ST0787-K1" and "ST0787-ST0763-K1".
+    """
+    standard, filename = os.path.split(relpath)
+    parts = [namespace] if namespace else []
+    if standard:
+        parts.extend(standard.split(os.sep))
+    parts.append(filename[:-len(KSB_FILE_SUFFIX)])
+    return "-".join(parts).upper()
+
+def parse_folder(spec):
+    """
+    Splits a "[NAMESPACE=]FOLDER" argument into the folder and its namespace.
+
+    The namespace is part of every code imported from the folder, so a
+    folder must be imported with the same namespace every time.
+    """
+    namespace, separator, folder = spec.partition("=")
+    if not separator:
+        return spec, None
+    if not namespace or not folder:
+        raise ValueError(f"Expected NAMESPACE=FOLDER, got {spec!r}")
+    return folder, namespace
+
+def scan_ksb_folder(ksb_folder_path, manifest, namespace=None):
+    """
+    Lists the KSB files under a folder, hashing only those that changed.
+
+    Files directly in the folder use their file name as the code ("k1.desc.md"
+    becomes "K1"). Each subfolder is treated as a separate standard and its
+    codes are namespaced with the folder name ("st0763/k1.desc.md" becomes
+    "ST0763-K1"), so several standards can share one catalogue. The
+    namespace, if given, prefixes every code (see ksb_code).
+
+    Args:
+        ksb_folder_path (str): The folder to scan.
+        manifest (dict): The manifest entries from the previous import, keyed
+                         by path relative to the folder.
+        namespace (str): Prefix for every code in the folder.
+
+    Returns:
+        dict: Manifest entries for the files found now. Entries whose file is
+              unchanged (same mtime, size and code) are reused without reading the file.
+
+    Raises:
+        ValueError: If a file imported before would now get a different code,
+                    e.g. because the folder's namespace changed. That would
+                    add a second KSB and leave the evidence linked to the first.
+    """
+    files = {}
+    for dirpath, _, filenames in os.walk(ksb_folder_path):
+        for filename in filenames:
+            if not filename.endswith(KSB_FILE_SUFFIX):
+                continue
+            filepath = os.path.join(dirpath, filename)
+            relpath = os.path.relpath(filepath, ksb_folder_path)
+            code = ksb_code(relpath, namespace)
+            stat = os.stat(filepath)
+
+            previous = manifest.get(relpath)
+            if previous and previous["code"] != code:
+                raise ValueError(
+                    f"{filepath} was imported as {previous['code']} but would now be {code}; "
+                    f"import the folder with the namespace it was first imported with"
+                )
+            if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+                files[relpath] = previous
+                continue
+
+            files[relpath] = {
+                "code": code,
+                "hash": content_hash(read_description(filepath)),
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+    return files
+
+def check_unique_codes(scanned):
+    """
+    Raises ValueError if two files map to the same KSB code.
+
+    One upsert cannot write the same code twice (PostgreSQL rejects it with
+    "ON CONFLICT DO UPDATE command cannot affect row a second time"), and
+    silently keeping either file would lose the other.
+    """
+    sources = {}
+    for ksb_folder_path, _, files in scanned:
+        for relpath, entry in sorted(files.items()):
+            filepath = os.path.join(ksb_folder_path, relpath)
+            if entry["code"] in sources:
+                raise ValueError(
+                    f"KSB code {entry['code']} comes from both {sources[entry['code']]} and {filepath}"
+                )
+            sources[entry["code"]] = filepath
+
+def import_ksbs_from_markdown(ksb_folder_paths, db_url, force=False):
     """
     Imports KSBs from markdown files into the database.
 
+    The import is incremental. Each folder keeps a manifest of file mtimes
+    and content hashes, and a re-run over unchanged folders returns without
+    touching the database. Otherwise, the existing codes and the content
+    hashes stored with them are read with one query, and every new or
+    changed KSB is written with a single upsert.
+
+    Standards kept in separate folders with the same file names (two
+    "k1.desc.md") need a namespace each, given as a (folder, namespace)
+    pair, e.g. ("standards/st0787", "st0787") imports "k1.desc.md" as
+    "ST0787-K1". The namespace is part of the stored code, so give a
+    folder the same namespace, or none, on every import.
+
     Args:
-        ksb_folder_path (str): The path to the folder containing KSB markdown files.
+        ksb_folder_paths (str | list): The folder, or folders, containing KSB markdown
+                                       files. Each item is a path or a (path, namespace) pair.
         db_url (str): The database URL.
+        force (bool): Compare against the database even if no file has changed,
+                      e.g. after the database was reset.
+
+    Raises:
+        ValueError: If two files map to the same KSB code, or a folder's codes
+                    differ from the ones it was last imported with.
     """
+    if isinstance(ksb_folder_paths, str):
+        ksb_folder_paths = [ksb_folder_paths]
+
+    scanned = []
+    changed = force
+    for folder in ksb_folder_paths:
+        ksb_folder_path, namespace = folder if isinstance(folder, tuple) else (folder, None)
+        manifest_path = os.path.join(ksb_folder_path, MANIFEST_FILENAME)
+        manifest = load_manifest(manifest_path)
+        files = scan_ksb_folder(ksb_folder_path, manifest, namespace)
+        changed = changed or files != manifest
+        scanned.append((ksb_folder_path, manifest_path, files))
+    check_unique_codes(scanned)
+
+    if not changed:
+        print("KSB files unchanged since the last import, nothing to do.")
+        return
+
     engine = create_engine(db_url)
     Base.metadata.create_all(engine)
     DBSession = sessionmaker(bind=engine)
     session = DBSession()
 
-    for filename in os.listdir(ksb_folder_path):
-        if filename.endswith(".desc.md"):
-            ksb_code = filename.split('.')[0].upper()
-            filepath = os.path.join(ksb_folder_path, filename)
-
-            with open(filepath, 'r', encoding='utf-8') as f:
-                description = f.read().strip()
+    # Read every existing code and its stored content hash in one query
+    existing_hashes = dict(session.execute(select(KSB.code, KSB.content_hash)).all())
 
-            # Check if the KSB already exists
-            existing_ksb = session.query(KSB).filter_by(code=ksb_code).first()
-            if existing_ksb:
-                print(f"KSB {ksb_code} already exists, skipping.")
+    rows = []
+    for ksb_folder_path, _, files in scanned:
+        for relpath, entry in sorted(files.items()):
+            if existing_hashes.get(entry["code"]) == entry["hash"]:
                 continue
+            action = "Updating" if entry["code"] in existing_hashes else "Adding"
+            print(f"{action} KSB: {entry['code']}")
+            rows.append({
+                "code": entry["code"],
+                "description": read_description(os.path.join(ksb_folder_path, relpath)),
+                "content_hash": entry["hash"],
+            })
 
-            new_ksb = KSB(code=ksb_code, description=description)
-            session.add(new_ksb)
-            print(f"Adding KSB: {ksb_code}")
+    if rows:
+        stmt = upsert_insert(engine.dialect.name)(KSB).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[KSB.code],
+            set_={"description": stmt.excluded.description, "content_hash": stmt.excluded.content_hash}
+        )
+        session.execute(stmt)
+        # Tell running API workers to reload their cached KSB catalogue
+        bump_ksb_catalogue_version(session)
 
     session.commit()
     session.close()
-    print("KSB import complete.")
+
+    # Only record the files as imported once the database has them
+    for _, manifest_path, files in scanned:
+        save_manifest(manifest_path, files)
+    print(f"KSB import complete: {len(rows)} added or updated.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import KSB markdown files into the database.")
+    parser.add_argument("folders", nargs="*", default=["ksbs"], metavar="[NAMESPACE=]FOLDER",
+                        help="KSB folders to import (default: ksbs); a namespace prefixes every code "
+                             "in the folder and must be the same on every import")
+    parser.add_argument("--force", action="store_true",
+                        help="compare with the database even if no file changed")
+    args = parser.parse_args()
+
     settings = Settings()
-    ksb_folder = "ksbs"
-    import_ksbs_from_markdown(ksb_folder, settings.postgres_url)
\ No newline at end of file
+    try:
+        folders = [parse_folder(spec) for spec in args.folders]
+        import_ksbs_from_markdown(folders, settings.postgres_url, force=args.force)
+    except ValueError as e:
+        sys.exit(str(e))
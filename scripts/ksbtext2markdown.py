@@ -1,6 +1,90 @@
+import argparse
 import re
 import os
 
+KSB_FILE_SUFFIX = ".desc.md"
+
+# A KSB starts on a line beginning with its code, e.g. "K1: ..." or "S12 - ..."
+KSB_LINE_PATTERN = re.compile(r'^\s*([KSB]\d+)\s*[:.\-–]\s*(.*)$', re.IGNORECASE)
+
+# Section headings that separate the knowledge, skills and behaviours lists.
+# They end the current KSB and are never part of a description.
+SECTION_HEADERS = {"knowledge", "skills", "behaviours", "behaviors"}
+
+def is_section_header(line: str) -> bool:
+    return line.strip().rstrip(":").strip().lower() in SECTION_HEADERS
+
+def iter_ksbs(lines):
+    """
+    Parses KSBs from an iterable of lines, one line at a time.
+
+    A KSB starts at a line beginning with its code (K#, S# or B#) and runs
+    until the next code, section header or the end of the input, so
+    descriptions may wrap over several lines. Any text before the first
+    code, such as the document title, is ignored.
+
+    Args:
+        lines (Iterable[str]): The lines of a standard document, e.g. an open file.
+
+    Yields:
+        tuple: (code, description) pairs, with the code upper-cased.
+    """
+    code, parts = None, []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        match = KSB_LINE_PATTERN.match(line)
+        if match or is_section_header(line):
+            if code:
+                yield code, "\n".join(parts).strip()
+            code, parts = None, []
+            if match:
+                code, parts = match.group(1).upper(), [match.group(2)]
+        elif code:
+            parts.append(line.strip())
+    if code:
+        yield code, "\n".join(parts).strip()
+
+def standard_name(path: str) -> str:
+    """Derive the output subfolder for a standard document from its file name, e.g. "ST0763 v1.2.txt" becomes "st0763-v1-2" """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[^a-z0-9]+', '-', stem.lower()).strip('-')
+
+def write_if_changed(filepath: str, content: str) -> bool:
+    """Write the file only if its content differs, leaving unchanged files and their mtimes untouched"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return True
+
+def write_ksbs(ksbs, output_folder: str) -> tuple:
+    """
+    Saves each KSB's description into a separate Markdown file.
+
+    Args:
+        ksbs (Iterable[tuple]): (code, description) pairs, as yielded by iter_ksbs.
+        output_folder (str): The folder where Markdown files will be saved.
+
+    Returns:
+        tuple: The number of KSBs found and the number of files written.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    found = written = 0
+    for ksb_id, description in ksbs:
+        found += 1
+        filename = os.path.join(output_folder, f"{ksb_id.lower()}{KSB_FILE_SUFFIX}")
+        try:
+            if write_if_changed(filename, description):
+                written += 1
+                print(f"Wrote {filename}")
+        except IOError as e:
+            print(f"Error writing to file {filename}: {e}")
+    return found, written
+
 def extract_ksbs_to_markdown(ksb_text: str, output_folder: str = "ksbs"):
     """
     Extracts KSBs (Knowledge, Skills, Behaviours) from a given text,
@@ -13,42 +97,29 @@ def extract_ksbs_to_markdown(ksb_text: str, output_folder: str = "ksbs"):
         output_folder (str): The name of the folder where Markdown files
                              will be saved. Defaults to "ksbs".
     """
-    # Ensure the output folder exists
-    os.makedirs(output_folder, exist_ok=True)
-    print(f"Ensuring output directory '{output_folder}' exists...")
-
-    # Regex to find KSB identifiers and capture the description that follows.
-    # It looks for 'K', 'S', or 'B' followed by digits and a colon,
-    # then captures everything non-greedily until the next KSB identifier
-    # or the end of the string.
-    # re.DOTALL allows '.' to match newlines.
-    # The pattern is adjusted to use ':' instead of '.' as the separator.
-    ksb_pattern = re.compile(r'(K\d+|S\d+|B\d+):\s*(.*?)(?=(?:K|S|B)\d+:|\Z)', re.DOTALL)
-
-    matches = ksb_pattern.findall(ksb_text)
-    
-    if not matches:
+    found, written = write_ksbs(iter_ksbs(ksb_text.splitlines()), output_folder)
+    if not found:
         print("No KSBs found in the provided text. Please check the format (e.g., K1:, S5:, B10:).")
         return
+    print(f"Found {found} KSBs, {written} files changed.")
 
-    print(f"Found {len(matches)} KSBs. Processing...")
-
-    for ksb_id, description in matches:
-        # Clean up KSB ID for filename: convert to lowercase
-        ksb_id_clean = ksb_id.strip().lower()
-        
-        # Strip leading/trailing whitespace from the description
-        clean_description = description.strip()
+def extract_standard_file(path: str, output_folder: str = "ksbs"):
+    """
+    Streams a standard document from disk and writes its KSBs to
+    <output_folder>/<standard>/, where <standard> comes from the file name.
+    import_ksbs.py namespaces the codes of each subfolder with its name, so
+    KSBs from different standards never collide.
 
-        # Construct filename
-        filename = os.path.join(output_folder, f"{ksb_id_clean}.desc.md")
+    Args:
+        path (str): The standard document, a plain text file.
+        output_folder (str): The root folder for the KSB Markdown files.
 
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(clean_description)
-            print(f"Created {filename}")
-        except IOError as e:
-            print(f"Error writing to file {filename}: {e}")
+    Returns:
+        tuple: The number of KSBs found and the number of files written.
+    """
+    standard_folder = os.path.join(output_folder, standard_name(path))
+    with open(path, 'r', encoding='utf-8') as f:
+        return write_ksbs(iter_ksbs(f), standard_folder)
 
 # --- Your KSB Text Goes Here ---
 # This variable now contains the KSB text you provided.
@@ -124,5 +195,23 @@ B8: Maintains awareness of trends and innovations in the subject area, utilising
 
 # --- Run the script ---
 if __name__ == "__main__":
-    extract_ksbs_to_markdown(ksb_text)
-    print("\nKSB extraction complete. Check the 'ksbs' folder for your files.")
+    parser = argparse.ArgumentParser(description="Extract KSBs from apprenticeship standard documents into Markdown files.")
+    parser.add_argument("files", nargs="*",
+                        help="standard documents to extract, one output subfolder each "
+                             "(default: the built-in KSB text, written to the output folder itself)")
+    parser.add_argument("--output", default="ksbs",
+                        help="root folder for the KSB Markdown files (default: ksbs)")
+    args = parser.parse_args()
+
+    if not args.files:
+        extract_ksbs_to_markdown(ksb_text, args.output)
+    else:
+        total_found = total_written = 0
+        for path in args.files:
+            found, written = extract_standard_file(path, args.output)
+            if not found:
+                print(f"No KSBs found in {path}.")
+            total_found += found
+            total_written += written
+        print(f"Found {total_found} KSBs in {len(args.files)} standards, {total_written} files changed.")
+    print(f"\nKSB extraction complete. Check the '{args.output}' folder for your files.")
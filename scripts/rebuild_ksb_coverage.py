@@ -0,0 +1,41 @@
+import os
+import sys
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from pymongo import MongoClient
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models.postgres_models import Base
+from api.services.coverage import rebuild_coverage
+from config import Settings
+
+def rebuild_ksb_coverage(db_url, mongodb_url, mongodb_database="apprentice_hub", batch_size=1000):
+    """
+    Recomputes the per-user KSB coverage counters from the evidence_ksb_link table.
+
+    Use this to backfill the counters for existing evidence or to repair drift.
+
+    Args:
+        db_url (str): The database URL.
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The database holding the evidence collection.
+        batch_size (int): Number of evidence documents resolved per link query.
+    """
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    DBSession = sessionmaker(bind=engine)
+    session = DBSession()
+    mongo_client = MongoClient(mongodb_url)
+
+    try:
+        rows = rebuild_coverage(session, mongo_client[mongodb_database], batch_size=batch_size)
+    finally:
+        session.close()
+        mongo_client.close()
+    print(f"KSB coverage rebuild complete: {rows} counters written.")
+
+if __name__ == "__main__":
+    settings = Settings()
+    rebuild_ksb_coverage(settings.postgres_url, settings.mongodb_url, settings.mongodb_database)
@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+from datetime import date
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models.postgres_models import Base
+from api.services.otj_hours import rebuild_otj_buckets
+from config import Settings
+
+def rebuild(db_url, user_id=None, since=None):
+    """
+    Recomputes the stored weekly and monthly off-the-job buckets from the learning logs.
+
+    Run this after learning logs were imported or edited without invalidating
+    the buckets, so closed periods reflect the late entries.
+
+    Args:
+        db_url (str): The database URL.
+        user_id (int): Only rebuild this user's buckets; all users if None.
+        since (date): Only rebuild periods from the one containing this date.
+    """
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    DBSession = sessionmaker(bind=engine)
+    session = DBSession()
+
+    try:
+        users = rebuild_otj_buckets(session, user_id, since)
+    finally:
+        session.close()
+        engine.dispose()
+    print(f"Off-the-job buckets rebuilt for {users} users.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the off-the-job hours buckets from the learning logs.")
+    parser.add_argument("--user-id", type=int, help="Only rebuild this user")
+    parser.add_argument("--since", type=date.fromisoformat, help="Only rebuild periods from this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    settings = Settings()
+    rebuild(settings.postgres_url, args.user_id, args.since)
@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from pymongo import MongoClient
+
+# Add the project root to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.models.postgres_models import Base
+from api.services.evidence_reconciler import reconcile_evidence
+from config import Settings
+
+def reconcile(db_url, mongodb_url, mongodb_database="apprentice_hub", grace_minutes=10.0, batch_size=1000, repair=True):
+    """
+    Runs one reconciliation pass over the evidence written since the last checkpoint.
+
+    Args:
+        db_url (str): The database URL.
+        mongodb_url (str): The MongoDB URL.
+        mongodb_database (str): The database holding the evidence collection.
+        grace_minutes (float): Evidence younger than this is left for the next pass.
+        batch_size (int): Documents read per query.
+        repair (bool): Fix mismatches and advance the checkpoint; if False, only report.
+    """
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    DBSession = sessionmaker(bind=engine)
+    session = DBSession()
+    mongo_client = MongoClient(mongodb_url)
+
+    try:
+        report = reconcile_evidence(
+            session,
+            mongo_client[mongodb_database],
+            grace=timedelta(minutes=grace_minutes),
+            batch_size=batch_size,
+            repair=repair
+        )
+    finally:
+        session.close()
+        mongo_client.close()
+        engine.dispose()
+
+    print(f"Reconciled evidence written {report.start.isoformat()} to {report.end.isoformat()}: "
+          f"{report.documents_checked} documents checked, {report.links_added} links added, "
+          f"{report.links_removed} links removed, {len(report.dangling_evidence_ids)} missing documents.")
+    if report.dangling_evidence_ids:
+        action = "Removed" if repair else "Found"
+        print(f"{action} links to missing evidence; run scripts/rebuild_ksb_coverage.py to correct the coverage counters.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repair evidence whose MongoDB document and PostgreSQL links disagree.")
+    parser.add_argument("--interval", type=float, help="Keep running, one pass every this many seconds")
+    parser.add_argument("--grace-minutes", type=float, default=10.0, help="Skip evidence younger than this")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents read per query")
+    parser.add_argument("--dry-run", action="store_true", help="Report mismatches without repairing them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    settings = Settings()
+    while True:
+        reconcile(
+            settings.postgres_url, settings.mongodb_url, settings.mongodb_database,
+            args.grace_minutes, args.batch_size, not args.dry_run
+        )
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,80 @@
+import asyncio
+import argparse
+import mongomock
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from database.models.postgres_models import EvidenceKSBLink, KSBCoverage
+from scripts.benchmark_api import DatasetParams, percentile, run_benchmark, seed_dataset
+
+SMALL = DatasetParams(users=2, projects_per_user=1, evidence_per_user=4, max_ksbs_per_evidence=3, log_days=14, seed=7)
+
+def _args(**overrides):
+    args = dict(
+        backend="standin", mode="sync", users=2, projects_per_user=1, evidence_per_user=3,
+        max_ksbs_per_evidence=2, log_days=14, seed=7, requests=2, concurrency=2, warmup=0,
+        skip_writes=True, only=None
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_seeded_evidence_matches_what_the_api_writes(tmp_path):
+    """
+    Tests that seeded documents carry the ksb_ids and content summary the API
+    stores, and that their KSB links and coverage counts agree with them.
+    """
+    engine = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    mongo_db = mongomock.MongoClient().apprentice_hub
+
+    data = seed_dataset(engine, mongo_db, SMALL)
+
+    docs = list(mongo_db.evidence.find())
+    assert sorted(str(doc["_id"]) for doc in docs) == sorted(data.evidence_ids)
+    assert len(docs) == SMALL.users * SMALL.evidence_per_user
+    for doc in docs:
+        assert 1 <= len(doc["ksb_ids"]) <= SMALL.max_ksbs_per_evidence
+        assert doc["content_length"] == len(doc["content"])
+        assert doc["excerpt"]
+
+    with sessionmaker(bind=engine)() as session:
+        links = session.execute(select(EvidenceKSBLink.evidence_id, EvidenceKSBLink.ksb_id)).all()
+        coverage = session.execute(select(KSBCoverage.evidence_count)).scalars().all()
+    assert sorted(links) == sorted((str(doc["_id"]), ksb_id) for doc in docs for ksb_id in doc["ksb_ids"])
+    assert sum(coverage) == len(links)
+    engine.dispose()
+
+def test_seeding_is_deterministic(tmp_path):
+    """
+    Tests that the same parameters and seed produce the same evidence.
+    """
+    def seeded_titles(name):
+        engine = create_engine(f"sqlite:///{tmp_path / name}")
+        mongo_db = mongomock.MongoClient().apprentice_hub
+        seed_dataset(engine, mongo_db, SMALL)
+        engine.dispose()
+        return [(doc["title"], doc["ksb_ids"], doc["content_length"]) for doc in mongo_db.evidence.find()]
+
+    assert seeded_titles("first.db") == seeded_titles("second.db")
+
+def test_percentile_uses_the_nearest_rank():
+    """
+    Tests the nearest-rank percentile, including an empty sample.
+    """
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+def test_standin_run_skips_text_search_and_serves_every_other_endpoint():
+    """
+    Tests a small benchmark against the stand-in backend: the text search
+    endpoint is reported as unsupported and every other read succeeds.
+    """
+    results = asyncio.run(run_benchmark(_args()))
+
+    assert results["meta"]["unsupported_endpoints"] == ["evidence search"]
+    assert "evidence search" not in results["endpoints"]
+    assert "ksbs list" in results["endpoints"]
+    failed = {name: result["status_codes"] for name, result in results["endpoints"].items() if result["errors"]}
+    assert failed == {}
@@ -0,0 +1,148 @@
+import os
+import pytest
+from sqlalchemy import create_engine, select
+from database.models.postgres_models import KSB
+from scripts.import_ksbs import content_hash, import_ksbs_from_markdown, parse_folder
+
+def _write(folder, filename, text):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, filename), 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def _ksbs(db_url):
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        rows = connection.execute(select(KSB.code, KSB.description, KSB.content_hash).order_by(KSB.code)).all()
+    engine.dispose()
+    return {code: (description, stored_hash) for code, description, stored_hash in rows}
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'ksbs.db'}"
+
+def test_unchanged_ksbs_are_not_rewritten(tmp_path, db_url, capsys):
+    """
+    Tests that a re-import skips KSBs whose stored content hash matches the
+    file, even when forced to compare against the database.
+    """
+    folder = str(tmp_path / "ksbs")
+    _write(folder, "k1.desc.md", "Knowledge one\n")
+    _write(folder, "s1.desc.md", "Skill one")
+
+    import_ksbs_from_markdown(folder, db_url)
+    assert _ksbs(db_url) == {
+        "K1": ("Knowledge one", content_hash("Knowledge one")),
+        "S1": ("Skill one", content_hash("Skill one")),
+    }
+    assert "2 added or updated" in capsys.readouterr().out
+
+    import_ksbs_from_markdown(folder, db_url)
+    assert "nothing to do" in capsys.readouterr().out
+
+    import_ksbs_from_markdown(folder, db_url, force=True)
+    assert "0 added or updated" in capsys.readouterr().out
+
+def test_changed_ksbs_are_updated(tmp_path, db_url, capsys):
+    """
+    Tests that editing a file updates that KSB's description and hash only,
+    and that a KSB with no stored hash is rewritten from its file.
+    """
+    folder = str(tmp_path / "ksbs")
+    _write(folder, "k1.desc.md", "Knowledge one")
+    _write(folder, "s1.desc.md", "Skill one")
+    import_ksbs_from_markdown(folder, db_url)
+    capsys.readouterr()
+
+    _write(folder, "k1.desc.md", "Knowledge one, revised")
+    import_ksbs_from_markdown(folder, db_url)
+    out = capsys.readouterr().out
+    assert "Updating KSB: K1" in out
+    assert "S1" not in out
+    assert _ksbs(db_url)["K1"] == ("Knowledge one, revised", content_hash("Knowledge one, revised"))
+
+    # e.g. a KSB created through the API, which stores no hash
+    engine = create_engine(db_url)
+    with engine.begin() as connection:
+        connection.execute(KSB.__table__.update().where(KSB.code == "S1").values(content_hash=None))
+    engine.dispose()
+    import_ksbs_from_markdown(folder, db_url, force=True)
+    assert "Updating KSB: S1" in capsys.readouterr().out
+    assert _ksbs(db_url)["S1"] == ("Skill one", content_hash("Skill one"))
+
+def _codes(db_url):
+    return {code: description for code, (description, _) in _ksbs(db_url).items()}
+
+def test_codes_do_not_depend_on_the_other_folders_imported(tmp_path, db_url):
+    """
+    Tests that a folder keeps its codes when it is later imported alongside
+    another, namespaced, folder, so no second row is created for its KSBs.
+    """
+    ksbs = str(tmp_path / "ksbs")
+    st0787 = str(tmp_path / "st0787")
+    _write(ksbs, "k1.desc.md", "Data science knowledge")
+    _write(st0787, "k1.desc.md", "Software development knowledge")
+
+    import_ksbs_from_markdown(ksbs, db_url)
+    import_ksbs_from_markdown([ksbs, (st0787, "st0787")], db_url)
+
+    assert _codes(db_url) == {"K1": "Data science knowledge", "ST0787-K1": "Software development knowledge"}
+
+def test_namespace_prefixes_subfolder_codes_too(tmp_path, db_url):
+    """
+    Tests that two namespaced folders with the same subfolder name import to
+    distinct codes instead of overwriting each other.
+    """
+    st0763 = str(tmp_path / "st0763")
+    st0787 = str(tmp_path / "st0787")
+    _write(st0763, "k1.desc.md", "Data engineering knowledge")
+    _write(os.path.join(st0763, "core"), "k1.desc.md", "Data engineering core")
+    _write(st0787, "k1.desc.md", "Software development knowledge")
+    _write(os.path.join(st0787, "core"), "k1.desc.md", "Software development core")
+
+    import_ksbs_from_markdown([(st0763, "st0763"), (st0787, "st0787")], db_url)
+
+    assert _codes(db_url) == {
+        "ST0763-K1": "Data engineering knowledge",
+        "ST0763-CORE-K1": "Data engineering core",
+        "ST0787-K1": "Software development knowledge",
+        "ST0787-CORE-K1": "Software development core",
+    }
+
+def test_colliding_codes_are_rejected_before_writing(tmp_path, db_url):
+    """
+    Tests that two files mapping to the same code, here two folders without
+    a namespace that share a subfolder name, raise ValueError and leave the
+    database and the manifests untouched.
+    """
+    first = str(tmp_path / "st0763")
+    second = str(tmp_path / "st0787")
+    _write(os.path.join(first, "core"), "k1.desc.md", "First")
+    _write(os.path.join(second, "core"), "k1.desc.md", "Second")
+
+    with pytest.raises(ValueError, match="CORE-K1"):
+        import_ksbs_from_markdown([first, second], db_url)
+
+    assert not os.path.exists(tmp_path / "ksbs.db")
+    assert not os.path.exists(os.path.join(first, ".import_manifest.json"))
+
+def test_changing_a_folders_namespace_is_rejected(tmp_path, db_url):
+    """
+    Tests that re-importing a folder under a different namespace fails
+    instead of adding a second KSB for every file.
+    """
+    folder = str(tmp_path / "ksbs")
+    _write(folder, "k1.desc.md", "Knowledge one")
+    import_ksbs_from_markdown(folder, db_url)
+
+    with pytest.raises(ValueError, match="K1 but would now be KSBS-K1"):
+        import_ksbs_from_markdown([(folder, "ksbs")], db_url)
+    assert _codes(db_url) == {"K1": "Knowledge one"}
+
+def test_parse_folder_splits_an_optional_namespace():
+    """
+    Tests the "[NAMESPACE=]FOLDER" command-line form.
+    """
+    assert parse_folder("ksbs") == ("ksbs", None)
+    assert parse_folder("st0787=standards/st0787") == ("standards/st0787", "st0787")
+    with pytest.raises(ValueError):
+        parse_folder("=standards/st0787")
@@ -0,0 +1,62 @@
+import os
+from scripts.ksbtext2markdown import extract_standard_file, iter_ksbs, standard_name, write_if_changed
+
+SAMPLE = """Data Scientist (Integrated Degree)
+Knowledge
+K1: How to use AI and machine learning methodologies
+  to meet business objectives
+k2 - How to apply modern data storage solutions
+Skills:
+S1. Use applied research and data modelling
+Behaviours
+B1: A strong work ethic
+"""
+
+def test_iter_ksbs_splits_a_standard_into_codes_and_descriptions():
+    """
+    Tests that KSBs are split at each code and section header, that wrapped
+    descriptions are joined and that the title before the first code is ignored.
+    """
+    assert list(iter_ksbs(SAMPLE.splitlines(keepends=True))) == [
+        ("K1", "How to use AI and machine learning methodologies\nto meet business objectives"),
+        ("K2", "How to apply modern data storage solutions"),
+        ("S1", "Use applied research and data modelling"),
+        ("B1", "A strong work ethic"),
+    ]
+
+def test_standard_name_is_a_folder_safe_slug():
+    """
+    Tests that a standard's file name becomes its lower-case output subfolder.
+    """
+    assert standard_name(os.path.join("docs", "ST0763 v1.2.txt")) == "st0763-v1-2"
+
+def test_unchanged_files_are_not_rewritten(tmp_path):
+    """
+    Tests that write_if_changed leaves a file with the same content, and its
+    mtime, untouched and rewrites it only when the content differs.
+    """
+    filepath = str(tmp_path / "k1.desc.md")
+    assert write_if_changed(filepath, "Knowledge one")
+    os.utime(filepath, ns=(1_000_000_000, 1_000_000_000))
+
+    assert not write_if_changed(filepath, "Knowledge one")
+    assert os.stat(filepath).st_mtime_ns == 1_000_000_000
+
+    assert write_if_changed(filepath, "Knowledge one, revised")
+    with open(filepath, encoding="utf-8") as f:
+        assert f.read() == "Knowledge one, revised"
+
+def test_standard_files_are_extracted_into_their_own_folder(tmp_path):
+    """
+    Tests that a standard document is written to a subfolder named after it
+    and that extracting it again writes nothing.
+    """
+    source = tmp_path / "ST0763.txt"
+    source.write_text(SAMPLE, encoding="utf-8")
+    output = str(tmp_path / "ksbs")
+
+    assert extract_standard_file(str(source), output) == (4, 4)
+    assert sorted(os.listdir(os.path.join(output, "st0763"))) == [
+        "b1.desc.md", "k1.desc.md", "k2.desc.md", "s1.desc.md"
+    ]
+    assert extract_standard_file(str(source), output) == (4, 0)
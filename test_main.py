@@ -0,0 +1,22 @@
+from fastapi.testclient import TestClient
+
+from config import Settings
+from main import create_app
+
+# TEST-NET addresses: nothing answers there, so any connection attempt would hang or fail
+UNREACHABLE = Settings(
+    postgres_user="user", postgres_password="password", postgres_db="db",
+    postgres_host="192.0.2.1", mongodb_url="mongodb://192.0.2.1:27017/"
+)
+
+def test_app_starts_without_reachable_databases():
+    """
+    Tests that building and starting the app opens no database connection.
+    """
+    app = create_app(UNREACHABLE)
+
+    with TestClient(app) as client:
+        response = client.get("/")
+        assert response.status_code == 200
+        assert app.state.engine.pool.checkedout() == 0
+        assert {route.path for route in app.routes} >= {"/api/ksbs/", "/api/evidence/", "/api/dashboard/overview"}